@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Build offline KG artifacts from data/embeddings/.
+
+Run from TreeHacks/:
+    python scripts/build_kg.py bundle --data-dir ./data [--release]
+    python scripts/build_kg.py release --data-dir ./data [--use VERSION]
+    python scripts/build_kg.py scores --data-dir ./data [--diseases glioblastoma,als]
+    python scripts/build_kg.py quantize --data-dir ./data [--dtype int8]
+    python scripts/build_kg.py ann --data-dir ./data [--nlist 256]
+    python scripts/build_kg.py enrich --data-dir ./data
+    python scripts/build_kg.py db --data-dir ./data
+    python scripts/build_kg.py null --data-dir ./data [--samples 256]
+    python scripts/build_kg.py neighbors --data-dir ./data [--metric cosine]
+    python scripts/build_kg.py graph --data-dir ./data [--triples drkg.tsv]
+    python scripts/build_kg.py ensemble --data-dir ./data
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+def cmd_bundle(args):
+    from drug_rescue.engines.bundle import build_bundle
+    out = build_bundle(os.path.join(args.data_dir, "embeddings"), release=args.release)
+    print(f"{'Release' if args.release else 'Bundle'} written to {out}")
+
+
+def cmd_release(args):
+    import json
+    from drug_rescue.engines.bundle import RELEASES_DIRNAME, current_release, set_current_release
+    emb = os.path.join(args.data_dir, "embeddings")
+    if args.use:
+        set_current_release(emb, args.use)
+    current = current_release(emb)
+    releases = os.path.join(emb, RELEASES_DIRNAME)
+    names = sorted(n for n in os.listdir(releases) if not n.startswith(".")
+                   and os.path.isdir(os.path.join(releases, n))) if os.path.isdir(releases) else []
+    for name in names:
+        with open(os.path.join(releases, name, "manifest.json")) as f:
+            m = json.load(f)
+        print(f"{'*' if name == current else ' '} {name}  {m['method']}  built {m['built_at']}")
+    if not names:
+        print(f"No releases in {releases}")
+
+
+def cmd_scores(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.score_matrix import build_score_matrix
+    diseases = None
+    if args.diseases:
+        diseases = [d.strip() for d in args.diseases.split(",") if d.strip()]
+    elif args.diseases_file:
+        with open(args.diseases_file) as f:
+            diseases = [line.strip() for line in f if line.strip()]
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"), use_score_matrix=False)
+    out = build_score_matrix(scorer, diseases=diseases, dtype=args.dtype)
+    print(f"Score matrix written to {out}")
+
+
+def cmd_quantize(args):
+    from drug_rescue.engines.bundle import load_bundle
+    from drug_rescue.engines.quantize import build_quantized
+    embeddings_dir = os.path.join(args.data_dir, "embeddings")
+    bundle = load_bundle(embeddings_dir)
+    if bundle is None:
+        sys.exit("No up-to-date bundle. Run: python scripts/build_kg.py bundle")
+    out = build_quantized(bundle, embeddings_dir, dtype=args.dtype)
+    print(f"Quantized compounds written to {out}")
+
+
+def cmd_ann(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.ann_index import build_ann_index
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        use_score_matrix=False, use_ann=False)
+    out = build_ann_index(scorer, nlist=args.nlist)
+    print(f"ANN index written to {out}")
+
+
+def cmd_enrich(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.enrich_table import build_enrich_table
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        use_score_matrix=False, use_ann=False)
+    out = build_enrich_table(args.data_dir, scorer.compound_names)
+    print(f"Enrichment table written to {out}")
+
+
+def cmd_db(args):
+    from drug_rescue.engines.drug_db import index_database
+    db_path = os.path.join(args.data_dir, "database", "dropped_drugs.db")
+    if not os.path.exists(db_path):
+        sys.exit(f"No database at {db_path}")
+    created = index_database(db_path)
+    print(f"Indexed {db_path} (keys normalised; new indexes: {', '.join(created) or 'none'}; WAL)")
+
+
+def cmd_null(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.calibration import build_null_model
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        use_score_matrix=False, use_ann=False, calibrate=False)
+    out = build_null_model(scorer, n_samples=args.samples)
+    print(f"Null model written to {out}")
+
+
+def cmd_neighbors(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.neighbors import build_neighbor_index
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        db_path=os.path.join(args.data_dir, "database", "dropped_drugs.db"),
+                        use_score_matrix=False, use_ann=False, calibrate=False)
+    out = build_neighbor_index(scorer, metric=args.metric, depth=args.depth,
+                               triples=args.triples)
+    print(f"Neighbour index written to {out}")
+
+
+def cmd_graph(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.graph import build_graph
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        use_score_matrix=False, use_ann=False, calibrate=False)
+    out = build_graph(scorer, triples=args.triples)
+    print(f"Graph written to {out}")
+
+
+def cmd_ensemble(args):
+    from drug_rescue.engines.scorer import DRKGScorer
+    from drug_rescue.engines.ensemble import build_partner
+    scorer = DRKGScorer(os.path.join(args.data_dir, "embeddings"),
+                        use_score_matrix=False, use_ann=False, calibrate=False)
+    out = build_partner(scorer)
+    print(f"Ensemble partner written to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--data-dir", default="./data", help="Path to data/ (default ./data)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("bundle", parents=[common],
+                       help="Memory-mapped float32 embedding bundle")
+    p.add_argument("--release", action="store_true",
+                   help="Write a versioned release and make it CURRENT (hot-swapped by servers)")
+
+    p = sub.add_parser("release", parents=[common],
+                       help="List embedding releases; --use switches CURRENT (e.g. roll back)")
+    p.add_argument("--use", metavar="VERSION", help="Release to serve")
+
+    p = sub.add_parser("scores", parents=[common],
+                       help="Precomputed disease × compound score matrix")
+    p.add_argument("--diseases", help="Comma-separated disease queries or Disease:: IDs "
+                   "(default: every Disease:: entity)")
+    p.add_argument("--diseases-file", help="File with one disease query / ID per line")
+    p.add_argument("--dtype", choices=["float16", "float32", "float64"],
+                   help="Stored score dtype (default: the scorer's, exact; float16 halves it)")
+
+    p = sub.add_parser("quantize", parents=[common],
+                       help="Quantized compound rows for the first-pass scan (needs bundle)")
+    p.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+
+    p = sub.add_parser("ann", parents=[common],
+                       help="IVF index over rotated compound heads (approximate top-k)")
+    p.add_argument("--nlist", type=int, help="Inverted lists per relation (default ~4*sqrt(n))")
+
+    sub.add_parser("enrich", parents=[common],
+                   help="Columnar enrichment table (DB + lookup files, per compound)")
+
+    sub.add_parser("db", parents=[common],
+                   help="Lookup indexes + WAL for dropped_drugs.db (rerun after DB updates)")
+
+    p = sub.add_parser("null", parents=[common],
+                       help="Null score distributions for calibrated percentiles / z-scores")
+    p.add_argument("--samples", type=int, default=256,
+                   help="Random Disease:: entities to score (default 256)")
+
+    p = sub.add_parser("neighbors", parents=[common],
+                       help="Nearest known treatments per compound (embedding space)")
+    p.add_argument("--metric", choices=["cosine", "euclidean"], default="cosine")
+    p.add_argument("--depth", type=int, default=32,
+                   help="Reference neighbours stored per compound (default 32)")
+    p.add_argument("--triples", help="DRKG triples TSV (default <data-dir>/embeddings/drkg.tsv)")
+
+    p = sub.add_parser("graph", parents=[common],
+                       help="CSR adjacency over the DRKG triples (mechanism paths)")
+    p.add_argument("--triples", help="DRKG triples TSV (default <data-dir>/embeddings/drkg.tsv)")
+
+    sub.add_parser("ensemble", parents=[common],
+                   help="Second embedding model aligned to the scorer's rows (ensemble scoring)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    {
+        "bundle": cmd_bundle,
+        "release": cmd_release,
+        "scores": cmd_scores,
+        "quantize": cmd_quantize,
+        "ann": cmd_ann,
+        "enrich": cmd_enrich,
+        "db": cmd_db,
+        "null": cmd_null,
+        "neighbors": cmd_neighbors,
+        "graph": cmd_graph,
+        "ensemble": cmd_ensemble,
+    }[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -65,6 +65,7 @@ from .prompts import (
 DISCOVERY_TOOLS = [
     "mcp__drugrescue__discover_candidates",
     "mcp__drugrescue__score_specific_drugs",
+    "mcp__drugrescue__rank_diseases_for_drug",
     "mcp__drugrescue__kg_info",
     "Write",
 ]
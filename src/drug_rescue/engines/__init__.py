@@ -2,5 +2,20 @@
 Pure computation engines — no SDK, no async, no network.
 
 scorer.py   → RotatE/TransE scoring math (numpy)
+bundle.py   → memory-mapped float32 embedding bundle (build + load)
+score_matrix.py → precomputed disease × compound scores (build + load)
+quantize.py → int8 / float16 compound store for the first-pass scan
+ann_index.py → IVF index over rotated heads (approximate top-k)
+calibration.py → null score distributions for calibrated percentiles / z-scores
+neighbors.py → nearest known treatments per compound in embedding space
+graph.py    → CSR adjacency over the DRKG triples + k-hop mechanism paths
+ensemble.py → second model (TransE / RotatE) + rank / z-score fusion
+name_index.py → trigram substring index for entity name resolution
+vocab.py    → memory-mapped entity ↔ row vocabulary (bundle)
 discover.py → DB enrichment + candidate classification (sqlite)
+drug_db.py  → indexed, batched, cached lookups in dropped_drugs.db
+enrich_table.py → precompiled per-compound enrichment columns (build + load)
+registry.py → process-wide cache of loaded scorers + enrichers
+metrics.py  → per-stage timings / counters + pluggable metrics hook
+shared.py   → publish / attach scorer arrays in shared memory (multi-process)
 """
@@ -0,0 +1,230 @@
+"""
+ann_index.py — IVF nearest-neighbour index over rotated compound heads
+========================================================================
+
+A compound's score for (disease t, relation r) is −‖h∘r − t‖ (RotatE) or
+−‖h + r − t‖ (TransE): "top compounds" is a nearest-neighbour search for
+t among the rotated heads h∘r. For every treatment relation this index
+clusters h∘r with k-means (pure numpy) into inverted lists:
+
+    data/embeddings/ann_index/
+        manifest.json    method, relations, nlist, embedding version
+        centroids.npy    (n_relations, nlist, dim) float32
+        offsets.npy      (n_relations, nlist + 1) int64 — list boundaries
+        rows.npy         (n_relations, n_compounds) int32 — compound rows by list
+        sample.npy       (n_sample,) int32 — fixed random compound rows
+
+At query time DRKGScorer(use_ann=True) probes the nprobe lists nearest to
+each disease tail, scores only those compounds exactly, and ranks them.
+Percentiles / z-scores come from the same query scored against the fixed
+sample instead of every compound. Retrieval is approximate: a compound in
+an unprobed list is never ranked. The rotated heads themselves are not
+stored; candidates are scored from compound_embs.
+
+Build:
+    python scripts/build_kg.py ann --data-dir ./data [--nlist 256]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .score_matrix import _compounds_digest
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+ANN_DIRNAME = "ann_index"
+ANN_FORMAT = 1
+
+# Compounds scored exactly for the percentile / z-score distribution.
+ANN_SAMPLE_SIZE = 4096
+
+KMEANS_ITERATIONS = 10
+KMEANS_TRAIN_PER_LIST = 64      # training rows per centroid (subsampled)
+ASSIGN_CHUNK_ROWS = 2048       # rows per distance block (chunk × nlist float64)
+
+
+@dataclass
+class AnnIndex:
+    """A loaded IVF index. Arrays are read-only memory maps."""
+    path: Path
+    centroids: np.ndarray            # (n_relations, nlist, dim)
+    offsets: np.ndarray              # (n_relations, nlist + 1)
+    rows: np.ndarray                 # (n_relations, n_compounds)
+    sample: np.ndarray               # (n_sample,)
+    relation_names: list[str]
+    manifest: dict
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[1]
+
+    def candidates(self, queries: list[tuple[np.ndarray, int]], nprobe: int) -> np.ndarray:
+        """
+        Sorted unique compound rows in the nprobe lists nearest to each
+        (tail, relation position) query.
+        """
+        nprobe = min(max(nprobe, 1), self.nlist)
+        found = []
+        for tail, rel_pos in queries:
+            c = np.asarray(self.centroids[rel_pos], dtype=np.float64)
+            t = np.asarray(tail, dtype=np.float64)
+            d2 = np.einsum("ij,ij->i", c, c) - 2.0 * (c @ t)
+            lists = np.argpartition(d2, nprobe - 1)[:nprobe] if nprobe < self.nlist \
+                else np.arange(self.nlist)
+            offsets = self.offsets[rel_pos]
+            found.extend(self.rows[rel_pos, offsets[l]:offsets[l + 1]] for l in lists)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+
+def _nearest(x: np.ndarray, c: np.ndarray, c_sq: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for every row of x (in row blocks)."""
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), ASSIGN_CHUNK_ROWS):
+        block = x[start:start + ASSIGN_CHUNK_ROWS]
+        out[start:start + len(block)] = np.argmin(c_sq[None, :] - 2.0 * (block @ c.T), axis=1)
+    return out
+
+
+def _kmeans(train: np.ndarray, nlist: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means on float64 training rows; empty clusters are reseeded."""
+    centroids = train[rng.choice(len(train), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _nearest(train, centroids, np.einsum("ij,ij->i", centroids, centroids))
+        counts = np.bincount(assign, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = train[rng.choice(len(train), int(empty.sum()), replace=False)]
+    return centroids
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_ann_index(scorer: "DRKGScorer", nlist: Optional[int] = None,
+                    out_dir: Optional[str] = None, seed: int = 0) -> Path:
+    """
+    Cluster h∘r for every treatment relation and write the IVF lists.
+
+    nlist defaults to ~4·√n_compounds.
+    """
+    t0 = time.perf_counter()
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / ANN_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    treatment_rels = scorer.find_treatment_relations()
+    if not treatment_rels:
+        raise ValueError("No treatment relations found.")
+
+    n, dim = scorer.compound_embs.shape
+    nlist = min(max(1, nlist or int(4 * np.sqrt(n))), n)
+    rng = np.random.default_rng(seed)
+
+    centroids = np.empty((len(treatment_rels), nlist, dim), dtype=np.float32)
+    offsets = np.empty((len(treatment_rels), nlist + 1), dtype=np.int64)
+    rows = np.empty((len(treatment_rels), n), dtype=np.int32)
+    train_rows = np.sort(rng.choice(n, min(n, nlist * KMEANS_TRAIN_PER_LIST), replace=False))
+
+    for ri, (rel_name, rel_idx) in enumerate(treatment_rels):
+        c = _kmeans(scorer._apply_relation(scorer.compound_embs[train_rows], rel_idx),
+                    nlist, rng)
+        c_sq = np.einsum("ij,ij->i", c, c)
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, ASSIGN_CHUNK_ROWS):
+            hr = scorer._apply_relation(scorer.compound_embs[start:start + ASSIGN_CHUNK_ROWS], rel_idx)
+            assign[start:start + len(hr)] = _nearest(hr, c, c_sq)
+        centroids[ri] = c
+        rows[ri] = np.argsort(assign, kind="stable")
+        offsets[ri, 0] = 0
+        np.cumsum(np.bincount(assign, minlength=nlist), out=offsets[ri, 1:])
+        logger.info("Clustered %s into %d lists", rel_name, nlist)
+
+    sample = np.sort(rng.choice(n, min(n, ANN_SAMPLE_SIZE), replace=False)).astype(np.int32)
+
+    # Manifest is removed first and written last: a half-built index never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "centroids.npy", centroids)
+    np.save(out / "offsets.npy", offsets)
+    np.save(out / "rows.npy", rows)
+    np.save(out / "sample.npy", sample)
+    manifest = {
+        "format": ANN_FORMAT,
+        "method": scorer.method,
+        "nlist": nlist,
+        "n_compounds": n,
+        "n_sample": len(sample),
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+        "treatment_relations": [r[0] for r in treatment_rels],
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built IVF index (%d relations × %d lists) at %s in %.1fs",
+                len(treatment_rels), nlist, out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_ann_index(scorer: "DRKGScorer") -> Optional[AnnIndex]:
+    """
+    Memory-map the IVF index under the scorer's embeddings dir.
+
+    Returns None unless it was built from the same embedding version, method,
+    compound order and treatment relations the scorer has loaded.
+    """
+    path = scorer.embeddings_dir / ANN_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable ANN index manifest %s: %s", manifest_path, e)
+        return None
+
+    relation_names = [r[0] for r in scorer.find_treatment_relations()]
+    checks = {
+        "format": manifest.get("format") == ANN_FORMAT,
+        "method": manifest.get("method") == scorer.method,
+        "version": manifest.get("embedding_version") == scorer.embedding_version,
+        "compounds": manifest.get("compounds_sha1") == _compounds_digest(scorer.compound_names),
+        "relations": manifest.get("treatment_relations") == relation_names,
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("ANN index %s does not match loaded embeddings (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py ann", path, ", ".join(stale))
+        return None
+
+    return AnnIndex(
+        path=path,
+        centroids=np.load(path / "centroids.npy", mmap_mode="r"),
+        offsets=np.load(path / "offsets.npy", mmap_mode="r"),
+        rows=np.load(path / "rows.npy", mmap_mode="r"),
+        sample=np.load(path / "sample.npy", mmap_mode="r"),
+        relation_names=relation_names,
+        manifest=manifest,
+    )
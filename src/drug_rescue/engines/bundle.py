@@ -0,0 +1,295 @@
+"""
+bundle.py — Memory-mapped float32 embedding bundle
+====================================================
+
+The raw RotatE files are complex128. Loading them means reading the full
+arrays, concatenating real/imag parts into a float64 copy, then copying
+every compound row again into compound_embs. That is ~400MB of private
+memory per process and a few seconds of startup.
+
+A bundle is the same embeddings converted ONCE into the layout the scorer
+actually uses:
+
+    data/embeddings/bundle/
+        manifest.json         format, method, dims, type ranges, source stamps
+        entity_emb.npy        float32 [real | imag], Compound:: rows FIRST
+        relation_emb.npy      float32 [real | imag]
+        entity_*.npy          entity ↔ row vocabulary (see vocab.py)
+        relation_to_idx.json
+
+Rows are grouped by entity type (Compound, Disease, Gene, rest), so
+compound_embs is a zero-copy slice and the scorer never scans names.
+Arrays are opened with mmap_mode="r", so startup costs milliseconds and
+every worker on the node shares one page-cache copy.
+
+Build:
+    python scripts/build_kg.py bundle --data-dir ./data
+
+The scorer uses the bundle automatically when it exists and was built from
+the current raw files; otherwise it falls back to the raw .npy files.
+
+Releases: every manifest carries a version — a digest of the written
+files' sha256 checksums — plus the training metadata
+(models/rotate_model/metadata.json) the embeddings came with.
+`bundle --release` writes the bundle to a directory of its own and then
+points CURRENT at it (atomic rename):
+
+    data/embeddings/releases/
+        CURRENT               the version to serve
+        <version>/            a complete bundle, never modified once written
+
+A release is a snapshot: it is served even after the raw files are
+replaced by a retrain, and a process still mapping the previous release
+is unaffected. Serving a release over raw files that changed since it
+was built is logged, and reported by DRKGScorer.info() under "release".
+Old releases stay until deleted. The registry watches
+CURRENT and swaps the new scorer in once it has loaded (registry.py);
+every KGResult reports the embedding_version it was scored with.
+Derived artifacts (score matrix, ANN index, null model, neighbour index,
+graph, ensemble partner) record the embedding_version they were built
+from and are ignored under any other, so rolling CURRENT back never
+serves scores computed for another release.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .vocab import EntityVocab, group_by_type, write_vocab
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_DIRNAME = "bundle"
+BUNDLE_FORMAT = 2
+
+RELEASES_DIRNAME = "releases"
+CURRENT_FILE = "CURRENT"
+
+# Raw files a bundle may be built from (relative to embeddings dir).
+SOURCE_FILES = (
+    "rotate_entity_embeddings.npy",
+    "rotate_relation_embeddings.npy",
+    "transe_DRKG_TransE_l2_entity.npy",
+    "transe_DRKG_TransE_l2_relation.npy",
+    "entity_to_idx.json",
+    "relation_to_idx.json",
+    "transe_entities.tsv",
+    "transe_relations.tsv",
+)
+
+
+@dataclass
+class EmbeddingBundle:
+    """A loaded bundle. Arrays are read-only memory maps."""
+    path: Path
+    method: str
+    complex_dim: int
+    n_compounds: int
+    entity_emb: np.ndarray
+    relation_emb: np.ndarray
+    entity_to_idx: EntityVocab
+    relation_to_idx: dict[str, int]
+    manifest: dict
+    release: bool = False             # served from releases/<version>
+    sources_current: bool = True      # raw files unchanged since the build
+    # Objects that must outlive the arrays (e.g. shared memory blocks).
+    handles: list = field(default_factory=list)
+
+    @property
+    def version(self) -> Optional[str]:
+        """Content version (None for bundles built before versions existed)."""
+        return self.manifest.get("version")
+
+
+def source_stamps(embeddings_dir: Path) -> dict[str, list[int]]:
+    """{filename: [size, mtime_ns]} for the raw files that exist."""
+    stamps = {}
+    for name in SOURCE_FILES:
+        p = embeddings_dir / name
+        if p.exists():
+            st = p.stat()
+            stamps[name] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def current_release(embeddings_dir: str) -> Optional[str]:
+    """Version named by releases/CURRENT, if any."""
+    p = Path(embeddings_dir) / RELEASES_DIRNAME / CURRENT_FILE
+    try:
+        return p.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def set_current_release(embeddings_dir: str, version: str) -> None:
+    """Point releases/CURRENT at version (atomic: readers see old or new)."""
+    releases = Path(embeddings_dir) / RELEASES_DIRNAME
+    if not (releases / version / "manifest.json").exists():
+        raise FileNotFoundError(f"No release {version} in {releases}")
+    tmp = releases / f".{CURRENT_FILE}.{os.getpid()}"
+    tmp.write_text(version + "\n")
+    os.replace(tmp, releases / CURRENT_FILE)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_bundle(embeddings_dir: str, out_dir: Optional[str] = None,
+                 release: bool = False) -> Path:
+    """
+    Convert the raw embeddings in embeddings_dir into a float32 bundle.
+
+    Loads through DRKGScorer (raw path) so the bundle holds exactly the
+    matrices the scorer would have built, just reordered and downcast.
+    release=True writes releases/<version>/ and makes it CURRENT.
+    """
+    from .scorer import DRKGScorer
+
+    t0 = time.perf_counter()
+    src = Path(embeddings_dir)
+    if release:
+        # Built under a temporary name, renamed once its version is known.
+        out = src / RELEASES_DIRNAME / f".build-{os.getpid()}"
+        shutil.rmtree(out, ignore_errors=True)
+    else:
+        out = Path(out_dir) if out_dir else src / BUNDLE_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    scorer = DRKGScorer(str(src), use_bundle=False)
+
+    # Compounds first (same order the scorer indexes them), then Disease,
+    # Gene and the rest — each group in its original order.
+    order, type_ranges = group_by_type(list(scorer.entity_to_idx))
+    rows = np.fromiter((scorer.entity_to_idx[n] for n in order),
+                       dtype=np.int64, count=len(order))
+
+    np.save(out / "entity_emb.npy",
+            np.ascontiguousarray(scorer.entity_emb[rows], dtype=np.float32))
+    np.save(out / "relation_emb.npy",
+            np.ascontiguousarray(scorer.relation_emb, dtype=np.float32))
+    write_vocab(order, out)
+    with open(out / "relation_to_idx.json", "w") as f:
+        json.dump(scorer.relation_to_idx, f)
+
+    checksums = {f.name: _sha256(f) for f in sorted(out.iterdir())
+                 if f.name != "manifest.json"}
+    version = hashlib.sha256(
+        json.dumps([scorer.method, checksums], sort_keys=True).encode()
+    ).hexdigest()[:12]
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "method": scorer.method,
+        "complex_dim": scorer.complex_dim,
+        "dtype": "float32",
+        "n_entities": len(order),
+        "n_compounds": len(scorer.compound_names),
+        "type_ranges": type_ranges,
+        "embedding_dim": int(scorer.entity_emb.shape[1]),
+        "sources": source_stamps(src),
+        "checksums": checksums,
+        "training": scorer.training_metadata,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    # Manifest last: a bundle without one is ignored by load_bundle().
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if release:
+        final = src / RELEASES_DIRNAME / version
+        if final.exists():
+            shutil.rmtree(out)   # same content already released
+        else:
+            os.replace(out, final)
+        out = final
+        set_current_release(str(src), version)
+
+    logger.info("Built %s bundle %s at %s (%d entities, %d compounds) in %.1fs",
+                scorer.method, version, out, manifest["n_entities"],
+                manifest["n_compounds"], time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_bundle(embeddings_dir: str) -> Optional[EmbeddingBundle]:
+    """
+    Memory-map the CURRENT release, else the bundle under embeddings_dir/bundle.
+
+    Returns None if there is no bundle, it has an unknown format, or the
+    raw files changed since it was built (caller falls back to raw load).
+    Releases are snapshots: they are served even if the raw files changed,
+    which is logged and recorded in sources_current.
+    """
+    src = Path(embeddings_dir)
+    version = current_release(embeddings_dir)
+    path = src / RELEASES_DIRNAME / version if version else src / BUNDLE_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        if version:
+            logger.warning("releases/CURRENT names %s but %s has no manifest — ignoring",
+                           version, path)
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable bundle manifest %s: %s", manifest_path, e)
+        return None
+
+    if manifest.get("format") != BUNDLE_FORMAT:
+        logger.warning("Bundle %s has format %s, expected %s — ignoring",
+                       path, manifest.get("format"), BUNDLE_FORMAT)
+        return None
+
+    sources_current = manifest.get("sources") == source_stamps(src)
+    if version is None and not sources_current:
+        logger.warning("Bundle %s is stale (raw embeddings changed). "
+                       "Rebuild with: python scripts/build_kg.py bundle", path)
+        return None
+    if version is not None and not sources_current:
+        logger.info("Serving release %s; the raw embeddings changed since it was built "
+                    "(releases are not checked against the raw files)", version)
+
+    entity_emb = np.load(path / "entity_emb.npy", mmap_mode="r")
+    relation_emb = np.load(path / "relation_emb.npy", mmap_mode="r")
+    entity_to_idx = EntityVocab.load(path, manifest["type_ranges"])
+    with open(path / "relation_to_idx.json") as f:
+        relation_to_idx = json.load(f)
+
+    return EmbeddingBundle(
+        path=path,
+        method=manifest["method"],
+        complex_dim=manifest["complex_dim"],
+        n_compounds=manifest["n_compounds"],
+        entity_emb=entity_emb,
+        relation_emb=relation_emb,
+        entity_to_idx=entity_to_idx,
+        relation_to_idx=relation_to_idx,
+        manifest=manifest,
+        release=version is not None,
+        sources_current=sources_current,
+    )
@@ -0,0 +1,217 @@
+"""
+calibration.py — Cached null score distributions for calibrated percentiles
+=============================================================================
+
+By default a prediction's percentile and z-score are relative to the
+query's own score vector: every disease gets a top 1%, however weak its
+best match is, and the stats are recomputed per query. With a null model
+they are relative to a fixed background instead — compounds scored
+against randomly sampled Disease:: entities — so a 99th percentile means
+the same thing for every disease in a panel.
+
+Built offline, stored next to the embeddings:
+
+    data/embeddings/null_model/
+        manifest.json    method, relations, n_samples, embedding version
+        quantiles.npy    (n_relations + 1, N_QUANTILES) float64 — row r is
+                         the null for treatment relation r, the last row the
+                         null of the best score over all relations
+        moments.npy      (n_relations + 1, 2) float64 — mean, std per row
+
+DRKGScorer(calibrate=True) (or DRKG_CALIBRATE=1) attaches the model to
+every max-aggregated DiseaseScores; percentiles are then an interpolated
+lookup in the best-over-relations row (O(log N_QUANTILES)) and z-scores
+use its mean / std. That row is a single monotone map, so ranks and the
+percentile floor in discovery stay consistent with the ranking.
+
+A query resolved to k disease entities ranks by the best score over all
+k, which a single-entity null would rate too highly. for_entities(k)
+gives the null of the max of k independent draws (CDF F^k), so a 99th
+percentile means the same for one entity or ten.
+
+Build:
+    python scripts/build_kg.py null --data-dir ./data [--samples 256]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .score_matrix import _compounds_digest
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+NULL_DIRNAME = "null_model"
+NULL_FORMAT = 1
+
+NULL_SAMPLES = 256       # random Disease:: entities scored per build
+N_QUANTILES = 1001       # sketch resolution: every 0.1 percentile
+
+
+@dataclass
+class NullModel:
+    """A loaded null model. quantiles / moments are small; loaded in memory."""
+    path: Path
+    quantiles: np.ndarray            # (n_relations + 1, N_QUANTILES)
+    moments: np.ndarray              # (n_relations + 1, 2)
+    relation_names: list[str]
+    manifest: dict
+    n_entities: int = 1              # null of the best score over this many entities
+    _by_entities: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def levels(self) -> np.ndarray:
+        """Percentile (0-100) of each sketch column."""
+        return np.linspace(0.0, 100.0, self.quantiles.shape[1])
+
+    def _row(self, relation: Optional[str]) -> int:
+        return len(self.relation_names) if relation is None else self.relation_names.index(relation)
+
+    def percentiles(self, scores: np.ndarray, relation: Optional[str] = None) -> np.ndarray:
+        """Null percentile (0-100) of scores; relation=None → best over relations."""
+        q = self.quantiles[self._row(relation)]
+        return np.interp(scores, q, self.levels, left=0.0, right=100.0)
+
+    def z_scores(self, scores: np.ndarray, relation: Optional[str] = None) -> np.ndarray:
+        mean, std = self.moments[self._row(relation)]
+        return (scores - mean) / std
+
+    def for_entities(self, k: int) -> "NullModel":
+        """
+        The null of the best score over k disease entities: the max of k
+        independent draws, whose quantile at level p is this model's at
+        p ** (1/k). Moments are taken from the derived sketch.
+        """
+        if k <= 1:
+            return self
+        hit = self._by_entities.get(k)
+        if hit is None:
+            levels = np.linspace(0.0, 1.0, self.quantiles.shape[1])
+            quantiles = np.stack([np.interp(levels ** (1.0 / k), levels, q)
+                                  for q in self.quantiles])
+            moments = np.stack([quantiles.mean(axis=1),
+                                np.maximum(quantiles.std(axis=1), 1e-8)], axis=1)
+            hit = self._by_entities.setdefault(k, replace(
+                self, quantiles=quantiles, moments=moments, n_entities=k, _by_entities={}))
+        return hit
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_null_model(scorer: "DRKGScorer", n_samples: int = NULL_SAMPLES,
+                     out_dir: Optional[str] = None, seed: int = 0) -> Path:
+    """Score every compound against random Disease:: entities; write quantile sketches."""
+    t0 = time.perf_counter()
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / NULL_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    treatment_rels = scorer.find_treatment_relations()
+    if not treatment_rels:
+        raise ValueError("No treatment relations found.")
+    if len(scorer.disease_indices) == 0:
+        raise ValueError("No Disease:: entities to sample.")
+
+    rng = np.random.default_rng(seed)
+    n_samples = min(max(n_samples, 1), len(scorer.disease_indices))
+    sampled = np.sort(rng.choice(len(scorer.disease_indices), n_samples, replace=False))
+    n = len(scorer.compound_names)
+
+    # float32 is plenty for quantiles: (n_relations + 1) × samples × compounds.
+    values = np.empty((len(treatment_rels) + 1, n_samples, n), dtype=np.float32)
+    for si, d in enumerate(sampled):
+        tail = scorer.entity_emb[scorer.disease_indices[d]]
+        rows = [scorer._score_direct(rel_idx, tail) for _, rel_idx in treatment_rels]
+        best, _ = scorer._reduce_pairs(rows)
+        for ri, row in enumerate(rows):
+            values[ri, si] = row
+        values[-1, si] = best
+
+    levels = np.linspace(0.0, 1.0, N_QUANTILES)
+    quantiles = np.empty((len(values), N_QUANTILES), dtype=np.float64)
+    moments = np.empty((len(values), 2), dtype=np.float64)
+    for ri, v in enumerate(values):
+        v = v[np.isfinite(v)].astype(np.float64)
+        if len(v) == 0:
+            raise ValueError("Null scores are all non-finite. Embeddings may be corrupted.")
+        quantiles[ri] = np.quantile(v, levels)
+        moments[ri] = (v.mean(), max(v.std(), 1e-8))
+
+    # Manifest is removed first and written last: a half-built model never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "quantiles.npy", quantiles)
+    np.save(out / "moments.npy", moments)
+    manifest = {
+        "format": NULL_FORMAT,
+        "method": scorer.method,
+        "n_samples": int(n_samples),
+        "n_quantiles": N_QUANTILES,
+        "seed": seed,
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+        "treatment_relations": [r[0] for r in treatment_rels],
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built null model (%d diseases × %d compounds) at %s in %.1fs",
+                n_samples, n, out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_null_model(scorer: "DRKGScorer") -> Optional[NullModel]:
+    """
+    Load the null model under the scorer's embeddings dir.
+
+    Returns None unless it was built from the same embedding version, method,
+    compound order and treatment relations the scorer has loaded.
+    """
+    path = scorer.embeddings_dir / NULL_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable null model manifest %s: %s", manifest_path, e)
+        return None
+
+    relation_names = [r[0] for r in scorer.find_treatment_relations()]
+    checks = {
+        "format": manifest.get("format") == NULL_FORMAT,
+        "method": manifest.get("method") == scorer.method,
+        "version": manifest.get("embedding_version") == scorer.embedding_version,
+        "compounds": manifest.get("compounds_sha1") == _compounds_digest(scorer.compound_names),
+        "relations": manifest.get("treatment_relations") == relation_names,
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("Null model %s does not match loaded embeddings (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py null", path, ", ".join(stale))
+        return None
+
+    return NullModel(
+        path=path,
+        quantiles=np.load(path / "quantiles.npy"),
+        moments=np.load(path / "moments.npy"),
+        relation_names=relation_names,
+        manifest=manifest,
+    )
@@ -20,13 +20,18 @@ from __future__ import annotations
 
 import json
 import logging
-import sqlite3
+import threading
 import time
 from dataclasses import dataclass, asdict, field
 from pathlib import Path
 from typing import Optional
 
-from .scorer import DRKGScorer, KGResult
+import numpy as np
+
+from . import metrics
+from .drug_db import DrugDB
+from .scorer import KGPrediction
+from .registry import get_enrich_table, get_enricher, get_scorer
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +65,7 @@ class Candidate:
     kg_normalized: float = 0.0
     kg_rank: int = 0
     kg_relation: str = ""
+    kg_model_scores: Optional[dict[str, dict]] = None   # ensemble: per-model breakdown
 
     # Classification
     #   "dropped"    — Phase I-III, never approved
@@ -68,7 +74,10 @@ class Candidate:
     status: str = "novel"
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        d = asdict(self)
+        if self.kg_model_scores is None:
+            del d["kg_model_scores"]
+        return d
 
 
 @dataclass
@@ -83,6 +92,9 @@ class DiscoveryResult:
     treatment_relations_used: list[str]
     stats: dict = field(default_factory=dict)
     error: Optional[str] = None
+    next_cursor: Optional[int] = None    # pass back as cursor= for the next page
+    metrics: Optional[dict] = None       # per-stage timings / counters (see metrics.py)
+    embedding_version: Optional[str] = None   # scorer release the ranking came from
 
     def to_dict(self) -> dict:
         return {
@@ -93,6 +105,9 @@ class DiscoveryResult:
             "method": self.method,
             "stats": self.stats,
             "error": self.error,
+            "next_cursor": self.next_cursor,
+            "metrics": self.metrics,
+            "embedding_version": self.embedding_version,
         }
 
     @property
@@ -112,46 +127,61 @@ class DiscoveryResult:
         return [c for c in self.candidates if c.status == "novel"]
 
 
+@dataclass
+class CandidateMasks:
+    """
+    Per-compound class flags, aligned with scorer.compound_names.
+
+    Computed once from the enricher, so discovery can drop ineligible
+    compounds from the ranking before enriching anything.
+    """
+    dropped: np.ndarray                  # (n_compounds,) bool
+    withdrawn: np.ndarray
+    has_smiles: np.ndarray
+    has_chembl: np.ndarray
+
+    @property
+    def in_db(self) -> np.ndarray:
+        """Dropped or withdrawn — everything else is "novel"."""
+        return self.dropped | self.withdrawn
+
+    @classmethod
+    def from_table(cls, table) -> "CandidateMasks":
+        """Masks straight from an EnrichTable's columns (see enrich_table.py)."""
+        status = np.asarray(table.status)
+        return cls(
+            dropped=status == 1,
+            withdrawn=status == 2,
+            has_smiles=(status > 0) & table.has_value("smiles"),
+            has_chembl=(status > 0) & table.has_value("chembl_id"),
+        )
+
+    def eligible(self, include_novel: bool = True, require_smiles: bool = False) -> np.ndarray:
+        """Compounds discover_candidates() may return under these filters."""
+        keep = np.ones(len(self.dropped), dtype=bool) if include_novel else self.in_db
+        return keep & self.has_smiles if require_smiles else keep
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  DATABASE ENRICHER
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 class _DBEnricher:
-    """Loads dropped_drugs.db + optional kg_entity_lookup.json for cross-referencing."""
+    """Looks up dropped_drugs.db (on demand) + optional kg_entity_lookup.json for cross-referencing."""
 
     def __init__(self, db_path: str):
-        self._by_drugbank: dict[str, dict] = {}
-        self._by_chembl: dict[str, dict] = {}
-        self._by_name: dict[str, dict] = {}
+        self._db: Optional[DrugDB] = None
         self._kg_lookup: dict[str, dict] = {}  # Compound::X → {drug_name, chembl_id, ...}
-        self._withdrawn: set[str] = set()
         self._loaded = False
+        self._masks: Optional[tuple[list[str], CandidateMasks]] = None
+        self._masks_lock = threading.Lock()
 
         if not Path(db_path).exists():
             logger.warning("DB not found: %s", db_path)
             return
 
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-
-        for row in conn.execute(
-            "SELECT drug_name, chembl_id, drugbank_id, smiles, inchikey, "
-            "max_phase, molecule_type FROM dropped_drugs"
-        ):
-            entry = dict(row)
-            entry["status"] = "dropped"
-            name = (entry.get("drug_name") or "").lower().strip()
-            db_id = (entry.get("drugbank_id") or "").upper().strip()
-            ch_id = (entry.get("chembl_id") or "").upper().strip()
-            if db_id: self._by_drugbank[db_id] = entry
-            if ch_id: self._by_chembl[ch_id] = entry
-            if name:  self._by_name[name] = entry
-
-        for row in conn.execute("SELECT drug_name FROM withdrawn_drugs"):
-            if row["drug_name"]:
-                self._withdrawn.add(row["drug_name"].lower().strip())
-
-        conn.close()
+        # Rows are fetched per batch of candidates, never preloaded (see drug_db.py)
+        self._db = DrugDB(db_path)
 
         # Load PubChem-resolved lookup (created by resolve_all_compounds.py)
         lookup_path = Path(db_path).parent / "kg_entity_lookup.json"
@@ -165,43 +195,57 @@ class _DBEnricher:
                 logger.warning("Could not load entity lookup: %s", e)
 
         self._loaded = True
-        logger.info("DB enricher: %d by drugbank, %d by chembl, %d by name, %d kg_lookup",
-                     len(self._by_drugbank), len(self._by_chembl),
-                     len(self._by_name), len(self._kg_lookup))
+        logger.info("DB enricher: %s (indexed lookups), %d kg_lookup",
+                    db_path, len(self._kg_lookup))
 
     def enrich(self, drkg_entity: str) -> dict:
         """Look up a Compound:: entity. Returns {} if not found."""
+        return self.enrich_many([drkg_entity])[0]
+
+    def enrich_many(self, drkg_entities: list[str]) -> list[dict]:
+        """enrich() for a batch of entities, with one query per key kind."""
         if not self._loaded:
-            return {}
-        cid = drkg_entity.replace("Compound::", "").strip()
+            return [{} for _ in drkg_entities]
+        db = self._db
+        cids = [e.replace("Compound::", "").strip() for e in drkg_entities]
 
         # ── Direct DB lookups ──
-        entry = None
-        if cid.upper().startswith("DB"):
-            entry = self._by_drugbank.get(cid.upper())
-        elif cid.upper().startswith("CHEMBL"):
-            entry = self._by_chembl.get(cid.upper())
-        if not entry:
-            entry = self._by_name.get(cid.lower())
+        by_drugbank = db.by_drugbank(c.upper() for c in cids if c.upper().startswith("DB"))
+        by_chembl = db.by_chembl(c.upper() for c in cids if c.upper().startswith("CHEMBL"))
+        by_name = db.by_name(c.lower() for c in cids)
+        entries: list[Optional[dict]] = []
+        for cid in cids:
+            entry = None
+            if cid.upper().startswith("DB"):
+                entry = by_drugbank.get(cid.upper())
+            elif cid.upper().startswith("CHEMBL"):
+                entry = by_chembl.get(cid.upper())
+            if not entry:
+                entry = by_name.get(cid.lower())
+            entries.append(entry)
 
         # ── PubChem lookup fallback ──
         # If direct lookup failed, use the resolved entity lookup
-        if not entry and drkg_entity in self._kg_lookup:
-            lookup = self._kg_lookup[drkg_entity]
-            # Try to match via the resolved ChEMBL ID
+        fallback = {i: self._kg_lookup[e] for i, e in enumerate(drkg_entities)
+                    if not entries[i] and e in self._kg_lookup}
+        if fallback:
+            by_chembl = db.by_chembl((l.get("chembl_id") or "").upper().strip()
+                                     for l in fallback.values())
+            by_name = db.by_name(l["drug_name"].lower().strip()
+                                 for l in fallback.values() if l.get("drug_name"))
+        results: list[dict] = [{} for _ in drkg_entities]
+        for i, lookup in fallback.items():
+            # Try to match via the resolved ChEMBL ID, then the resolved drug name
             resolved_chembl = (lookup.get("chembl_id") or "").upper().strip()
-            if resolved_chembl and resolved_chembl in self._by_chembl:
-                entry = self._by_chembl[resolved_chembl]
-            # Try to match via the resolved drug name
+            if resolved_chembl and resolved_chembl in by_chembl:
+                entries[i] = by_chembl[resolved_chembl]
             elif lookup.get("drug_name"):
-                resolved_name = lookup["drug_name"].lower().strip()
-                if resolved_name in self._by_name:
-                    entry = self._by_name[resolved_name]
+                entries[i] = by_name.get(lookup["drug_name"].lower().strip())
 
             # If still no DB match but we have a resolved name,
             # return as "novel" with the resolved name (better than raw ID)
-            if not entry and lookup.get("drug_name"):
-                return {
+            if not entries[i] and lookup.get("drug_name"):
+                results[i] = {
                     "drug_name": lookup["drug_name"],
                     "chembl_id": lookup.get("chembl_id"),
                     "drugbank_id": lookup.get("drugbank_id"),
@@ -212,129 +256,202 @@ class _DBEnricher:
                     "inchikey": None,
                 }
 
-        if not entry:
-            return {}
-
         # Check withdrawn
-        name = (entry.get("drug_name") or "").lower().strip()
-        if name in self._withdrawn:
-            entry = dict(entry)
-            entry["status"] = "withdrawn"
-        return entry
+        names = [(e.get("drug_name") or "").lower().strip() if e else "" for e in entries]
+        withdrawn = db.withdrawn(names)
+        for i, entry in enumerate(entries):
+            if entry:
+                results[i] = dict(entry, status="withdrawn" if names[i] in withdrawn else "dropped")
+        return results
+
+    def masks(self, compound_names: list[str]) -> CandidateMasks:
+        """
+        Class masks for every compound, from one batched enrich pass.
+
+        Kept for the last compound list seen (the registry's scorer holds
+        the same list for its lifetime), so this runs once per process.
+        """
+        with self._masks_lock:
+            if self._masks is not None and self._masks[0] is compound_names:
+                return self._masks[1]
+            t0 = time.perf_counter()
+            n = len(compound_names)
+            m = CandidateMasks(*(np.zeros(n, dtype=bool) for _ in range(4)))
+            for i, info in enumerate(self.enrich_many(compound_names)):
+                if not info:
+                    continue
+                status = info.get("status", "dropped")
+                m.dropped[i] = status == "dropped"
+                m.withdrawn[i] = status == "withdrawn"
+                m.has_smiles[i] = bool(info.get("smiles"))
+                m.has_chembl[i] = bool(info.get("chembl_id"))
+            self._masks = (compound_names, m)
+            logger.info("Candidate masks for %d compounds in %.0fms (%d dropped, %d withdrawn)",
+                        n, (time.perf_counter() - t0) * 1000,
+                        int(m.dropped.sum()), int(m.withdrawn.sum()))
+            return m
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  MAIN FUNCTION
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+@metrics.instrumented("discover")
 def discover_candidates(
     disease: str,
     data_dir: str = "./data",
-    top_k: int = 100,
+    top_k: Optional[int] = None,
     max_candidates: int = 30,
     min_percentile: float = 75.0,
     include_novel: bool = True,
     require_smiles: bool = False,
+    cursor: int = 0,
 ) -> DiscoveryResult:
     """
     Discover drug repurposing candidates for a disease.
 
     1. Score ALL ~24K compounds in DRKG using RotatE embeddings
-    2. Take top-k
-    3. Cross-reference each against dropped_drugs.db
-    4. Classify as dropped / withdrawn / novel
-    5. Return enriched candidates
+    2. Mask out compounds the filters exclude (novel / no SMILES), using
+       class masks precomputed from dropped_drugs.db
+    3. Take the first max_candidates eligible ranks from `cursor`
+    4. Enrich just those and classify as dropped / withdrawn / novel
+
+    top_k=None ranks as deep as needed; an int caps the ranking at that
+    rank. kg_rank is always the rank among ALL compounds. The full score
+    vector stays in the scorer's LRU, so fetching the next page with
+    cursor=result.next_cursor costs only enrichment. With a quantized scan,
+    every rank a page walks is rescored exactly first, so candidates, ranks
+    and scores match the full-precision ranking.
+    next_cursor is None once the ranking (or min_percentile) is exhausted.
+    Cursors index one ranking: if embedding_version differs between pages,
+    the embeddings were swapped in between and paging should restart.
     """
     t0 = time.perf_counter()
-    data = Path(data_dir)
 
-    # Load scorer
-    scorer = DRKGScorer(
-        embeddings_dir=str(data / "embeddings"),
-        db_path=str(data / "database" / "dropped_drugs.db"),
-    )
+    # Shared scorer (loaded once per process, see registry.py)
+    scorer = get_scorer(data_dir)
 
-    # Score ALL compounds
-    kg = scorer.score_disease(disease, top_k=top_k)
-    if kg.error:
+    # Score ALL compounds (or reuse the cached vector)
+    scores, err = scorer.disease_scores(disease)
+    if err is None and scores.n_valid == 0:
+        err = scorer.score_disease(disease, top_k=0)   # carries the "no valid scores" error
+    if err is not None:
         return DiscoveryResult(
             disease=disease, candidates=[],
             total_compounds_scored=0, timing_ms=0,
             method=scorer.method, disease_entities_used=[],
-            treatment_relations_used=[], error=kg.error,
+            treatment_relations_used=[], error=err.error,
+            embedding_version=scorer.embedding_version,
         )
 
-    # Enrich from database
-    enricher = _DBEnricher(str(data / "database" / "dropped_drugs.db"))
+    # Class masks over compound rows: prebuilt table, else one enricher pass
+    table = get_enrich_table(data_dir)
+    if table is not None and table.compound_pos is scorer.compound_pos:
+        masks = CandidateMasks.from_table(table)
+        enrich_rows = table.records
+    else:
+        enricher = get_enricher(data_dir)
+        masks = enricher.masks(scorer.compound_names)
+        enrich_rows = lambda rows: enricher.enrich_many([scorer.compound_names[r] for r in rows])
 
-    candidates: list[Candidate] = []
     stats = {"dropped": 0, "withdrawn": 0, "novel": 0,
              "skipped_percentile": 0, "skipped_smiles": 0}
 
-    for pred in kg.predictions:
-        if pred.percentile < min_percentile:
-            stats["skipped_percentile"] += 1
-            continue
+    n = len(scores.best_scores)
+    pos = max(cursor, 0)
+    eligible = masks.eligible(include_novel, require_smiles)
+
+    while True:
+        depth = min(n if top_k is None else top_k, scores.n_ranked)
+        with metrics.stage("filter"):
+            order = scores.order()
+            # Percentile only falls with rank: the floor is one cut position.
+            pctls = scores.percentiles(scores.best_scores[order[:depth]])
+            floor = int(np.searchsorted(-pctls, -min_percentile, side="right"))
+            limit = min(depth, floor)
+
+            span = order[pos:limit] if pos < limit else order[:0]
+            hits = np.flatnonzero(eligible[span]) + pos     # ranked positions
+        take = hits[:max_candidates]
+        more = len(hits) > len(take)
+        end = int(take[-1]) + 1 if more else limit       # how far this page walked
+
+        # A quantized scan is exact only down to exact_depth: if this page
+        # walked deeper (filtered ranks, a later cursor), rescore that deep.
+        if scores.exact_depth is None or scores.exact_depth >= end:
+            break
+        scores, _ = scorer.disease_scores(disease, min_exact=min(max(end, 2 * scores.exact_depth), n))
+    metrics.count("eligible", len(hits))
 
-        db = enricher.enrich(pred.drug_entity)
-
-        if db:
-            c = Candidate(
-                drug_name=db.get("drug_name") or pred.drug_name,
-                drkg_entity=pred.drug_entity,
-                chembl_id=db.get("chembl_id"),
-                drugbank_id=db.get("drugbank_id"),
-                smiles=db.get("smiles") or None,
-                inchikey=db.get("inchikey"),
-                max_phase=db.get("max_phase"),
-                molecule_type=db.get("molecule_type"),
-                kg_score=pred.score,
-                kg_percentile=pred.percentile,
-                kg_z_score=pred.z_score,
-                kg_normalized=pred.normalized_score,
-                kg_rank=pred.rank,
-                kg_relation=pred.relation_used,
-                status=db.get("status", "dropped"),
-            )
-        else:
-            if not include_novel:
-                continue
-            cid = pred.drug_entity.replace("Compound::", "")
-            c = Candidate(
-                drug_name=pred.drug_name,
-                drkg_entity=pred.drug_entity,
-                drugbank_id=cid.upper() if cid.startswith("DB") else None,
-                kg_score=pred.score,
-                kg_percentile=pred.percentile,
-                kg_z_score=pred.z_score,
-                kg_normalized=pred.normalized_score,
-                kg_rank=pred.rank,
-                kg_relation=pred.relation_used,
-                status="novel",
-            )
-
-        # Filter novel AFTER enrichment (enricher can return status="novel")
-        if not include_novel and c.status == "novel":
-            continue
+    with metrics.stage("enrich"):
+        infos = enrich_rows(order[take])
+    metrics.count("enriched", len(take))
 
-        if require_smiles and not c.smiles:
-            stats["skipped_smiles"] += 1
+    candidates: list[Candidate] = []
+    for pred, info in zip(scorer.predictions_at(scores, take), infos):
+        c = _make_candidate(pred, info, include_novel)
+        if c is None:
             continue
-
         stats[c.status] = stats.get(c.status, 0) + 1
         candidates.append(c)
-        if len(candidates) >= max_candidates:
-            break
+
+    if require_smiles and end > pos:
+        walked = order[pos:end]
+        missing = masks.eligible(include_novel) & ~masks.has_smiles
+        stats["skipped_smiles"] = int(np.count_nonzero(missing[walked]))
+    if not more and floor < depth:
+        stats["skipped_percentile"] = depth - max(floor, pos)
 
     elapsed = (time.perf_counter() - t0) * 1000
 
     return DiscoveryResult(
         disease=disease,
         candidates=candidates,
-        total_compounds_scored=kg.total_compounds_scored,
+        total_compounds_scored=n,
         timing_ms=round(elapsed, 1),
-        method=kg.method,
-        disease_entities_used=kg.disease_entities_used,
-        treatment_relations_used=kg.treatment_relations_used,
+        method=scorer.method_of(scores),
+        disease_entities_used=scores.disease_entities,
+        treatment_relations_used=scores.treatment_relations,
         stats=stats,
+        next_cursor=end if more else None,
+        embedding_version=scorer.embedding_version,
+    )
+
+
+def _make_candidate(pred: KGPrediction, db: dict, include_novel: bool) -> Optional[Candidate]:
+    """KG prediction + DB row → Candidate (None if novel and novel is excluded)."""
+    if db:
+        return Candidate(
+            drug_name=db.get("drug_name") or pred.drug_name,
+            drkg_entity=pred.drug_entity,
+            chembl_id=db.get("chembl_id"),
+            drugbank_id=db.get("drugbank_id"),
+            smiles=db.get("smiles") or None,
+            inchikey=db.get("inchikey"),
+            max_phase=db.get("max_phase"),
+            molecule_type=db.get("molecule_type"),
+            kg_score=pred.score,
+            kg_percentile=pred.percentile,
+            kg_z_score=pred.z_score,
+            kg_normalized=pred.normalized_score,
+            kg_rank=pred.rank,
+            kg_relation=pred.relation_used,
+            kg_model_scores=pred.model_scores,
+            status=db.get("status", "dropped"),
+        )
+    if not include_novel:
+        return None
+    cid = pred.drug_entity.replace("Compound::", "")
+    return Candidate(
+        drug_name=pred.drug_name,
+        drkg_entity=pred.drug_entity,
+        drugbank_id=cid.upper() if cid.startswith("DB") else None,
+        kg_score=pred.score,
+        kg_percentile=pred.percentile,
+        kg_z_score=pred.z_score,
+        kg_normalized=pred.normalized_score,
+        kg_rank=pred.rank,
+        kg_relation=pred.relation_used,
+        kg_model_scores=pred.model_scores,
+        status="novel",
     )
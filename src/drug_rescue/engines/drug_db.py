@@ -0,0 +1,255 @@
+"""
+drug_db.py — Indexed, on-demand lookups in dropped_drugs.db
+=============================================================
+
+_DBEnricher and DrugNameResolver used to read the whole dropped_drugs
+table (and withdrawn_drugs) into Python dicts in every process, so
+memory and startup grew with the database. DrugDB instead asks sqlite
+for just the keys it needs:
+
+    db = DrugDB("data/database/dropped_drugs.db")
+    db.by_drugbank(["DB00331", "DB00945"])   # {"DB00331": {...row...}, ...}
+    db.by_name(["metformin"])
+    db.withdrawn(["rofecoxib"])              # {"rofecoxib"}
+
+Keys are normalised exactly as the old dicts were, in Python (ids
+.upper().strip(), names .lower().strip()); when several rows share a key
+the last one wins, as before, and drug_ids() keeps the last non-empty
+DrugBank / ChEMBL id per name, as the resolver's dicts did. Each call is
+one batched `IN (...)` query per uncached key set, with an LRU (misses
+included) in front. Connections are read-only and one per thread.
+
+Index once, after the database changes:
+    python scripts/build_kg.py db --data-dir ./data
+
+That stores the normalised keys in *_key columns (sqlite's lower() / trim()
+are ASCII- and space-only, so they cannot be computed in SQL), indexes
+them, and switches the file to WAL so readers never block the writer.
+A trigger clears a row's key when its source column is updated; such rows,
+and every row of a database that was never indexed, are matched by
+normalising in Python during the query (a table scan, not a preload).
+On a read-only data directory the file is opened immutable, as neither
+the WAL nor its shared-memory file can be created there.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Max cached (kind, key) lookups, hits and misses together.
+DRUG_DB_CACHE_SIZE = 8192
+
+# Keys per IN (...) query (under SQLITE_MAX_VARIABLE_NUMBER on old builds).
+BATCH_SIZE = 500
+
+ROW_COLUMNS = ("drug_name", "chembl_id", "drugbank_id", "smiles", "inchikey",
+               "max_phase", "molecule_type")
+
+
+def id_key(value: Optional[str]) -> Optional[str]:
+    """DrugBank / ChEMBL id as the old dicts keyed it (None if empty)."""
+    return (value or "").upper().strip() or None
+
+
+def name_key(value: Optional[str]) -> Optional[str]:
+    """Drug name as the old dicts keyed it (None if empty)."""
+    return (value or "").lower().strip() or None
+
+
+def _sql_name(norm: Callable) -> str:
+    """Name a normaliser is registered under on DrugDB's connections."""
+    return "py_" + norm.__name__
+
+
+# kind → (table, source column, key column, normaliser).
+KEYS: dict[str, tuple[str, str, str, Callable[[Optional[str]], Optional[str]]]] = {
+    "drugbank": ("dropped_drugs", "drugbank_id", "drugbank_key", id_key),
+    "chembl": ("dropped_drugs", "chembl_id", "chembl_key", id_key),
+    "name": ("dropped_drugs", "drug_name", "name_key", name_key),
+    "withdrawn": ("withdrawn_drugs", "drug_name", "name_key", name_key),
+}
+
+INDEXES = {
+    "idx_dropped_drugbank_key": KEYS["drugbank"],
+    "idx_dropped_chembl_key": KEYS["chembl"],
+    "idx_dropped_name_key": KEYS["name"],
+    "idx_withdrawn_name_key": KEYS["withdrawn"],
+}
+
+
+def index_database(db_path: str) -> list[str]:
+    """
+    (Re)compute the *_key columns, index them and enable WAL.
+    Returns the names of indexes that did not exist yet.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        have = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        created = []
+        for name, (table, src, key, norm) in INDEXES.items():
+            if table not in tables:
+                continue
+            if key not in {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {key} TEXT")
+            rows = conn.execute(f"SELECT rowid, {src} FROM {table}").fetchall()
+            conn.executemany(f"UPDATE {table} SET {key} = ? WHERE rowid = ?",
+                             [(norm(v), rowid) for rowid, v in rows])
+            # Writers that don't know about the key leave it NULL: matched in Python.
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_{key}_stale "
+                         f"AFTER UPDATE OF {src} ON {table} BEGIN "
+                         f"UPDATE {table} SET {key} = NULL WHERE rowid = NEW.rowid; END")
+            if name not in have:
+                conn.execute(f"CREATE INDEX {name} ON {table} ({key})")
+                created.append(name)
+        conn.commit()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("ANALYZE")
+        return created
+    finally:
+        conn.close()
+
+
+class DrugDB:
+    """Batched, cached, read-only lookups in dropped_drugs.db."""
+
+    def __init__(self, db_path: str, cache_size: int = DRUG_DB_CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], list[dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # WAL needs -wal / -shm files next to the database; without write
+        # access to the directory nothing can change the file either.
+        self._uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        if not os.access(Path(db_path).resolve().parent, os.W_OK):
+            self._uri += "&immutable=1"
+
+        conn = self._conn()   # fail here, not on the first query
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "dropped_drugs" not in tables:
+            raise sqlite3.OperationalError(f"no dropped_drugs table in {db_path}")
+        # kind → whether the table has its key column (None: no such table)
+        self._keyed: dict[str, Optional[bool]] = {}
+        for kind, (table, _, key, _) in KEYS.items():
+            cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+            self._keyed[kind] = (key in cols) if table in tables else None
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        missing = sorted(n for n, (table, *_) in INDEXES.items()
+                         if table in tables and n not in indexes)
+        if missing and db_path not in _warned:
+            _warned.add(db_path)
+            logger.warning("%s has no lookup indexes (%s) — lookups scan the table. "
+                           "Index with: python scripts/build_kg.py db", db_path, ", ".join(missing))
+
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's read-only connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._uri, uri=True)
+            conn.execute("PRAGMA query_only = ON")
+            for *_, norm in KEYS.values():
+                conn.create_function(_sql_name(norm), 1, norm, deterministic=True)
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection (they reopen on next use)."""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass   # created in another, still-running thread
+        self._local = threading.local()
+
+    def _lookup(self, kind: str, keys: Iterable[str]) -> dict[str, list[dict]]:
+        """{key: matching rows in table order} for every key, from the LRU or batched queries."""
+        out: dict[str, list[dict]] = {}
+        todo: list[str] = []
+        with self._cache_lock:
+            for key in dict.fromkeys(k for k in keys if k):   # empty keys never match
+                hit = self._cache.get((kind, key), _MISSING)
+                if hit is _MISSING:
+                    todo.append(key)
+                else:
+                    self._cache.move_to_end((kind, key))
+                    out[key] = hit
+
+        if todo:
+            found = self._query(kind, todo)
+            with self._cache_lock:
+                for key in todo:
+                    out[key] = found.get(key, [])
+                    self._cache[(kind, key)] = out[key]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return out
+
+    def _query(self, kind: str, keys: list[str]) -> dict[str, list[dict]]:
+        table, src, key, norm = KEYS[kind]
+        keyed = self._keyed[kind]
+        if keyed is None:
+            return {}
+        columns = ("drug_name",) if kind == "withdrawn" else ROW_COLUMNS
+        cols = ", ".join(columns)
+        # Indexed keys, plus rows whose key is unset (never indexed, or
+        # cleared by an update since), normalised in Python as they are read.
+        fn = f"{_sql_name(norm)}({src})"
+        where = [f"{key} IN ({{}})", f"{key} IS NULL AND {fn} IN ({{}})"] if keyed else [f"{fn} IN ({{}})"]
+        conn = self._conn()
+        found: dict[str, list[tuple[int, dict]]] = {}
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            marks = ", ".join("?" * len(batch))
+            for cond in where:
+                sql = f"SELECT rowid, {fn}, {cols} FROM {table} WHERE {cond.format(marks)}"
+                for row in conn.execute(sql, batch):
+                    found.setdefault(row[1], []).append((row[0], dict(zip(columns, row[2:]))))
+        return {k: [r for _, r in sorted(rows, key=lambda x: x[0])] for k, rows in found.items()}
+
+    def by_drugbank(self, ids: Iterable[str]) -> dict[str, dict]:
+        """Normalised DrugBank id → row (ids not found are left out)."""
+        # Later rows overwrite earlier ones, like the old dicts.
+        return {k: rows[-1] for k, rows in self._lookup("drugbank", ids).items() if rows}
+
+    def by_chembl(self, ids: Iterable[str]) -> dict[str, dict]:
+        return {k: rows[-1] for k, rows in self._lookup("chembl", ids).items() if rows}
+
+    def by_name(self, names: Iterable[str]) -> dict[str, dict]:
+        return {k: rows[-1] for k, rows in self._lookup("name", names).items() if rows}
+
+    def drug_ids(self, names: Iterable[str]) -> dict[str, dict]:
+        """
+        Normalised name → {"drugbank_id", "chembl_id"}: per id, the last row
+        of that name that has one (a later row without an id keeps it).
+        """
+        out = {}
+        for k, rows in self._lookup("name", names).items():
+            ids = {}
+            for col in ("drugbank_id", "chembl_id"):
+                ids[col] = next((r[col] for r in reversed(rows) if r[col]), None)
+            if any(ids.values()):
+                out[k] = ids
+        return out
+
+    def withdrawn(self, names: Iterable[str]) -> set[str]:
+        """The names (lower-cased, trimmed) that are in withdrawn_drugs."""
+        return {k for k, rows in self._lookup("withdrawn", names).items() if rows}
+
+
+_MISSING = object()
+_warned: set[str] = set()    # db paths already warned about missing indexes
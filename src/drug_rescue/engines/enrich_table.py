@@ -0,0 +1,271 @@
+"""
+enrich_table.py — Precompiled columnar enrichment table
+=========================================================
+
+_DBEnricher.enrich() does string munging and up to five dict lookups per
+candidate (drugbank id, ChEMBL id, name, kg_entity_lookup.json fallback,
+withdrawn set), and the MCP tools parse kg_entity_lookup.json and
+drugbank_to_name.json again for display names. None of it depends on
+the query, so this build step resolves every Compound:: entity once and
+stores the answers as columns aligned with the scorer's compound order:
+
+    data/database/enrich_table/
+        manifest.json   columns, compound digest, source file stamps
+        status.npy      (n,) uint8 — 0 unknown, then STATUS_CODES
+        max_phase.npy   (n,) int16 — -1 = NULL
+        strings.npy     (bytes,) uint8 — every string value, utf-8
+        offsets.npy     (n_columns, n + 1) int64 — value i of column c is
+                        strings[offsets[c, i]:offsets[c, i + 1]]
+        nulls.npy       (n_columns, n) bool — NULL (vs. empty string)
+
+Enrichment is then indexing by compound row, and nothing is parsed at
+runtime. discover_candidates() uses the table when it is present and
+matches the loaded compounds; otherwise it falls back to _DBEnricher.
+
+Build:
+    python scripts/build_kg.py enrich --data-dir ./data
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .score_matrix import _compounds_digest
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+ENRICH_DIRNAME = "enrich_table"
+ENRICH_FORMAT = 1
+
+# Row status; code 0 means enrich() found nothing ({}).
+STATUS_CODES = ("dropped", "withdrawn", "novel")
+
+# Fields of an enrich() record, then the tools' display name.
+RECORD_COLUMNS = ("drug_name", "chembl_id", "drugbank_id", "smiles", "inchikey", "molecule_type")
+STRING_COLUMNS = RECORD_COLUMNS + ("display_name",)
+
+# Files (relative to data_dir) the table is built from.
+SOURCE_FILES = (
+    "database/dropped_drugs.db",
+    "database/kg_entity_lookup.json",
+    "drugbank_to_name.json",
+)
+
+
+def source_stamps(data_dir: Path) -> dict[str, list[int]]:
+    """{relpath: [size, mtime_ns]} for the source files that exist."""
+    stamps = {}
+    for rel in SOURCE_FILES:
+        p = data_dir / rel
+        if p.exists():
+            st = p.stat()
+            stamps[rel] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def read_name_lookup(data_dir: Path) -> dict[str, str]:
+    """
+    Compound:: entity → display name from kg_entity_lookup.json, then
+    drugbank_to_name.json for entities the first one does not name.
+    """
+    lookup: dict[str, str] = {}
+
+    p1 = data_dir / "database" / "kg_entity_lookup.json"
+    if p1.exists():
+        try:
+            with open(p1) as f:
+                for entity, info in json.load(f).items():
+                    if info.get("drug_name"):
+                        lookup[entity] = info["drug_name"]
+        except Exception:
+            pass
+
+    p2 = data_dir / "drugbank_to_name.json"
+    if p2.exists():
+        try:
+            with open(p2) as f:
+                for db_id, name in json.load(f).items():
+                    lookup.setdefault(f"Compound::{db_id}", name)
+        except Exception:
+            pass
+    return lookup
+
+
+@dataclass
+class EnrichTable:
+    """A loaded enrichment table. Arrays are read-only memory maps."""
+    path: Path
+    status: np.ndarray               # (n,) uint8
+    max_phase: np.ndarray            # (n,) int16
+    strings: np.ndarray              # (bytes,) uint8
+    offsets: np.ndarray              # (n_columns, n + 1) int64
+    nulls: np.ndarray                # (n_columns, n) bool
+    compound_pos: dict[str, int]     # scorer's Compound:: name → row
+    manifest: dict
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def _string(self, col: int, row: int) -> Optional[str]:
+        if self.nulls[col, row]:
+            return None
+        a, b = self.offsets[col, row], self.offsets[col, row + 1]
+        return self.strings[a:b].tobytes().decode("utf-8")
+
+    def column(self, name: str, rows: np.ndarray) -> list[Optional[str]]:
+        """One string column at the given compound rows."""
+        col = STRING_COLUMNS.index(name)
+        return [self._string(col, int(r)) for r in rows]
+
+    def has_value(self, name: str) -> np.ndarray:
+        """(n,) bool — column is neither NULL nor empty."""
+        col = STRING_COLUMNS.index(name)
+        return ~self.nulls[col] & (np.diff(self.offsets[col]) > 0)
+
+    def records(self, rows: np.ndarray) -> list[dict]:
+        """enrich()-style dicts for compound rows ({} where nothing matched)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        status = self.status[rows]
+        phase = self.max_phase[rows]
+        out = []
+        for i, r in enumerate(rows):
+            if status[i] == 0:
+                out.append({})
+                continue
+            rec = {name: self._string(c, r) for c, name in enumerate(RECORD_COLUMNS)}
+            rec["max_phase"] = int(phase[i]) if phase[i] >= 0 else None
+            rec["status"] = STATUS_CODES[status[i] - 1]
+            out.append(rec)
+        return out
+
+    def display_name(self, entity: str) -> Optional[str]:
+        """Name from the lookup files for a Compound:: entity, if any."""
+        row = self.compound_pos.get(entity)
+        if row is None:
+            return None
+        return self._string(STRING_COLUMNS.index("display_name"), row)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_enrich_table(data_dir: str, compound_names: list[str],
+                       out_dir: Optional[str] = None) -> Path:
+    """Resolve every compound through _DBEnricher once and write the columns."""
+    from .discover import _DBEnricher
+
+    t0 = time.perf_counter()
+    root = Path(data_dir)
+    out = Path(out_dir) if out_dir else root / "database" / ENRICH_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    enricher = _DBEnricher(str(root / "database" / "dropped_drugs.db"))
+    names = read_name_lookup(root)
+
+    n, n_cols = len(compound_names), len(STRING_COLUMNS)
+    status = np.zeros(n, dtype=np.uint8)
+    max_phase = np.full(n, -1, dtype=np.int16)
+    offsets = np.zeros((n_cols, n + 1), dtype=np.int64)
+    nulls = np.ones((n_cols, n), dtype=bool)
+    values: list[list[bytes]] = [[] for _ in range(n_cols)]
+
+    for i, (entity, rec) in enumerate(zip(compound_names, enricher.enrich_many(compound_names))):
+        if rec:
+            status[i] = STATUS_CODES.index(rec.get("status", "dropped")) + 1
+            if rec.get("max_phase") is not None:
+                max_phase[i] = int(rec["max_phase"])
+        row = [rec.get(c) for c in RECORD_COLUMNS] + [names.get(entity)]
+        for c, v in enumerate(row):
+            nulls[c, i] = v is None
+            values[c].append(b"" if v is None else str(v).encode("utf-8"))
+
+    blobs, base = [], 0
+    for c in range(n_cols):
+        lengths = np.fromiter((len(v) for v in values[c]), dtype=np.int64, count=n)
+        offsets[c, 0] = base
+        np.cumsum(lengths, out=offsets[c, 1:])
+        offsets[c, 1:] += base
+        base = int(offsets[c, -1])
+        blobs.append(b"".join(values[c]))
+    strings = np.frombuffer(b"".join(blobs) or b"\0", dtype=np.uint8)   # never an empty map
+
+    # Manifest is removed first and written last: a half-built table never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "status.npy", status)
+    np.save(out / "max_phase.npy", max_phase)
+    np.save(out / "strings.npy", strings)
+    np.save(out / "offsets.npy", offsets)
+    np.save(out / "nulls.npy", nulls)
+    manifest = {
+        "format": ENRICH_FORMAT,
+        "n_compounds": n,
+        "columns": list(STRING_COLUMNS),
+        "compounds_sha1": _compounds_digest(compound_names),
+        "sources": source_stamps(root),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built enrichment table (%d compounds, %d matched) at %s in %.1fs",
+                n, int(np.count_nonzero(status)), out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_enrich_table(data_dir: str, scorer: "DRKGScorer") -> Optional[EnrichTable]:
+    """
+    Memory-map the enrichment table under data_dir/database.
+
+    Returns None unless it was built from the current database / lookup
+    files for the scorer's compound order.
+    """
+    root = Path(data_dir)
+    path = root / "database" / ENRICH_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable enrichment table manifest %s: %s", manifest_path, e)
+        return None
+
+    checks = {
+        "format": manifest.get("format") == ENRICH_FORMAT,
+        "columns": manifest.get("columns") == list(STRING_COLUMNS),
+        "sources": manifest.get("sources") == source_stamps(root),
+        "compounds": manifest.get("compounds_sha1") == _compounds_digest(scorer.compound_names),
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("Enrichment table %s is out of date (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py enrich", path, ", ".join(stale))
+        return None
+
+    return EnrichTable(
+        path=path,
+        status=np.load(path / "status.npy", mmap_mode="r"),
+        max_phase=np.load(path / "max_phase.npy", mmap_mode="r"),
+        strings=np.load(path / "strings.npy", mmap_mode="r"),
+        offsets=np.load(path / "offsets.npy", mmap_mode="r"),
+        nulls=np.load(path / "nulls.npy", mmap_mode="r"),
+        compound_pos=scorer.compound_pos,
+        manifest=manifest,
+    )
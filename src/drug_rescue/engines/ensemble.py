@@ -0,0 +1,284 @@
+"""
+ensemble.py — Second embedding model for RotatE + TransE ensembles
+===================================================================
+
+DRKG ships both RotatE and TransE embeddings; the scorer ranks with one
+(RotatE when present). With ensemble="rank" or "zscore" it also holds
+the other one — the partner — and fuses the two models' best-pair
+scores per compound:
+
+    rank    mean of each model's percentile rank (share of compounds
+            scored at or below), insensitive to the models' scales
+    zscore  mean of each model's z-score
+
+The partner costs one extra scan over the compounds per query (chunked
+and threaded like the primary one); fusion itself is a sort per model.
+
+Partner rows are aligned to the scorer's entity rows, so one row index
+addresses both models. Prebuilt, the partner is a pair of float32
+memory maps (compound rows first when the scorer uses the bundle):
+
+    data/embeddings/ensemble/
+        manifest.json         format, method, layout, embedding version
+        entity_emb.npy        float32, rows in the scorer's entity order
+        relation_emb.npy      float32, rows in the scorer's relation order
+
+Build:
+    python scripts/build_kg.py ensemble --data-dir ./data
+
+Without it the partner is read from the raw .npy files (memory-mapped
+when they are real-valued; complex RotatE needs one conversion).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .score_matrix import _compounds_digest
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+ENSEMBLE_DIRNAME = "ensemble"
+ENSEMBLE_FORMAT = 1
+
+# Ways to combine the per-model score vectors (see fuse).
+FUSIONS = ("rank", "zscore")
+
+# Raw (entity, relation) files per model, relative to the embeddings dir.
+MODEL_FILES = {
+    "RotatE": ("rotate_entity_embeddings.npy", "rotate_relation_embeddings.npy"),
+    "TransE": ("transe_DRKG_TransE_l2_entity.npy", "transe_DRKG_TransE_l2_relation.npy"),
+}
+
+
+@dataclass
+class PartnerModel:
+    """
+    The second model. Same attribute names as the scorer's own embeddings
+    (method, complex_dim, relation_emb, compound_embs), so the scorer's
+    scoring math runs on either.
+    """
+    method: str
+    complex_dim: int
+    entity_emb: np.ndarray
+    relation_emb: np.ndarray
+    compound_embs: np.ndarray
+    rows: Optional[np.ndarray] = None   # scorer entity row → entity_emb row (None: same rows)
+    path: Optional[Path] = None         # prebuilt artifact, None when read from raw files
+    manifest: dict = field(default_factory=dict)
+
+    def entity(self, rows) -> np.ndarray:
+        """Embeddings of scorer entity rows (an int or an index array)."""
+        return self.entity_emb[rows if self.rows is None else self.rows[rows]]
+
+
+def partner_method(method: str) -> str:
+    return "TransE" if method == "RotatE" else "RotatE"
+
+
+def fuse(vectors: list[np.ndarray], fusion: str) -> np.ndarray:
+    """
+    One fused score per column from per-model score vectors (-inf = not
+    scored). Only columns every model scored are fused; the rest stay
+    -inf. Percentile ranks and z-scores are taken over those columns.
+    """
+    if fusion not in FUSIONS:
+        raise ValueError(f"Unknown fusion {fusion!r}. Expected one of {FUSIONS}")
+    stacked = np.stack([np.asarray(v, dtype=np.float64) for v in vectors])
+    valid = np.all(np.isfinite(stacked), axis=0)
+    out = np.full(stacked.shape[1], -np.inf, dtype=np.float64)
+    m = int(np.count_nonzero(valid))
+    if m == 0:
+        return out
+
+    acc = np.zeros(m, dtype=np.float64)
+    for v in stacked[:, valid]:
+        if fusion == "rank":
+            acc += np.searchsorted(np.sort(v), v, side="right") / m
+        else:
+            acc += (v - v.mean()) / max(float(v.std()), 1e-8)
+    out[valid] = acc / len(stacked)
+    return out
+
+
+def _layout(scorer: "DRKGScorer") -> dict:
+    """What the entity / relation rows are: must match between build and load."""
+    return {
+        "bundle": scorer.bundle is not None,
+        "n_entities": len(scorer.entity_to_idx),
+        "n_relations": len(scorer.relation_to_idx),
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+    }
+
+
+def _real_layout(arr: np.ndarray) -> np.ndarray:
+    """[real | imag] float32 for complex arrays; real arrays unchanged (maps stay maps)."""
+    if np.iscomplexobj(arr):
+        return np.concatenate([arr.real, arr.imag], axis=1).astype(np.float32)
+    return arr
+
+
+def _raw_rows(scorer: "DRKGScorer") -> Optional[np.ndarray]:
+    """
+    Raw-file row of every scorer entity row, or None when the scorer
+    already uses the raw rows. Raw models share one ID map
+    (entity_to_idx.json, else transe_entities.tsv).
+    """
+    if scorer.bundle is None:
+        return None
+    d = scorer.embeddings_dir
+    json_idx = d / "entity_to_idx.json"
+    if json_idx.exists():
+        with open(json_idx) as f:
+            lookup = json.load(f)
+    else:
+        with open(d / "transe_entities.tsv") as f:
+            lookup = {line.strip(): i for i, line in enumerate(f)}
+    names = list(scorer.entity_to_idx)
+    return np.fromiter((lookup[n] for n in names), dtype=np.int64, count=len(names))
+
+
+def read_partner(scorer: "DRKGScorer") -> Optional[PartnerModel]:
+    """
+    The partner from the raw .npy files, or None if they are missing or the
+    release being served was built from other raw files.
+    """
+    method = partner_method(scorer.method)
+    ent_path, rel_path = (scorer.embeddings_dir / f for f in MODEL_FILES[method])
+    if not (ent_path.exists() and rel_path.exists()):
+        return None
+    if scorer.bundle is not None and not scorer.bundle.sources_current:
+        logger.warning("Raw %s files may be from another training run than release %s "
+                       "(raw embeddings changed since it was built) — no ensemble",
+                       method, scorer.bundle.version)
+        return None
+
+    entity_emb = _real_layout(np.load(ent_path, mmap_mode="r"))
+    relation_emb = _real_layout(np.load(rel_path, mmap_mode="r"))
+    try:
+        rows = _raw_rows(scorer)
+    except (OSError, KeyError) as e:
+        logger.warning("Cannot align %s rows with the bundle (%s) — no ensemble", method, e)
+        return None
+    n_rows = int(rows.max()) + 1 if rows is not None and len(rows) else len(scorer.entity_emb)
+    if len(entity_emb) < n_rows or len(relation_emb) != len(scorer.relation_emb):
+        logger.warning("%s embeddings %s / %s do not cover the scorer's rows — no ensemble",
+                       method, entity_emb.shape, relation_emb.shape)
+        return None
+
+    idx = scorer.compound_indices if rows is None else rows[scorer.compound_indices]
+    return PartnerModel(
+        method=method,
+        complex_dim=entity_emb.shape[1] // 2 if method == "RotatE" else 0,
+        entity_emb=entity_emb,
+        relation_emb=relation_emb,
+        compound_embs=np.asarray(entity_emb[idx]),
+        rows=rows,
+    )
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_partner(scorer: "DRKGScorer", out_dir: Optional[str] = None) -> Path:
+    """Write the partner model as float32 arrays in the scorer's row order."""
+    t0 = time.perf_counter()
+    partner = read_partner(scorer)
+    if partner is None:
+        raise FileNotFoundError(
+            f"No usable {partner_method(scorer.method)} embeddings in {scorer.embeddings_dir} "
+            f"to pair with {scorer.method}")
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / ENSEMBLE_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    n = len(scorer.entity_to_idx)
+    rows = partner.rows if partner.rows is not None else np.arange(n)
+
+    # Manifest is removed first and written last: a half-built partner never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "entity_emb.npy",
+            np.ascontiguousarray(partner.entity_emb[rows], dtype=np.float32))
+    np.save(out / "relation_emb.npy",
+            np.ascontiguousarray(partner.relation_emb, dtype=np.float32))
+    manifest = {
+        "format": ENSEMBLE_FORMAT,
+        "method": partner.method,
+        "primary": scorer.method,
+        "complex_dim": partner.complex_dim,
+        "dtype": "float32",
+        "layout": _layout(scorer),
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built %s ensemble partner for %s (%d entities) at %s in %.1fs",
+                partner.method, scorer.method, n, out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_partner(scorer: "DRKGScorer") -> Optional[PartnerModel]:
+    """
+    Memory-map the prebuilt partner under the scorer's embeddings dir, or
+    read it from the raw files if it is missing or was built for other
+    rows / another embedding version. None if the other model's files do not exist.
+    """
+    path = scorer.embeddings_dir / ENSEMBLE_DIRNAME
+    manifest_path = path / "manifest.json"
+    manifest = None
+    if manifest_path.exists():
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning("Unreadable ensemble manifest %s: %s", manifest_path, e)
+
+    if manifest is not None:
+        checks = {
+            "format": manifest.get("format") == ENSEMBLE_FORMAT,
+            "method": manifest.get("method") == partner_method(scorer.method),
+            "version": manifest.get("embedding_version") == scorer.embedding_version,
+            "layout": manifest.get("layout") == _layout(scorer),
+        }
+        stale = [k for k, ok in checks.items() if not ok]
+        if not stale:
+            entity_emb = np.load(path / "entity_emb.npy", mmap_mode="r")
+            if scorer.bundle is not None:
+                # Compound rows come first — slice the map, no copy.
+                compound_embs = entity_emb[:scorer.bundle.n_compounds]
+            else:
+                compound_embs = np.asarray(entity_emb[scorer.compound_indices])
+            return PartnerModel(
+                method=manifest["method"],
+                complex_dim=manifest["complex_dim"],
+                entity_emb=entity_emb,
+                relation_emb=np.load(path / "relation_emb.npy", mmap_mode="r"),
+                compound_embs=compound_embs,
+                path=path,
+                manifest=manifest,
+            )
+        logger.warning("Ensemble partner %s does not match loaded embeddings (%s) — "
+                       "reading raw files. Rebuild with: python scripts/build_kg.py ensemble",
+                       path, ", ".join(stale))
+
+    partner = read_partner(scorer)
+    if partner is not None and manifest is None:
+        logger.info("No prebuilt %s partner — read from raw files "
+                    "(prebuild with: python scripts/build_kg.py ensemble)", partner.method)
+    return partner
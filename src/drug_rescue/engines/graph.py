@@ -0,0 +1,382 @@
+"""
+graph.py — CSR adjacency over the DRKG triples for mechanism paths
+====================================================================
+
+The scorer reads embeddings only; the triples they were trained on
+(drkg.tsv, ~5.8M edges) are never loaded, so "which genes connect this
+compound to this disease?" had no answer outside the LLM. This build
+step converts the triples once into a compressed sparse row graph whose
+rows are the scorer's entity rows (entity_to_idx, bundle order if
+bundled):
+
+    data/embeddings/graph/
+        manifest.json    relation + type names, entity layout, embedding version
+        indptr.npy       (n_entities + 1,) int64 — row u's edges are
+                         indptr[u]:indptr[u + 1]
+        indices.npy      (2 * n_edges,) int32 — neighbour row, sorted per row
+        relations.npy    (2 * n_edges,) int32 — relation id r for a stored
+                         u -r-> v triple, ~r (= -r - 1) for v -r-> u
+        types.npy        (n_entities,) uint8 — entity type id
+
+Every triple is stored under both endpoints, so paths ignore direction
+and report it per hop. Arrays are memory-mapped.
+
+find_paths() enumerates 1–3 hop paths between a source and a target by
+meeting in the middle: hop 2 is the intersection of the two neighbour
+sets, hop 3 expands whichever side has the smaller total degree once
+and tests membership in the other side, all as array operations.
+Paths are ranked by a degree-damped score (every intermediate node
+contributes degree^-PATH_DAMPING), so specific genes outrank hubs, and
+relation names are looked up only for the paths returned.
+find_paths_many() reuses the target sides for a batch of sources.
+
+Build:
+    python scripts/build_kg.py graph --data-dir ./data [--triples drkg.tsv]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+import numpy as np
+
+from .neighbors import TRIPLES_FILE
+from .score_matrix import _compounds_digest
+from .vocab import ENTITY_TYPES, EntityVocab, entity_type
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+GRAPH_DIRNAME = "graph"
+GRAPH_FORMAT = 1
+
+MAX_HOPS = 3             # longest path find_paths() enumerates
+MAX_PATHS = 20           # paths returned per (source, target)
+PATH_DAMPING = 0.5       # intermediate node weight = degree ** -PATH_DAMPING
+
+
+@dataclass
+class CsrGraph:
+    """A loaded triples graph. Arrays are read-only memory maps."""
+    path: Path
+    indptr: np.ndarray               # (n_entities + 1,) int64
+    indices: np.ndarray              # (2 * n_edges,) int32
+    relations: np.ndarray            # (2 * n_edges,) int32, ~r = reversed
+    types: np.ndarray                # (n_entities,) uint8
+    relation_names: list[str]
+    type_names: list[str]
+    name_of: Callable[[int], str]    # entity row → name
+    manifest: dict
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def degree(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.indptr[rows + 1] - self.indptr[rows]
+
+    def neighbors(self, row: int) -> np.ndarray:
+        """Sorted unique neighbour rows of one entity."""
+        return np.unique(self.indices[self.indptr[row]:self.indptr[row + 1]])
+
+    def type_ids(self, names: Optional[tuple[str, ...]]) -> Optional[np.ndarray]:
+        """Type ids for type names (unknown names are ignored); None stays None."""
+        if names is None:
+            return None
+        return np.array([self.type_names.index(t) for t in names if t in self.type_names],
+                        dtype=np.uint8)
+
+    def expand(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(source row, neighbour row) for every stored edge of the given rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, stops = self.indptr[rows], self.indptr[rows + 1]
+        lengths = stops - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Positions of all slices, concatenated, without a Python loop.
+        shift = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        pos = shift + np.arange(total)
+        return np.repeat(rows, lengths), self.indices[pos].astype(np.int64)
+
+    def edges_between(self, u: int, v: int) -> tuple[list[str], list[str]]:
+        """(relations of u -r-> v triples, relations of v -r-> u triples)."""
+        start, stop = self.indptr[u], self.indptr[u + 1]
+        row = self.indices[start:stop]
+        a, b = np.searchsorted(row, v, side="left"), np.searchsorted(row, v, side="right")
+        forward, inverse = [], []
+        for r in self.relations[start + a:start + b]:
+            if r >= 0:
+                forward.append(self.relation_names[r])
+            else:
+                inverse.append(self.relation_names[~r])
+        return forward, inverse
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  PATHS
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _side(graph: CsrGraph, row: int, exclude: tuple[int, int],
+          via: Optional[np.ndarray]) -> np.ndarray:
+    """Neighbours of row usable as intermediate nodes."""
+    nb = graph.neighbors(row)
+    nb = nb[(nb != exclude[0]) & (nb != exclude[1])]
+    if via is not None:
+        nb = nb[np.isin(graph.types[nb], via)]
+    return nb.astype(np.int64)
+
+
+def _paths(graph: CsrGraph, source: int, target: int, near_target: np.ndarray,
+           max_hops: int, max_paths: int, via: Optional[np.ndarray]
+           ) -> tuple[list[tuple[float, np.ndarray]], dict[str, int]]:
+    """Best (score, node rows) paths for one (source, target) and counts per length."""
+    found: dict[int, np.ndarray] = {}   # hops → (n_paths, hops + 1) node rows
+    if max_hops >= 1 and any(graph.edges_between(source, target)):
+        found[1] = np.array([[source, target]], dtype=np.int64)
+
+    near_source = _side(graph, source, (source, target), via)
+    if max_hops >= 2:
+        mid = np.intersect1d(near_source, near_target, assume_unique=True)
+        found[2] = np.column_stack([np.full(len(mid), source), mid, np.full(len(mid), target)])
+
+    if max_hops >= 3 and len(near_source) and len(near_target):
+        # Expand the cheaper side; test the other side by membership.
+        if graph.degree(near_source).sum() <= graph.degree(near_target).sum():
+            a, b = graph.expand(near_source)
+            keep = np.isin(b, near_target) & (a != b)
+        else:
+            b, a = graph.expand(near_target)
+            keep = np.isin(a, near_source) & (a != b)
+        pairs = np.unique(np.column_stack([a[keep], b[keep]]), axis=0)
+        found[3] = np.column_stack([np.full(len(pairs), source), pairs,
+                                    np.full(len(pairs), target)])
+
+    counts = {f"{hops}_hop": len(nodes) for hops, nodes in found.items()}
+    ranked: list[tuple[float, np.ndarray]] = []
+    for nodes in found.values():
+        if len(nodes) == 0:
+            continue
+        inner = nodes[:, 1:-1]
+        weight = np.prod(np.maximum(graph.degree(inner.ravel()).reshape(inner.shape), 1)
+                         .astype(np.float64) ** -PATH_DAMPING, axis=1)
+        top = np.argsort(-weight, kind="stable")[:max_paths]
+        ranked.extend((float(weight[i]), nodes[i]) for i in top)
+    return ranked, counts
+
+
+def _describe(graph: CsrGraph, weight: float, nodes: np.ndarray) -> dict:
+    """One path as names, with the relations (both directions) of every hop."""
+    hops = []
+    for u, v in zip(nodes[:-1].tolist(), nodes[1:].tolist()):
+        forward, inverse = graph.edges_between(u, v)
+        hops.append({"source": graph.name_of(u), "target": graph.name_of(v),
+                     "relations": forward, "inverse": inverse})
+    return {"nodes": [graph.name_of(n) for n in nodes.tolist()], "hops": hops,
+            "score": round(weight, 6)}
+
+
+def find_paths(graph: CsrGraph, source: int, target: int, max_hops: int = MAX_HOPS,
+               max_paths: int = MAX_PATHS, via: Optional[tuple[str, ...]] = None) -> dict:
+    """
+    Paths of 1..max_hops edges between two entity rows, best first.
+
+    via restricts intermediate nodes to entity types (e.g. ("Gene",)).
+    Returns {"paths": [{nodes, hops, score}], "counts": {"<n>_hop": found}}.
+    """
+    return find_paths_many(graph, [source], [target], max_hops, max_paths, via)[0]
+
+
+def find_paths_many(graph: CsrGraph, sources: list[int], targets: list[int],
+                    max_hops: int = MAX_HOPS, max_paths: int = MAX_PATHS,
+                    via: Optional[tuple[str, ...]] = None) -> list[dict]:
+    """
+    find_paths() for many sources, each against every target (e.g. all
+    the entities of one disease), merged per source. Each target's side
+    is computed once; names are looked up only for the paths returned.
+    """
+    if not 1 <= max_hops <= MAX_HOPS:
+        raise ValueError(f"max_hops must be 1..{MAX_HOPS}, got {max_hops}")
+    via_ids = graph.type_ids(via)
+    sides = [(t, _side(graph, t, (t, t), via_ids)) for t in targets]
+    out = []
+    for s in sources:
+        ranked, counts = [], {}
+        for t, near_target in sides:
+            if s == t:
+                continue
+            r, c = _paths(graph, s, t, near_target[near_target != s], max_hops, max_paths, via_ids)
+            ranked.extend(r)
+            for key, n in c.items():
+                counts[key] = counts.get(key, 0) + n
+        ranked.sort(key=lambda x: -x[0])
+        out.append({"paths": [_describe(graph, w, nodes) for w, nodes in ranked[:max_paths]],
+                    "counts": counts})
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _layout(scorer: "DRKGScorer") -> dict:
+    """What the entity rows are: must match between build and load."""
+    return {
+        "bundle": scorer.bundle is not None,
+        "n_entities": len(scorer.entity_emb),
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+        "diseases_sha1": _compounds_digest(scorer.disease_names),
+    }
+
+
+def build_graph(scorer: "DRKGScorer", triples: Optional[str] = None,
+                out_dir: Optional[str] = None) -> Path:
+    """Read the triples TSV and write the CSR arrays aligned with the scorer's rows."""
+    t0 = time.perf_counter()
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / GRAPH_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+    triples_path = Path(triples) if triples else scorer.embeddings_dir / TRIPLES_FILE
+    if not triples_path.exists():
+        raise FileNotFoundError(f"No triples at {triples_path}")
+
+    vocab = scorer.entity_to_idx
+    # EntityVocab lookups are binary searches; one dict is far faster for ~11M.
+    lookup = {n: i for i, n in enumerate(vocab)} if isinstance(vocab, EntityVocab) else vocab
+    relation_ids: dict[str, int] = {}
+    heads, rels, tails = [], [], []
+    skipped = 0
+    with open(triples_path) as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) != 3:
+                continue
+            h, t = lookup.get(parts[0]), lookup.get(parts[2])
+            if h is None or t is None:
+                skipped += 1
+                continue
+            heads.append(h)
+            tails.append(t)
+            rels.append(relation_ids.setdefault(parts[1], len(relation_ids)))
+    if skipped:
+        logger.warning("Skipped %d triples with entities not in the embeddings", skipped)
+
+    n = len(scorer.entity_emb)
+    h = np.array(heads, dtype=np.int32)
+    t = np.array(tails, dtype=np.int32)
+    r = np.array(rels, dtype=np.int32)
+    del heads, tails, rels
+    src = np.concatenate([h, t])
+    dst = np.concatenate([t, h])
+    rel = np.concatenate([r, ~r])
+    order = np.lexsort((rel, dst, src))
+    src, dst, rel = src[order], dst[order], rel[order]
+    dup = np.zeros(len(src), dtype=bool)
+    dup[1:] = (src[1:] == src[:-1]) & (dst[1:] == dst[:-1]) & (rel[1:] == rel[:-1])
+    src, dst, rel = src[~dup], dst[~dup], rel[~dup]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    names = list(vocab) if isinstance(vocab, EntityVocab) else None
+    type_names = list(ENTITY_TYPES)
+    types = np.zeros(n, dtype=np.uint8)
+    for name, row in (zip(names, range(n)) if names is not None else vocab.items()):
+        et = entity_type(name)
+        if et not in type_names:
+            type_names.append(et)
+        types[row] = type_names.index(et)
+
+    # Manifest is removed first and written last: a half-built graph never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "indptr.npy", indptr)
+    np.save(out / "indices.npy", dst.astype(np.int32))
+    np.save(out / "relations.npy", rel.astype(np.int32))
+    np.save(out / "types.npy", types)
+    st = triples_path.stat()
+    manifest = {
+        "format": GRAPH_FORMAT,
+        "n_edges": int(len(src) // 2),
+        "relations": list(relation_ids),
+        "types": type_names,
+        "layout": _layout(scorer),
+        "triples": {"path": str(triples_path.resolve()), "stamp": [st.st_size, st.st_mtime_ns]},
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built graph (%d entities, %d edges, %d relations) at %s in %.1fs",
+                n, len(src) // 2, len(relation_ids), out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_graph(scorer: "DRKGScorer") -> Optional[CsrGraph]:
+    """
+    Memory-map the triples graph under the scorer's embeddings dir.
+
+    Returns None unless it was built for the same entity rows and from
+    the triples file as it is now.
+    """
+    path = scorer.embeddings_dir / GRAPH_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable graph manifest %s: %s", manifest_path, e)
+        return None
+
+    triples = manifest.get("triples") or {}
+    p = Path(triples.get("path", ""))
+    checks = {
+        "format": manifest.get("format") == GRAPH_FORMAT,
+        "version": manifest.get("embedding_version") == scorer.embedding_version,
+        "layout": manifest.get("layout") == _layout(scorer),
+        "triples": p.is_file() and [p.stat().st_size, p.stat().st_mtime_ns] == triples.get("stamp"),
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("Graph %s does not match loaded embeddings (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py graph", path, ", ".join(stale))
+        return None
+
+    vocab = scorer.entity_to_idx
+    if isinstance(vocab, EntityVocab):
+        name_of = vocab.name
+    else:
+        names = [""] * len(scorer.entity_emb)
+        for name, row in vocab.items():
+            names[row] = name
+        name_of = names.__getitem__
+
+    # Plain ndarray views of the maps: path queries slice them thousands of
+    # times, and np.memmap adds per-slice overhead.
+    def mapped(name: str) -> np.ndarray:
+        return np.load(path / name, mmap_mode="r").view(np.ndarray)
+
+    return CsrGraph(
+        path=path,
+        indptr=mapped("indptr.npy"),
+        indices=mapped("indices.npy"),
+        relations=mapped("relations.npy"),
+        types=mapped("types.npy"),
+        relation_names=manifest["relations"],
+        type_names=manifest["types"],
+        name_of=name_of,
+        manifest=manifest,
+    )
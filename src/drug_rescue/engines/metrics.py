@@ -0,0 +1,209 @@
+"""
+metrics.py — Per-stage timings and counters for scoring / discovery
+=====================================================================
+
+timing_ms says how long a call took, not where the time went. Code on
+the hot path marks stages and counts events; a collector active for the
+current call (contextvars, so concurrent calls stay separate) sums them:
+
+    with metrics.collect() as m:
+        with metrics.stage("score"):
+            ...
+        metrics.count("compounds_scored", n)
+    m.to_dict()
+    # {"total_ms": 12.3, "stages_ms": {"score": 11.9}, "counters": {...}}
+
+stage() / count() are no-ops when nothing is collecting. Collectors
+nest: an inner one (e.g. score_disease inside discover_candidates) is
+merged into the outer one when it closes. Work fanned out to a thread
+pool records into the caller's collector only if it runs in a copy of
+the caller's context (contextvars.copy_context().run, as the chunked
+scan in scorer.py does).
+
+@instrumented("event") wraps a public entry point: it collects for the
+call, stores the block on the result (`.metrics` attribute, or a
+"metrics" key for tool dicts) and passes it to the metrics hook, if one
+is set with set_metrics_hook(fn) — fn(event, metrics_dict), e.g. to
+forward to Prometheus or StatsD.
+
+Bytes: when tracemalloc is tracing (DRKG_TRACE_MEMORY=1 starts it on
+import), each stage also records the peak bytes allocated above its
+starting point (numpy allocations included), nested stages included.
+tracemalloc has one process-wide peak, so this only works for one
+request at a time: a stage that overlaps a stage on another thread
+(concurrent requests, a registry preload) reports no bytes rather than
+wrong ones. Tracing has a real cost; leave it off in production unless
+investigating memory.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MetricsHook = Callable[[str, dict], None]
+
+_current: ContextVar[Optional["Metrics"]] = ContextVar("drkg_metrics", default=None)
+_hook: Optional[MetricsHook] = None
+
+# Traced stages open per thread, outermost first: [base, peak, contended].
+_traced: dict[int, list[list]] = {}
+_traced_lock = threading.Lock()
+
+if os.environ.get("DRKG_TRACE_MEMORY", "") not in ("", "0") and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class Metrics:
+    """Stage wall times (ms), counters and peak bytes for one call."""
+
+    def __init__(self):
+        self.stages_ms: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.bytes: dict[str, int] = {}
+        self.total_ms = 0.0
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()   # pool workers record into the caller's collector
+
+    def add_stage(self, name: str, ms: float, nbytes: Optional[int] = None) -> None:
+        with self._lock:
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + ms
+            if nbytes is not None:
+                self.bytes[name] = max(self.bytes.get(name, 0), nbytes)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def merge(self, other: "Metrics") -> None:
+        for name, ms in other.stages_ms.items():
+            self.add_stage(name, ms, other.bytes.get(name))
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def to_dict(self) -> dict:
+        d = {
+            "total_ms": round(self.total_ms, 2),
+            "stages_ms": {k: round(v, 2) for k, v in self.stages_ms.items()},
+            "counters": dict(self.counters),
+        }
+        if self.bytes:
+            d["peak_bytes"] = dict(self.bytes)
+        return d
+
+
+@contextmanager
+def collect() -> Iterator[Metrics]:
+    """Collect stages / counters recorded in this context."""
+    m = Metrics()
+    parent = _current.get()
+    token = _current.set(m)
+    try:
+        yield m
+    finally:
+        _current.reset(token)
+        m.total_ms = (time.perf_counter() - m._t0) * 1000
+        if parent is not None:
+            parent.merge(m)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage into the active collector (repeated stages add up)."""
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    rec = _trace_open() if tracemalloc.is_tracing() else None
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        m.add_stage(name, ms, _trace_close(rec) if rec is not None else None)
+
+
+def _trace_open() -> list:
+    """Start peak tracking for a stage on this thread."""
+    me = threading.get_ident()
+    with _traced_lock:
+        base, peak = tracemalloc.get_traced_memory()
+        # reset_peak() is process-wide: fold the peak so far into every open
+        # stage first, or a nested stage would hide the enclosing ones'
+        # allocations. Other threads' stages lose their baseline either way,
+        # so they — and this one — are marked contended and report no bytes.
+        others = False
+        for tid, recs in _traced.items():
+            for r in recs:
+                r[1] = max(r[1], peak)
+                if tid != me:
+                    r[2] = others = True
+        rec = [base, 0, others]
+        _traced.setdefault(me, []).append(rec)
+        tracemalloc.reset_peak()
+    return rec
+
+
+def _trace_close(rec: list) -> Optional[int]:
+    """Peak bytes above the stage's start, or None if it overlapped another thread's."""
+    me = threading.get_ident()
+    with _traced_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        recs = [r for r in _traced[me] if r is not rec]
+        if recs:
+            _traced[me] = recs
+        else:
+            del _traced[me]
+    return None if rec[2] else max(max(rec[1], peak) - rec[0], 0)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the active collector."""
+    m = _current.get()
+    if m is not None:
+        m.count(name, n)
+
+
+def set_metrics_hook(hook: Optional[MetricsHook]) -> None:
+    """Install (or clear, with None) the process-wide metrics exporter."""
+    global _hook
+    _hook = hook
+
+
+def emit(event: str, metrics: dict) -> None:
+    """Pass a finished metrics block to the hook. Hook errors are logged, not raised."""
+    hook = _hook
+    if hook is None:
+        return
+    try:
+        hook(event, metrics)
+    except Exception as e:
+        logger.warning("Metrics hook failed for %s: %s", event, e)
+
+
+def instrumented(event: str):
+    """Decorator: collect metrics for the call, attach them to the result, emit."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with collect() as m:
+                result = fn(*args, **kwargs)
+            block = m.to_dict()
+            for r in result if isinstance(result, list) else [result]:
+                if isinstance(r, dict):
+                    r["metrics"] = block
+                elif hasattr(r, "metrics"):
+                    r.metrics = block
+            emit(event, block)
+            return result
+        return wrapper
+    return deco
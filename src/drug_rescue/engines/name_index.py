@@ -0,0 +1,118 @@
+"""
+name_index.py — Substring search over entity names
+====================================================
+
+Fuzzy name resolution ("is the query a substring of any Disease:: /
+Compound:: entity?") used to be a linear scan over every entity name on
+every query. SubstringIndex answers the same question from a trigram
+inverted index: intersect the posting lists of the query's trigrams,
+then confirm the few survivors with a real substring check.
+
+Results are identical to the scan — same matches, same (original) order.
+
+    idx = SubstringIndex(["Disease::MESH:D005909", ...])
+    idx.search("mesh:d0059", limit=10)
+
+NameCache is the bounded, thread-safe LRU the resolvers keep their
+query → result maps in.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+# Max entries in the per-resolver query caches; least recently used go first.
+NAME_CACHE_SIZE = 4096
+
+_MISSING = object()
+
+
+class SubstringIndex:
+    """Case-insensitive `query in name` over a fixed list of names."""
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self._lower = [n.lower() for n in names]
+        postings: dict[str, list[int]] = {}
+        for i, s in enumerate(self._lower):
+            for gram in {s[j:j + 3] for j in range(len(s) - 2)}:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {g: np.array(p, dtype=np.int32) for g, p in postings.items()}
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[str]:
+        """Names containing query (case-insensitive), in original order."""
+        q = query.lower()
+        if len(q) < 3:
+            # Too short for trigrams — and matches nearly everything anyway.
+            hits = (i for i, s in enumerate(self._lower) if q in s)
+        else:
+            lists = []
+            for gram in {q[j:j + 3] for j in range(len(q) - 2)}:
+                p = self._postings.get(gram)
+                if p is None:
+                    return []
+                lists.append(p)
+            lists.sort(key=len)
+            cand = lists[0]
+            for p in lists[1:]:
+                cand = np.intersect1d(cand, p, assume_unique=True)
+                if len(cand) == 0:
+                    return []
+            hits = (i for i in cand.tolist() if q in self._lower[i])
+
+        out = []
+        for i in hits:
+            out.append(self.names[i])
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+
+class LazySubstringIndex:
+    """Builds a SubstringIndex on first search (thread-safe), not at load time."""
+
+    def __init__(self, names: Callable[[], list[str]]):
+        self._names = names
+        self._index: Optional[SubstringIndex] = None
+        self._lock = threading.Lock()
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[str]:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = SubstringIndex(self._names())
+        return self._index.search(query, limit)
+
+
+class NameCache:
+    """LRU of resolved queries, safe to share between request threads."""
+
+    MISSING = _MISSING
+
+    def __init__(self, size: int = NAME_CACHE_SIZE):
+        self.size = size
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """The cached value (None is a valid one), or NameCache.MISSING."""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.size > 0:
+            with self._lock:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
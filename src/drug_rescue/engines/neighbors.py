@@ -0,0 +1,293 @@
+"""
+neighbors.py — Embedding-space neighbours among known treatments
+==================================================================
+
+"Close to which known treatments?" is a nearest-neighbour question over
+compound_embs. This build step answers it for every compound once:
+reference compounds are those with a treatment edge in the DRKG triples
+(drkg.tsv) or on an APPROVED_DRUGS list, and each compound gets its
+NEIGHBOR_DEPTH nearest references (itself excluded):
+
+    data/embeddings/neighbors/
+        manifest.json    metric, depth, compound / disease digests, embedding version
+        ref_rows.npy     (n_compounds, depth) int32 — nearest reference rows, -1 pad
+        ref_dist.npy     (n_compounds, depth) float32 — their distances, inf pad
+        reference.npy    (n_compounds,) uint8 — REF_TREATED | REF_APPROVED flags
+        treats.npy       (n_edges, 2) int32 — (compound row, disease row) treatment
+                         edges, rows into scorer.compound_names / disease_names
+
+DRKGScorer.explain_neighbors() reads the lists for a page of predictions
+(one fancy-index, no distance work). With a disease query it instead
+ranks that disease's own known treatments — its treatment edges plus its
+APPROVED_DRUGS entry — by distance to each prediction, one small matrix
+product per call. Without an index only the APPROVED_DRUGS compounds are
+references, scored the same way.
+
+Build:
+    python scripts/build_kg.py neighbors --data-dir ./data [--metric cosine]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .score_matrix import _compounds_digest
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+NEIGHBOR_DIRNAME = "neighbors"
+NEIGHBOR_FORMAT = 1
+
+NEIGHBOR_METRICS = ("cosine", "euclidean")
+NEIGHBOR_DEPTH = 32          # reference neighbours stored per compound
+NEIGHBOR_K = 5               # returned per prediction by default
+NEIGHBOR_BLOCK_ROWS = 1024   # query rows per distance block (block × n_refs float64)
+
+# DRKG triples (head \t relation \t tail), next to the embeddings.
+TRIPLES_FILE = "drkg.tsv"
+
+# reference.npy flags
+REF_TREATED = 1              # has a treatment edge to some disease
+REF_APPROVED = 2             # on an APPROVED_DRUGS list
+
+# Known approved drugs per disease — CACHE, not single source of truth.
+# PubChem lookup fills gaps for anything not here (tools/similarity.py).
+APPROVED_DRUGS: dict[str, list[str]] = {
+    "glioblastoma": ["Temozolomide", "Carmustine", "Lomustine", "Bevacizumab"],
+    "alzheimer": ["Donepezil", "Memantine", "Rivastigmine", "Galantamine"],
+    "parkinson": ["Levodopa", "Rasagiline", "Selegiline", "Pramipexole", "Ropinirole"],
+    "als": ["Riluzole", "Edaravone"],
+    "breast cancer": ["Tamoxifen", "Letrozole", "Anastrozole", "Trastuzumab"],
+    "lung cancer": ["Erlotinib", "Gefitinib", "Osimertinib", "Pembrolizumab"],
+    "depression": ["Fluoxetine", "Sertraline", "Venlafaxine", "Bupropion"],
+    "diabetes": ["Metformin", "Pioglitazone", "Sitagliptin", "Empagliflozin"],
+    "epilepsy": ["Valproic acid", "Carbamazepine", "Levetiracetam", "Lamotrigine"],
+    "ipf": ["Pirfenidone", "Nintedanib"],
+    "multiple myeloma": ["Lenalidomide", "Thalidomide", "Bortezomib", "Dexamethasone"],
+    "leukemia": ["Imatinib", "Dasatinib", "Cytarabine"],
+}
+
+
+def approved_names(disease: str) -> list[str]:
+    """APPROVED_DRUGS entry for a disease name: exact key, else substring match."""
+    key = disease.lower().strip()
+    names = APPROVED_DRUGS.get(key, [])
+    if not names:
+        for k, v in APPROVED_DRUGS.items():
+            if k in key or key in k:
+                return v
+    return names
+
+
+def distances(queries: np.ndarray, refs: np.ndarray, metric: str) -> np.ndarray:
+    """(len(queries), len(refs)) cosine (1 − cos) or Euclidean distances."""
+    q = np.asarray(queries, dtype=np.float64)
+    r = np.asarray(refs, dtype=np.float64)
+    if metric == "cosine":
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        r = r / np.maximum(np.linalg.norm(r, axis=1, keepdims=True), 1e-12)
+        return np.clip(1.0 - q @ r.T, 0.0, 2.0)
+    if metric == "euclidean":
+        d2 = (np.einsum("ij,ij->i", q, q)[:, None] + np.einsum("ij,ij->i", r, r)[None, :]
+              - 2.0 * (q @ r.T))
+        return np.sqrt(np.maximum(d2, 0.0))
+    raise ValueError(f"Unknown metric {metric!r}. Expected one of {NEIGHBOR_METRICS}")
+
+
+def nearest(queries: np.ndarray, query_rows: np.ndarray, refs: np.ndarray,
+            ref_rows: np.ndarray, k: int, metric: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The k nearest refs of every query, nearest first, a query's own row
+    excluded: ((len(queries), k) compound rows, distances), -1 / inf pad.
+    """
+    out_rows = np.full((len(queries), k), -1, dtype=np.int32)
+    out_dist = np.full((len(queries), k), np.inf, dtype=np.float32)
+    if len(refs) == 0 or k == 0:
+        return out_rows, out_dist
+    for start in range(0, len(queries), NEIGHBOR_BLOCK_ROWS):
+        stop = min(start + NEIGHBOR_BLOCK_ROWS, len(queries))
+        d = distances(queries[start:stop], refs, metric)
+        d[query_rows[start:stop, None] == ref_rows[None, :]] = np.inf
+        kk = min(k, d.shape[1])
+        top = np.argpartition(d, kk - 1, axis=1)[:, :kk] if kk < d.shape[1] \
+            else np.broadcast_to(np.arange(d.shape[1]), d.shape)
+        top_d = np.take_along_axis(d, top, axis=1)
+        order = np.argsort(top_d, axis=1, kind="stable")
+        top, top_d = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_d, order, axis=1)
+        found = np.isfinite(top_d)
+        out_rows[start:stop, :kk] = np.where(found, ref_rows[top], -1)
+        out_dist[start:stop, :kk] = top_d
+    return out_rows, out_dist
+
+
+def read_treatment_edges(triples_path: Path, relation_names: set[str],
+                         compound_pos: dict[str, int],
+                         disease_pos: dict[str, int]) -> np.ndarray:
+    """(n_edges, 2) int32 unique (compound row, disease row) treatment edges."""
+    edges = set()
+    with open(triples_path) as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) != 3 or parts[1] not in relation_names:
+                continue
+            c, d = compound_pos.get(parts[0]), disease_pos.get(parts[2])
+            if c is not None and d is not None:
+                edges.add((c, d))
+    return np.array(sorted(edges), dtype=np.int32).reshape(-1, 2)
+
+
+@dataclass
+class NeighborIndex:
+    """A loaded neighbour index. Arrays are read-only memory maps."""
+    path: Path
+    metric: str
+    ref_rows: np.ndarray             # (n_compounds, depth) int32
+    ref_dist: np.ndarray             # (n_compounds, depth) float32
+    reference: np.ndarray            # (n_compounds,) uint8
+    treats: np.ndarray               # (n_edges, 2) int32
+    manifest: dict
+
+    @property
+    def depth(self) -> int:
+        return self.ref_rows.shape[1]
+
+    def treating(self, disease_rows: np.ndarray) -> np.ndarray:
+        """Sorted compound rows with a treatment edge to any of the disease rows."""
+        hit = np.isin(self.treats[:, 1], disease_rows)
+        return np.unique(self.treats[hit, 0]).astype(np.int64)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_neighbor_index(scorer: "DRKGScorer", metric: str = "cosine",
+                         depth: int = NEIGHBOR_DEPTH, triples: Optional[str] = None,
+                         out_dir: Optional[str] = None) -> Path:
+    """Find every compound's nearest reference compounds and write the lists."""
+    if metric not in NEIGHBOR_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}. Expected one of {NEIGHBOR_METRICS}")
+    t0 = time.perf_counter()
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / NEIGHBOR_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    n = len(scorer.compound_names)
+    triples_path = Path(triples) if triples else scorer.embeddings_dir / TRIPLES_FILE
+    if triples_path.exists():
+        treats = read_treatment_edges(
+            triples_path, {r[0] for r in scorer.find_treatment_relations()},
+            scorer.compound_pos, {name: i for i, name in enumerate(scorer.disease_names)},
+        )
+    else:
+        logger.warning("No triples at %s — references are APPROVED_DRUGS only", triples_path)
+        treats = np.empty((0, 2), dtype=np.int32)
+
+    reference = np.zeros(n, dtype=np.uint8)
+    reference[treats[:, 0]] |= REF_TREATED
+    for names in APPROVED_DRUGS.values():
+        for name in names:
+            entity = scorer.resolver.resolve(name) if scorer.resolver else None
+            if entity in scorer.compound_pos:
+                reference[scorer.compound_pos[entity]] |= REF_APPROVED
+    refs = np.flatnonzero(reference).astype(np.int64)
+    if len(refs) == 0:
+        raise ValueError("No reference compounds (no treatment edges, no approved drugs resolved).")
+
+    ref_embs = np.asarray(scorer.compound_embs[refs], dtype=np.float64)
+    ref_rows = np.empty((n, depth), dtype=np.int32)
+    ref_dist = np.empty((n, depth), dtype=np.float32)
+    for start in range(0, n, NEIGHBOR_BLOCK_ROWS):
+        stop = min(start + NEIGHBOR_BLOCK_ROWS, n)
+        ref_rows[start:stop], ref_dist[start:stop] = nearest(
+            scorer.compound_embs[start:stop], np.arange(start, stop), ref_embs, refs, depth, metric)
+
+    # Manifest is removed first and written last: a half-built index never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    np.save(out / "ref_rows.npy", ref_rows)
+    np.save(out / "ref_dist.npy", ref_dist)
+    np.save(out / "reference.npy", reference)
+    np.save(out / "treats.npy", treats)
+    st = triples_path.stat() if triples_path.exists() else None
+    manifest = {
+        "format": NEIGHBOR_FORMAT,
+        "method": scorer.method,
+        "metric": metric,
+        "depth": depth,
+        "n_references": int(len(refs)),
+        "n_treatment_edges": int(len(treats)),
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+        "diseases_sha1": _compounds_digest(scorer.disease_names),
+        "triples": {"path": str(triples_path.resolve()), "stamp": [st.st_size, st.st_mtime_ns]} if st else None,
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built %s neighbour index (%d compounds, %d references, %d edges) at %s in %.1fs",
+                metric, n, len(refs), len(treats), out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_neighbor_index(scorer: "DRKGScorer") -> Optional[NeighborIndex]:
+    """
+    Memory-map the neighbour index under the scorer's embeddings dir.
+
+    Returns None unless it was built from the same embedding version, compound
+    and disease order, and (if it used them) the same triples file.
+    """
+    path = scorer.embeddings_dir / NEIGHBOR_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable neighbour index manifest %s: %s", manifest_path, e)
+        return None
+
+    triples = manifest.get("triples")
+    if triples is not None:
+        p = Path(triples["path"])
+        triples_ok = p.exists() and [p.stat().st_size, p.stat().st_mtime_ns] == triples["stamp"]
+    else:
+        triples_ok = True
+    checks = {
+        "format": manifest.get("format") == NEIGHBOR_FORMAT,
+        "method": manifest.get("method") == scorer.method,
+        "version": manifest.get("embedding_version") == scorer.embedding_version,
+        "compounds": manifest.get("compounds_sha1") == _compounds_digest(scorer.compound_names),
+        "diseases": manifest.get("diseases_sha1") == _compounds_digest(scorer.disease_names),
+        "triples": triples_ok,
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("Neighbour index %s does not match loaded embeddings (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py neighbors", path, ", ".join(stale))
+        return None
+
+    return NeighborIndex(
+        path=path,
+        metric=manifest["metric"],
+        ref_rows=np.load(path / "ref_rows.npy", mmap_mode="r"),
+        ref_dist=np.load(path / "ref_dist.npy", mmap_mode="r"),
+        reference=np.load(path / "reference.npy", mmap_mode="r"),
+        treats=np.load(path / "treats.npy", mmap_mode="r"),
+        manifest=manifest,
+    )
@@ -0,0 +1,181 @@
+"""
+quantize.py — Quantized compound store for the first-pass scan
+================================================================
+
+A full scan reads every compound row for every disease entity × relation.
+With a quantized copy of compound_embs that scan reads 1 byte (int8) or
+2 bytes (float16) per value instead of 4 (float32 bundle) or 8 (raw
+float64). DRKGScorer(quantize=...) scans the quantized rows, then rescores
+a shortlist exactly against the full-precision (memory-mapped) rows:
+
+    int8     per-dimension symmetric scale: x ≈ code × scale[j]
+    float16  plain cast
+
+Every row also stores its quantization error ‖x̂ − x‖. For both RotatE
+(|h∘r − t| with |r_k| ≤ r_max) and TransE that bounds how far the
+approximate distance can be from the exact one, which is what lets the
+scorer prove its rescored top-k equals the exact top-k.
+
+Files (a directory of their own: bundles and releases are never written
+to after they are built):
+
+    data/embeddings/quantized/
+        compounds_int8.npy          codes, (n_compounds, dim)
+        compounds_int8_scale.npy    float32 (dim,)   (int8 only)
+        compounds_int8_error.npy    float32 (n_compounds,)
+        compounds_int8.json         dtype, shape, bundle version / built_at
+
+They are used only with the bundle (or release) they were built from.
+
+Build:
+    python scripts/build_kg.py quantize --data-dir ./data [--dtype int8]
+
+Without these files the scorer quantizes in memory at startup.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .bundle import EmbeddingBundle
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_DIRNAME = "quantized"
+QUANT_DTYPES = ("int8", "float16")
+
+# Rows quantized per step (bounds temporaries while building).
+QUANTIZE_CHUNK_ROWS = 8192
+
+
+@dataclass
+class QuantizedCompounds:
+    """
+    Quantized compound rows. Slicing dequantizes to float32, so it can
+    stand in for compound_embs in the chunked scan.
+    """
+    kind: str                         # "int8" or "float16"
+    codes: np.ndarray                 # (n, dim) int8 or float16
+    scale: Optional[np.ndarray]       # (dim,) float32, int8 only
+    row_error: np.ndarray             # (n,) float32, ‖dequantized − original‖
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        block = np.asarray(self.codes[rows], dtype=np.float32)
+        if self.scale is not None:
+            block *= self.scale
+        return block
+
+    @property
+    def dtype(self) -> np.dtype:
+        """dtype of dequantized rows."""
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.row_error.nbytes + (
+            self.scale.nbytes if self.scale is not None else 0)
+
+
+def quantize_compounds(compound_embs: np.ndarray, dtype: str = "int8",
+                       chunk_rows: int = QUANTIZE_CHUNK_ROWS) -> QuantizedCompounds:
+    """Quantize compound rows chunk by chunk (never a full float copy)."""
+    if dtype not in QUANT_DTYPES:
+        raise ValueError(f"dtype must be one of {QUANT_DTYPES}, got {dtype!r}")
+    n, dim = compound_embs.shape
+
+    scale = None
+    if dtype == "int8":
+        max_abs = np.zeros(dim, dtype=np.float32)
+        for start in range(0, n, chunk_rows):
+            block = np.abs(np.asarray(compound_embs[start:start + chunk_rows], dtype=np.float32))
+            np.maximum(max_abs, block.max(axis=0), out=max_abs)
+        scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+    codes = np.empty((n, dim), dtype=np.int8 if dtype == "int8" else np.float16)
+    row_error = np.empty(n, dtype=np.float32)
+    q = QuantizedCompounds(dtype, codes, scale, row_error)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        block = np.asarray(compound_embs[start:stop], dtype=np.float32)
+        if scale is not None:
+            codes[start:stop] = np.clip(np.rint(block / scale), -127, 127)
+        else:
+            codes[start:stop] = block
+        diff = q[start:stop] - block
+        row_error[start:stop] = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    return q
+
+
+def _paths(out: Path, dtype: str) -> dict[str, Path]:
+    stem = f"compounds_{dtype}"
+    return {
+        "codes": out / f"{stem}.npy",
+        "scale": out / f"{stem}_scale.npy",
+        "error": out / f"{stem}_error.npy",
+        "manifest": out / f"{stem}.json",
+    }
+
+
+def build_quantized(bundle: EmbeddingBundle, embeddings_dir: str, dtype: str = "int8",
+                    out_dir: Optional[str] = None) -> Path:
+    """Quantize a bundle's compound rows into embeddings_dir/quantized."""
+    t0 = time.perf_counter()
+    q = quantize_compounds(bundle.entity_emb[:bundle.n_compounds], dtype)
+    out = Path(out_dir) if out_dir else Path(embeddings_dir) / QUANTIZED_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+    paths = _paths(out, dtype)
+    paths["manifest"].unlink(missing_ok=True)
+    np.save(paths["codes"], q.codes)
+    np.save(paths["error"], q.row_error)
+    if q.scale is not None:
+        np.save(paths["scale"], q.scale)
+    # Manifest last: files without one are ignored by load_quantized().
+    with open(paths["manifest"], "w") as f:
+        json.dump({
+            "dtype": dtype,
+            "shape": list(q.codes.shape),
+            "bundle_version": bundle.version,
+            "bundle_built_at": bundle.manifest.get("built_at"),
+        }, f, indent=2)
+    logger.info("Quantized %d compounds to %s (%.0f MB) in %.1fs", len(q), dtype,
+                q.nbytes / 1e6, time.perf_counter() - t0)
+    return paths["codes"]
+
+
+def load_quantized(bundle: EmbeddingBundle, embeddings_dir: str,
+                   dtype: str) -> Optional[QuantizedCompounds]:
+    """Memory-map prebuilt quantized rows, or None if missing / built from another bundle."""
+    paths = _paths(Path(embeddings_dir) / QUANTIZED_DIRNAME, dtype)
+    if not paths["manifest"].exists():
+        return None
+    try:
+        with open(paths["manifest"]) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable quantized manifest %s: %s", paths["manifest"], e)
+        return None
+
+    shape = [bundle.n_compounds, bundle.entity_emb.shape[1]]
+    if (manifest.get("dtype") != dtype or manifest.get("shape") != shape
+            or manifest.get("bundle_version") != bundle.version
+            or manifest.get("bundle_built_at") != bundle.manifest.get("built_at")):
+        logger.warning("Quantized compounds %s do not match the bundle — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py quantize", paths["codes"])
+        return None
+
+    return QuantizedCompounds(
+        kind=dtype,
+        codes=np.load(paths["codes"], mmap_mode="r"),
+        scale=np.load(paths["scale"]) if dtype == "int8" else None,
+        row_error=np.load(paths["error"], mmap_mode="r"),
+    )
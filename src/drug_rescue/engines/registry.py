@@ -0,0 +1,275 @@
+"""
+registry.py — Process-wide cache of loaded scorers and enrichers
+=================================================================
+
+Loading a DRKGScorer means reading ~190MB of embeddings, parsing
+entity_to_idx.json and rebuilding the DrugNameResolver maps. The
+enricher opens dropped_drugs.db and parses kg_entity_lookup.json. Both
+are read-only once built, so we keep one of each per data directory and
+share it between the discovery engine and the MCP tools.
+
+Entries are keyed by the resolved data directory plus the mtimes of the
+files they were built from. If any of those files changes on disk the
+next call rebuilds the entry and the stale one is dropped.
+
+Scorers are swapped, not reloaded in line: once one is cached, a change
+(e.g. a new embedding release, see bundle.py) starts a background load
+and callers keep getting the old scorer until the new one is ready, then
+the entry is replaced in one step. Requests already holding the old
+scorer finish on it. DRKG_BACKGROUND_RELOAD=0 restores blocking reloads.
+
+    from drug_rescue.engines.registry import get_scorer, get_enricher, get_enrich_table
+    scorer = get_scorer("./data")      # first call ~2s, then instant
+    enricher = get_enricher("./data")
+    table = get_enrich_table("./data")  # prebuilt enrichment columns, or None
+    preload("./data-v2", on_ready=fn)   # load in the background, fn(scorer) when done
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from . import metrics
+from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+
+# Files (relative to data_dir) whose mtimes invalidate a cached entry.
+SCORER_FILES = (
+    "embeddings/rotate_entity_embeddings.npy",
+    "embeddings/rotate_relation_embeddings.npy",
+    "embeddings/transe_DRKG_TransE_l2_entity.npy",
+    "embeddings/transe_DRKG_TransE_l2_relation.npy",
+    "embeddings/entity_to_idx.json",
+    "embeddings/relation_to_idx.json",
+    "embeddings/transe_entities.tsv",
+    "embeddings/transe_relations.tsv",
+    "embeddings/bundle/manifest.json",
+    "embeddings/releases/CURRENT",
+    "embeddings/score_matrix/manifest.json",
+    "embeddings/ann_index/manifest.json",
+    "embeddings/null_model/manifest.json",
+    "embeddings/neighbors/manifest.json",
+    "embeddings/graph/manifest.json",
+    "embeddings/ensemble/manifest.json",
+    "embeddings/quantized/compounds_int8.json",
+    "embeddings/quantized/compounds_float16.json",
+    "models/rotate_model/metadata.json",
+    "database/dropped_drugs.db",
+)
+
+ENRICHER_FILES = (
+    "database/dropped_drugs.db",
+    "database/kg_entity_lookup.json",
+)
+
+# The table is aligned with the scorer's compounds, so it follows both.
+ENRICH_TABLE_FILES = ENRICHER_FILES + SCORER_FILES + (
+    "drugbank_to_name.json",
+    "database/enrich_table/manifest.json",
+)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  REGISTRY
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+# Stale scorers keep serving while the replacement loads (see module doc).
+BACKGROUND_RELOAD = os.environ.get("DRKG_BACKGROUND_RELOAD", "1") not in ("", "0")
+
+_lock = threading.Lock()
+_entries: dict[tuple[str, str], tuple[tuple, Any]] = {}   # (kind, dir) → (fingerprint, obj)
+_load_locks: dict[tuple[str, str], threading.Lock] = {}
+_reloads: dict[tuple[str, str], threading.Thread] = {}    # background loads in flight
+_failed: dict[tuple[str, str], tuple] = {}                # fingerprint a reload failed on
+
+
+def _fingerprint(data_dir: Path, files: tuple[str, ...]) -> tuple:
+    """(relpath, mtime_ns) for every file; missing files record None."""
+    fp = []
+    for rel in files:
+        try:
+            fp.append((rel, (data_dir / rel).stat().st_mtime_ns))
+        except OSError:
+            fp.append((rel, None))
+    return tuple(fp)
+
+
+def _get(kind: str, data_dir: str, files: tuple[str, ...],
+         build: Callable[[Path], Any], background: bool = False,
+         extra: tuple = ()) -> Any:
+    """
+    Return the cached object for (kind, data_dir), rebuilding if stale.
+
+    Only one thread builds a given entry; others wait on its load lock and
+    then pick up the result. Different data dirs load independently.
+    With background=True a stale entry is returned as is while a thread
+    builds its replacement. extra is added to the file fingerprint.
+    """
+    root = Path(data_dir).resolve()
+    key = (kind, str(root))
+
+    with _lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+        hit = _entries.get(key)
+
+    if background and hit is not None:
+        fp = _fingerprint(root, files) + extra
+        if hit[0] == fp:
+            metrics.count(f"registry_{kind}_hit")
+            return hit[1]
+        metrics.count(f"registry_{kind}_stale")
+        _reload_in_background(kind, key, root, files, build, extra)
+        return hit[1]
+
+    with load_lock:
+        fp = _fingerprint(root, files) + extra
+        with _lock:
+            hit = _entries.get(key)
+        if hit is not None and hit[0] == fp:
+            metrics.count(f"registry_{kind}_hit")
+            return hit[1]
+
+        metrics.count(f"registry_{kind}_miss")
+        return _build(kind, key, root, fp, build, replacing=hit is not None)
+
+
+def _build(kind: str, key: tuple[str, str], root: Path, fp: tuple,
+           build: Callable[[Path], Any], replacing: bool) -> Any:
+    """Build an entry and install it (caller holds the key's load lock)."""
+    t0 = time.perf_counter()
+    with metrics.stage(f"load_{kind}"):
+        obj = build(root)
+    with _lock:
+        _entries[key] = (fp, obj)
+    logger.info("Registry: built %s for %s in %.0fms%s", kind, root,
+                (time.perf_counter() - t0) * 1000, " (files changed)" if replacing else "")
+    return obj
+
+
+def _reload_in_background(kind: str, key: tuple[str, str], root: Path,
+                          files: tuple[str, ...], build: Callable[[Path], Any],
+                          extra: tuple = (), on_ready: Callable[[Any], None] | None = None
+                          ) -> threading.Thread:
+    """Start (or join) the background build of key; the entry is swapped when done."""
+    with _lock:
+        running = _reloads.get(key)
+        if running is not None and running.is_alive() and on_ready is None:
+            return running
+
+    def run() -> None:
+        with _load_locks[key]:
+            fp = _fingerprint(root, files) + extra
+            with _lock:
+                hit = _entries.get(key)
+                failed = _failed.get(key) == fp
+            if hit is not None and hit[0] == fp:
+                obj = hit[1]              # someone else already loaded it
+            elif failed:
+                return                    # same files failed before; wait for a change
+            else:
+                try:
+                    obj = _build(kind, key, root, fp, build, replacing=hit is not None)
+                except Exception:
+                    with _lock:
+                        _failed[key] = fp
+                    logger.exception("Registry: background load of %s for %s failed — "
+                                     "still serving the previous one", kind, root)
+                    return
+        if on_ready is not None:
+            on_ready(obj)
+
+    t = threading.Thread(target=run, name=f"registry-{kind}-reload", daemon=True)
+    with _lock:
+        _reloads[key] = t
+        _load_locks.setdefault(key, threading.Lock())
+    t.start()
+    return t
+
+
+def _build_scorer(root: Path) -> DRKGScorer:
+    return DRKGScorer(
+        embeddings_dir=str(root / "embeddings"),
+        db_path=str(root / "database" / "dropped_drugs.db"),
+    )
+
+
+def get_scorer(data_dir: str = "./data") -> DRKGScorer:
+    """
+    Shared DRKGScorer for data_dir/embeddings + data_dir/database.
+
+    Blocks only for the first load; after that changed files are picked
+    up by a background load (see module doc).
+    """
+    return _get("scorer", data_dir, SCORER_FILES, _build_scorer,
+                background=BACKGROUND_RELOAD)
+
+
+def preload(data_dir: str, on_ready: Callable[[DRKGScorer], None] | None = None
+            ) -> threading.Thread:
+    """
+    Load (or refresh) the scorer for data_dir on a background thread and
+    install it; on_ready(scorer) runs on that thread once it is serving.
+    """
+    root = Path(data_dir).resolve()
+    return _reload_in_background("scorer", ("scorer", str(root)), root, SCORER_FILES,
+                                 _build_scorer, on_ready=on_ready)
+
+
+def is_loaded(data_dir: str) -> bool:
+    """Whether a scorer for data_dir is cached (possibly stale)."""
+    with _lock:
+        return ("scorer", str(Path(data_dir).resolve())) in _entries
+
+
+def put_scorer(data_dir: str, scorer: DRKGScorer) -> None:
+    """
+    Install an already-built scorer for data_dir (e.g. one attached from
+    shared memory). It is served until the data files change.
+    """
+    root = Path(data_dir).resolve()
+    with _lock:
+        _entries[("scorer", str(root))] = (_fingerprint(root, SCORER_FILES), scorer)
+
+
+def get_enricher(data_dir: str = "./data"):
+    """Shared _DBEnricher for data_dir/database/dropped_drugs.db."""
+    from .discover import _DBEnricher
+    return _get(
+        "enricher", data_dir, ENRICHER_FILES,
+        lambda root: _DBEnricher(str(root / "database" / "dropped_drugs.db")),
+    )
+
+
+def get_enrich_table(data_dir: str = "./data"):
+    """
+    Shared EnrichTable for data_dir (see enrich_table.py), or None when it
+    has not been built or is out of date.
+    """
+    from .enrich_table import load_enrich_table
+    # Keyed on the scorer too: after a swap the table is revalidated.
+    scorer = get_scorer(data_dir)
+    return _get(
+        "enrich_table", data_dir, ENRICH_TABLE_FILES,
+        lambda root: load_enrich_table(str(root), scorer),
+        extra=(("scorer", id(scorer)),),
+    )
+
+
+def clear(data_dir: str | None = None) -> None:
+    """Drop cached entries (all, or only those for one data dir)."""
+    with _lock:
+        if data_dir is None:
+            _entries.clear()
+            _failed.clear()
+            return
+        root = str(Path(data_dir).resolve())
+        for key in [k for k in _entries if k[1] == root]:
+            del _entries[key]
+            _failed.pop(key, None)
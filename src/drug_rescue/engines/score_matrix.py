@@ -0,0 +1,215 @@
+"""
+score_matrix.py — Precomputed disease × compound score matrix
+==============================================================
+
+RotatE scores only change when the embeddings change. For a fixed
+disease panel we can score every disease entity against every compound
+ONCE, offline, and answer score_disease() with a row lookup instead of
+numpy scoring.
+
+    data/embeddings/score_matrix/
+        manifest.json      dtype, method, relations, embedding version
+        scores.npy         (n_diseases, n_compounds) compound_embs dtype
+                           (float32 for a bundle) or opt-in float16
+                           best score over treatment relations
+        relations.npy      (n_diseases, n_compounds) uint8
+                           which treatment relation won
+        diseases.json      Disease:: entity per row
+
+Columns follow DRKGScorer.compound_names. Both arrays are opened with
+mmap_mode="r", so any number of workers share one page-cache copy.
+
+By default rows are scored with the scorer's own backend and stored in
+the dtype it scores in, so the matrix reproduces the live scan's scores
+and ranks exactly. --dtype float16 halves the file but keeps only ~3
+significant digits (scores are ~-5 to -15): reported scores can then
+differ from live scoring in the 3rd decimal and near-ties may swap.
+
+Build:
+    python scripts/build_kg.py scores --data-dir ./data
+    python scripts/build_kg.py scores --data-dir ./data --diseases glioblastoma,als
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from .scorer import DRKGScorer
+
+logger = logging.getLogger(__name__)
+
+SCORE_MATRIX_DIRNAME = "score_matrix"
+SCORE_MATRIX_FORMAT = 1
+
+
+@dataclass
+class ScoreMatrix:
+    """A loaded score matrix. Arrays are read-only memory maps."""
+    path: Path
+    scores: np.ndarray               # (n_diseases, n_compounds)
+    relations: np.ndarray            # (n_diseases, n_compounds) uint8
+    disease_row: dict[str, int]      # Disease:: entity → row
+    relation_names: list[str]
+    manifest: dict
+
+    def covers(self, disease_entities: list[str]) -> bool:
+        return all(e in self.disease_row for e in disease_entities)
+
+
+def _compounds_digest(compound_names: list[str]) -> str:
+    return hashlib.sha1("\n".join(compound_names).encode()).hexdigest()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  BUILD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def build_score_matrix(scorer: "DRKGScorer", diseases: Optional[list[str]] = None,
+                       dtype: Optional[str] = None, out_dir: Optional[str] = None,
+                       memory_budget_mb: Optional[float] = None) -> Path:
+    """
+    Score disease entities × all compounds and write the matrix to disk.
+
+    diseases: queries or Disease:: IDs to include (each resolved with
+    scorer.resolve_disease); None = every Disease:: entity in the graph.
+    dtype None stores the scorer's compound_embs dtype (exact); "float16"
+    is opt-in. Rows are written block by block, so memory stays within the
+    budget.
+    """
+    from .scorer import BATCH_MEMORY_BUDGET_MB
+
+    dtype = dtype or np.dtype(scorer.compound_embs.dtype).name
+    if dtype not in ("float16", "float32", "float64"):
+        raise ValueError(f"dtype must be float16, float32 or float64, got {dtype!r}")
+
+    t0 = time.perf_counter()
+    out = Path(out_dir) if out_dir else scorer.embeddings_dir / SCORE_MATRIX_DIRNAME
+    out.mkdir(parents=True, exist_ok=True)
+
+    if diseases is None:
+        entities = list(scorer.disease_names)
+    else:
+        entities = []
+        for q in diseases:
+            for e in scorer.resolve_disease(q):
+                if e not in entities:
+                    entities.append(e)
+    if not entities:
+        raise ValueError("No disease entities to score")
+
+    treatment_rels = scorer.find_treatment_relations()
+    if not treatment_rels:
+        raise ValueError("No treatment relations found.")
+    if len(treatment_rels) > 255:
+        raise ValueError("Too many treatment relations for a uint8 relation matrix")
+
+    n = len(scorer.compound_names)
+    budget = (memory_budget_mb or BATCH_MEMORY_BUDGET_MB) * 2**20
+    block = max(1, int(budget // max(n * len(treatment_rels) * 8, 1)))
+
+    # Manifest is removed first and written last: a half-built matrix never loads.
+    (out / "manifest.json").unlink(missing_ok=True)
+    scores = np.lib.format.open_memmap(out / "scores.npy", mode="w+",
+                                       dtype=np.dtype(dtype), shape=(len(entities), n))
+    relations = np.lib.format.open_memmap(out / "relations.npy", mode="w+",
+                                          dtype=np.uint8, shape=(len(entities), n))
+
+    for start in range(0, len(entities), block):
+        chunk = entities[start:start + block]
+        tails = scorer.entity_emb[[scorer.entity_to_idx[e] for e in chunk]]
+        # (n_relations, n_compounds, chunk) → best relation per compound × disease,
+        # scored the way score_disease() would score them live.
+        if scorer.backend == "gemm":
+            stacked = np.stack([scorer._score_gemm(rel_idx, tails) for _, rel_idx in treatment_rels])
+        else:
+            stacked = np.stack([np.stack([scorer._score_direct(rel_idx, t) for t in tails], axis=1)
+                                for _, rel_idx in treatment_rels])
+        best_rel = np.argmax(stacked, axis=0)
+        best = np.take_along_axis(stacked, best_rel[None], axis=0)[0]
+        scores[start:start + len(chunk)] = best.T
+        relations[start:start + len(chunk)] = best_rel.T
+        logger.info("Scored diseases %d-%d / %d", start + 1, start + len(chunk), len(entities))
+
+    scores.flush()
+    relations.flush()
+    del scores, relations
+
+    with open(out / "diseases.json", "w") as f:
+        json.dump(entities, f)
+    manifest = {
+        "format": SCORE_MATRIX_FORMAT,
+        "dtype": dtype,
+        "method": scorer.method,
+        "n_diseases": len(entities),
+        "n_compounds": n,
+        "compounds_sha1": _compounds_digest(scorer.compound_names),
+        "treatment_relations": [r[0] for r in treatment_rels],
+        "embedding_version": scorer.embedding_version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Built %s score matrix %s at %s in %.1fs", dtype,
+                (len(entities), n), out, time.perf_counter() - t0)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+#  LOAD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def load_score_matrix(scorer: "DRKGScorer") -> Optional[ScoreMatrix]:
+    """
+    Memory-map the score matrix under the scorer's embeddings dir.
+
+    Returns None unless it was built from the same embedding version, method,
+    compound order and treatment relations the scorer has loaded.
+    """
+    path = scorer.embeddings_dir / SCORE_MATRIX_DIRNAME
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception as e:
+        logger.warning("Unreadable score matrix manifest %s: %s", manifest_path, e)
+        return None
+
+    relation_names = [r[0] for r in scorer.find_treatment_relations()]
+    checks = {
+        "format": manifest.get("format") == SCORE_MATRIX_FORMAT,
+        "method": manifest.get("method") == scorer.method,
+        "version": manifest.get("embedding_version") == scorer.embedding_version,
+        "compounds": manifest.get("compounds_sha1") == _compounds_digest(scorer.compound_names),
+        "relations": manifest.get("treatment_relations") == relation_names,
+    }
+    stale = [k for k, ok in checks.items() if not ok]
+    if stale:
+        logger.warning("Score matrix %s does not match loaded embeddings (%s) — ignoring. "
+                       "Rebuild with: python scripts/build_kg.py scores", path, ", ".join(stale))
+        return None
+
+    with open(path / "diseases.json") as f:
+        diseases = json.load(f)
+
+    return ScoreMatrix(
+        path=path,
+        scores=np.load(path / "scores.npy", mmap_mode="r"),
+        relations=np.load(path / "relations.npy", mmap_mode="r"),
+        disease_row={e: i for i, e in enumerate(diseases)},
+        relation_names=relation_names,
+        manifest=manifest,
+    )
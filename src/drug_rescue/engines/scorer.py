@@ -3,7 +3,10 @@ scorer.py — DRKG Knowledge Graph Scoring Engine
 ================================================
 
 Loads pre-trained RotatE (or TransE fallback) embeddings from data/embeddings/
+(or the memory-mapped float32 bundle built from them, see bundle.py)
 and scores drug-disease pairs using vectorized complex-space math.
+With ensemble="rank" / "zscore" both models are loaded and their scores
+fused (see ensemble.py).
 
 This is pure computation. No LLM. No network calls. Just numpy.
 
@@ -13,16 +16,35 @@ This is pure computation. No LLM. No network calls. Just numpy.
 
 from __future__ import annotations
 
+import contextvars
+import hashlib
 import json
 import logging
-import sqlite3
+import os
+import threading
 import time
-from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 
+from . import metrics
+from .ann_index import AnnIndex, load_ann_index
+from .bundle import EmbeddingBundle, load_bundle, source_stamps
+from .calibration import NullModel, load_null_model
+from .drug_db import DrugDB
+from .ensemble import FUSIONS, PartnerModel, fuse, load_partner
+from .graph import MAX_HOPS, MAX_PATHS, CsrGraph, find_paths_many, load_graph
+from .name_index import LazySubstringIndex, NameCache
+from .neighbors import (APPROVED_DRUGS, NEIGHBOR_K, REF_APPROVED, REF_TREATED, NeighborIndex,
+                        approved_names, load_neighbor_index, nearest)
+from .quantize import QUANT_DTYPES, QuantizedCompounds, load_quantized, quantize_compounds
+from .vocab import EntityVocab
+from .score_matrix import ScoreMatrix, load_score_matrix
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,6 +72,52 @@ DEMO_DISEASE_ENTITIES: dict[str, list[str]] = {
 # Relation name patterns that mean "drug treats disease" in DRKG.
 TREATMENT_RELATION_PATTERNS = ["CtD", "T::Compound:Disease", "treats::Compound:Disease"]
 
+# Scoring backends:
+#   "direct" — element-wise h∘r − t over all compounds, per entity × relation
+#   "gemm"   — h∘r cached per treatment relation; distances via one matrix
+#              product per relation (‖HR‖² − 2·HR·t + ‖t‖²). Opt-in.
+SCORING_BACKENDS = ("direct", "gemm")
+
+# gemm always works in float64; direct works in the embeddings' dtype. On
+# the raw float64 embeddings both give the same ranking. On the float32
+# bundle their scores agree within GEMM_RTOL · (|score| + 1), so compounds
+# scored that close together may swap ranks.
+GEMM_RTOL = 1e-5
+
+# Recent disease queries whose full score vectors DRKGScorer keeps (LRU).
+# One entry ≈ n_compounds × 32 bytes (~0.8 MB for DRKG).
+SCORE_CACHE_SIZE = 64
+
+# Score-buffer budget for DRKGScorer.score_diseases() (n_compounds × tails × relations).
+BATCH_MEMORY_BUDGET_MB = 256
+
+# Direct backend: compounds are scored in chunks of this many rows (temporaries
+# stay ~chunk × dim instead of several n_compounds × dim copies), spread over
+# SCORING_THREADS worker threads (DRKG_SCORING_THREADS; numpy releases the GIL).
+SCORE_CHUNK_ROWS = 2048
+SCORING_THREADS = min(8, os.cpu_count() or 1)
+
+# Quantized scan (quantize="int8" / "float16", see quantize.py): this many of
+# the best approximate rows, at least, are rescored at full precision.
+RESCORE_DEPTH = 512
+
+# IVF index (use_ann=True, see ann_index.py): lists probed per disease tail ×
+# relation, doubled until at least ANN_DEPTH candidates are found.
+ANN_NPROBE = 8
+ANN_DEPTH = 1000
+
+# Reducers over the disease entity × treatment relation scores of a compound
+# (score_disease_aggregated). "max" is what score_disease() ranks by.
+AGGREGATIONS = ("max", "mean", "logsumexp", "weighted")
+
+# Relation reliability for the "weighted" reducer: relation-name substring →
+# weight, unmatched relations weigh 1.0. Curated sources over text-mined GNBR.
+RELATION_WEIGHTS: dict[str, float] = {
+    "DRUGBANK::treats": 1.0,
+    "Hetionet::CtD": 1.0,
+    "GNBR::T": 0.5,
+}
+
 # Verified DRKG entity IDs for drugs we know will appear in demos.
 KNOWN_DRUGS: dict[str, str] = {
     "metformin": "Compound::DB00331",
@@ -101,9 +169,22 @@ class KGPrediction:
     method: str                # "RotatE" or "TransE"
     relation_used: str         # "GNBR::T::Compound:Disease"
     normalized_score: float = 0.0  # 0-1 for orchestrator (20% weight)
+    disease_entity: Optional[str] = None  # set by score_drug(): the ranked disease
+    relation_scores: Optional[dict[str, Optional[float]]] = None  # breakdown=True: best per relation
+    neighbors: Optional[list[dict]] = None  # explain_neighbors(): nearest known treatments
+    model_scores: Optional[dict[str, dict]] = None  # ensemble: {method: score, percentile, z_score, rank}
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        d = asdict(self)
+        if self.disease_entity is None:
+            del d["disease_entity"]
+        if self.relation_scores is None:
+            del d["relation_scores"]
+        if self.neighbors is None:
+            del d["neighbors"]
+        if self.model_scores is None:
+            del d["model_scores"]
+        return d
 
 
 @dataclass
@@ -118,6 +199,12 @@ class KGResult:
     timing_ms: float
     error: Optional[str] = None
     metadata: Optional[dict] = None
+    drug_query: Optional[str] = None      # set by score_drug() (diseases ranked for one drug)
+    total_diseases_scored: int = 0
+    metrics: Optional[dict] = None        # per-stage timings / counters (see metrics.py)
+    aggregation: Optional[str] = None     # set by score_disease_aggregated(): the reducer
+    embedding_version: Optional[str] = None  # release / bundle version scored with
+    ensemble: Optional[str] = None        # fusion of the per-model scores, if ensembled
 
     def to_dict(self) -> dict:
         d = {
@@ -130,8 +217,19 @@ class KGResult:
             "timing_ms": self.timing_ms,
             "error": self.error,
         }
+        if self.drug_query is not None:
+            d["drug_query"] = self.drug_query
+            d["total_diseases_scored"] = self.total_diseases_scored
         if self.metadata:
             d["metadata"] = self.metadata
+        if self.aggregation is not None:
+            d["aggregation"] = self.aggregation
+        if self.embedding_version is not None:
+            d["embedding_version"] = self.embedding_version
+        if self.ensemble is not None:
+            d["ensemble"] = self.ensemble
+        if self.metrics is not None:
+            d["metrics"] = self.metrics
         return d
 
     def get_drug(self, name: str) -> Optional[KGPrediction]:
@@ -160,6 +258,78 @@ class KGResult:
         }
 
 
+@dataclass
+class DiseaseScores:
+    """
+    Full ranking state for one disease query: the best score of EVERY
+    compound, which entity × relation pair won, and the score stats.
+    DRKGScorer keeps recent ones in an LRU so paging costs no rescoring.
+    """
+    disease_entities: list[str]
+    treatment_relations: list[str]
+    best_scores: np.ndarray          # (n_compounds,), -inf = not scored
+    best_pair: np.ndarray            # row into pair_relations per compound
+    pair_relations: list[str]        # relation name of each entity × relation row
+    sorted_valid: np.ndarray         # finite scores, ascending
+    mean: float
+    std: float
+    exact_depth: Optional[int] = None  # quantized scan: ranks [0, depth) are exact
+    null: Optional[NullModel] = None   # calibrate=True: stats from the null model
+    models: Optional[dict[str, "DiseaseScores"]] = None   # ensemble: per-model state, primary first
+    fusion: Optional[str] = None       # ensemble: how best_scores fuses the models
+    _order: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @classmethod
+    def from_scores(cls, disease_entities: list[str], treatment_relations: list[str],
+                    best_scores: np.ndarray, best_pair: np.ndarray,
+                    pair_relations: list[str],
+                    exact_depth: Optional[int] = None) -> "DiseaseScores":
+        valid = best_scores[~np.isinf(best_scores)]
+        mean_s = float(np.mean(valid)) if len(valid) else 0.0
+        std_s = float(max(np.std(valid), 1e-8)) if len(valid) else 1e-8
+        return cls(disease_entities, treatment_relations, best_scores, best_pair,
+                   pair_relations, np.sort(valid), mean_s, std_s, exact_depth)
+
+    @property
+    def n_valid(self) -> int:
+        return len(self.sorted_valid)
+
+    @property
+    def n_ranked(self) -> int:
+        """Compounds with a finite score — n_valid, except for ANN results."""
+        return int(np.count_nonzero(~np.isinf(self.best_scores)))
+
+    def order(self) -> np.ndarray:
+        """Every compound row, best first. Sorted once, then kept."""
+        if self._order is None:
+            self._order = np.argsort(-self.best_scores, kind="stable")
+        return self._order
+
+    def ranked(self, start: int, stop: int) -> np.ndarray:
+        """Compound rows at ranked positions [start, stop)."""
+        n = len(self.best_scores)
+        start, stop = max(start, 0), min(max(stop, 0), n)
+        if stop <= start:
+            return np.empty(0, dtype=np.intp)
+        if start == 0 and stop < n and self._order is None:
+            # Top-k only: partition, then sort just the k winners. Ties go
+            # to the lower row, exactly as in the full stable order().
+            top = np.argpartition(-self.best_scores, stop - 1)[:stop]
+            return top[np.lexsort((top, -self.best_scores[top]))]
+        return self.order()[start:stop]
+
+    def percentiles(self, scores: np.ndarray) -> np.ndarray:
+        """Share of valid scores <= s (0-100), by binary search — or the null model's."""
+        if self.null is not None:
+            return self.null.percentiles(scores)
+        return np.searchsorted(self.sorted_valid, scores, side="right") / self.n_valid * 100
+
+    def z_scores(self, scores: np.ndarray) -> np.ndarray:
+        if self.null is not None:
+            return self.null.z_scores(scores)
+        return (scores - self.mean) / self.std
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  NORMALIZER
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -206,45 +376,52 @@ class DrugNameResolver:
       3. DrugBank ID (DB00xxx)
       4. ChEMBL ID (CHEMBLxxx)
       5. Database lookup: name → drugbank_id/chembl_id → entity
-      6. Fuzzy substring match (last resort)
+      6. Fuzzy substring match (last resort, trigram index)
+
+    Results, including misses, are cached per query string.
     """
 
-    def __init__(self, entity_to_idx: dict[str, int], db_path: Optional[str] = None):
+    def __init__(self, entity_to_idx: dict[str, int], db_path: Optional[str] = None,
+                 compound_names: Optional[list[str]] = None):
         self.entity_to_idx = entity_to_idx
+        if compound_names is None:
+            compound_names = [n for n in entity_to_idx if n.startswith("Compound::")]
+        self._compound_names = compound_names
 
         # Reverse index: ID → DRKG entity
         self._drugbank_to_entity: dict[str, str] = {}
         self._chembl_to_entity: dict[str, str] = {}
-        for name in entity_to_idx:
-            if not name.startswith("Compound::"):
-                continue
+        for name in compound_names:
             cid = name.replace("Compound::", "")
             if cid.startswith("DB"):
                 self._drugbank_to_entity[cid.upper()] = name
             elif cid.startswith("CHEMBL"):
                 self._chembl_to_entity[cid.upper()] = name
 
-        # Database cross-ref
-        self._db_name_to_drugbank: dict[str, str] = {}
-        self._db_name_to_chembl: dict[str, str] = {}
+        # Database cross-ref (queried per name, see drug_db.py)
+        self._db: Optional[DrugDB] = None
         if db_path and Path(db_path).exists():
             try:
-                conn = sqlite3.connect(db_path)
-                for row in conn.execute("SELECT drug_name, chembl_id, drugbank_id FROM dropped_drugs"):
-                    name, chembl, drugbank = row
-                    if name:
-                        key = name.lower().strip()
-                        if drugbank:
-                            self._db_name_to_drugbank[key] = drugbank.upper()
-                        if chembl:
-                            self._db_name_to_chembl[key] = chembl.upper()
-                conn.close()
+                self._db = DrugDB(db_path)
             except Exception as e:
-                logger.warning("Could not load drug database for name resolution: %s", e)
+                logger.warning("Could not open drug database for name resolution: %s", e)
+
+        self._fuzzy = LazySubstringIndex(lambda: self._compound_names)
+        self._cache = NameCache()
 
     def resolve(self, drug_name: str) -> Optional[str]:
         """Resolve a drug name to a DRKG entity. Returns None if not found."""
-        q = drug_name.strip()
+        key = drug_name.strip()
+        ent = self._cache.get(key)
+        if ent is not NameCache.MISSING:
+            metrics.count("name_cache_hit")
+            return ent
+        metrics.count("name_cache_miss")
+        ent = self._resolve(key)
+        self._cache.put(key, ent)
+        return ent
+
+    def _resolve(self, q: str) -> Optional[str]:
         ql = q.lower()
 
         # 1. Hardcoded
@@ -268,20 +445,22 @@ class DrugNameResolver:
             ent = self._chembl_to_entity.get(q.upper())
             if ent: return ent
 
+        ids = self._db.drug_ids([ql]).get(ql) if self._db is not None else None
+
         # 5. DB name → DrugBank → DRKG
-        dbid = self._db_name_to_drugbank.get(ql)
+        dbid = (ids or {}).get("drugbank_id")
         if dbid:
-            ent = self._drugbank_to_entity.get(dbid)
+            ent = self._drugbank_to_entity.get(dbid.upper())
             if ent: return ent
 
         # 6. DB name → ChEMBL → DRKG
-        cid = self._db_name_to_chembl.get(ql)
+        cid = (ids or {}).get("chembl_id")
         if cid:
-            ent = self._chembl_to_entity.get(cid)
+            ent = self._chembl_to_entity.get(cid.upper())
             if ent: return ent
 
-        # 7. Fuzzy substring
-        matches = [n for n in self.entity_to_idx if n.startswith("Compound::") and ql in n.lower()]
+        # 7. Fuzzy substring (shortest match wins)
+        matches = self._fuzzy.search(ql)
         if len(matches) == 1:
             return matches[0]
         elif len(matches) > 1:
@@ -300,33 +479,206 @@ class DRKGScorer:
 
     Loads real RotatE embeddings (~97K entities, ~5.8M edges).
     Scores ALL compounds in < 1 second (vectorized numpy).
+
+    backend="gemm" (or DRKG_SCORING_BACKEND=gemm) caches the rotated
+    compound heads per treatment relation and scores with matrix products.
+    Same rankings on float64 embeddings; on the float32 bundle, near-ties
+    (within GEMM_RTOL) may swap. A few ms per query, ~n_relations ×
+    compound_embs of extra float64 memory.
+
+    quantize="int8" / "float16" (or DRKG_QUANTIZE) scans a quantized copy of
+    the compounds and rescores the best ≥ rescore_k rows exactly. The top
+    ranks are identical to the exact scan; deeper scores are approximate.
+    Percentiles / z-scores place a score in that mixed distribution, so
+    they can differ slightly from the exact scan's (not with calibrate=True,
+    whose null is fixed).
+
+    use_ann=True (or DRKG_ANN=1) answers disease queries from a prebuilt IVF
+    index: only compounds in the probed lists are scored and ranked.
+
+    relation_weights (relation-name substring → weight) sets relation
+    reliability for the "weighted" reducer of score_disease_aggregated().
+
+    calibrate=True (or DRKG_CALIBRATE=1) takes percentiles / z-scores from
+    a prebuilt null model, so they compare across diseases.
+
+    explain_neighbors() lists, per prediction, the nearest compounds in
+    embedding space that are known treatments (see neighbors.py);
+    mechanism_paths() lists graph paths from compounds to a disease
+    (see graph.py).
+
+    ensemble="rank" / "zscore" (or DRKG_ENSEMBLE) also loads the other
+    model (TransE next to RotatE, or the reverse; see ensemble.py) and
+    ranks by the fused scores, each prediction keeping the per-model
+    breakdown in model_scores. One extra compound scan per query; the
+    quantized scan and ANN index are bypassed, as fusion needs exact
+    scores for every compound.
     """
 
-    def __init__(self, embeddings_dir: str, db_path: Optional[str] = None):
+    def __init__(self, embeddings_dir: str, db_path: Optional[str] = None,
+                 use_bundle: bool = True, backend: Optional[str] = None,
+                 score_cache_size: int = SCORE_CACHE_SIZE,
+                 use_score_matrix: bool = True,
+                 bundle: Optional[EmbeddingBundle] = None,
+                 threads: Optional[int] = None,
+                 chunk_rows: int = SCORE_CHUNK_ROWS,
+                 quantize: Optional[str] = None,
+                 rescore_k: int = RESCORE_DEPTH,
+                 use_ann: Optional[bool] = None,
+                 nprobe: int = ANN_NPROBE,
+                 relation_weights: Optional[dict[str, float]] = None,
+                 calibrate: Optional[bool] = None,
+                 ensemble: Optional[str] = None):
         self.embeddings_dir = Path(embeddings_dir)
         self.db_path = db_path
+        self.use_bundle = use_bundle
+        self.backend = backend or os.environ.get("DRKG_SCORING_BACKEND", "direct")
+        if self.backend not in SCORING_BACKENDS:
+            raise ValueError(f"Unknown scoring backend {self.backend!r}. "
+                             f"Expected one of {SCORING_BACKENDS}")
+        self.threads = max(1, threads or int(os.environ.get("DRKG_SCORING_THREADS", 0))
+                           or SCORING_THREADS)
+        self.chunk_rows = max(1, chunk_rows)
+        self.quantize = quantize or os.environ.get("DRKG_QUANTIZE") or None
+        if self.quantize is not None and self.quantize not in QUANT_DTYPES:
+            raise ValueError(f"Unknown quantization {self.quantize!r}. "
+                             f"Expected one of {QUANT_DTYPES}")
+        self.rescore_k = max(1, rescore_k)
+        self.ensemble = ensemble or os.environ.get("DRKG_ENSEMBLE") or None
+        if self.ensemble is not None and self.ensemble not in FUSIONS:
+            raise ValueError(f"Unknown ensemble fusion {self.ensemble!r}. "
+                             f"Expected one of {FUSIONS}")
+        if use_ann is None:
+            use_ann = os.environ.get("DRKG_ANN", "") not in ("", "0")
+        self.nprobe = max(1, nprobe)
+        self.relation_weights = dict(RELATION_WEIGHTS if relation_weights is None
+                                     else relation_weights)
+        self.quantized: Optional[QuantizedCompounds] = None
+        self.partner: Optional[PartnerModel] = None   # ensemble: the other model
+        self._chunk_pool: Optional[ThreadPoolExecutor] = None
+        self._chunk_pool_lock = threading.Lock()
 
         # Populated by _load()
         self.entity_emb: np.ndarray = np.array([])
         self.relation_emb: np.ndarray = np.array([])
-        self.entity_to_idx: dict[str, int] = {}
+        self.entity_to_idx: dict[str, int] = {}   # EntityVocab when bundled
         self.relation_to_idx: dict[str, int] = {}
         self.method: str = ""
         self.complex_dim: int = 0
         self.training_metadata: Optional[dict] = None
+        self.bundle: Optional[EmbeddingBundle] = None
+        self.embedding_version: str = ""   # bundle / release version, or raw-<stamps digest>
 
         # Populated by _build_indices()
         self.compound_indices: np.ndarray = np.array([], dtype=np.int64)
         self.compound_names: list[str] = []
+        self.compound_pos: dict[str, int] = {}   # Compound:: entity → row in compound_embs
         self.compound_embs: Optional[np.ndarray] = None
+        self.disease_indices: np.ndarray = np.array([], dtype=np.int64)
+        self.disease_names: list[str] = []
         self.resolver: Optional[DrugNameResolver] = None
 
-        self._load()
-        self._build_indices()
+        # Populated lazily by _rotated_heads() (gemm backend)
+        self._hr_cache: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self._hr_lock = threading.Lock()
+        self._disease_embs: Optional[np.ndarray] = None   # lazily, for score_drug()
+        self._partner_disease_embs: Optional[np.ndarray] = None
+        self._disease_index = LazySubstringIndex(lambda: self.disease_names)
+        self._disease_cache = NameCache()
+        self._disease_pos: Optional[dict[str, int]] = None   # lazily, for explain_neighbors()
+
+        # Loaded on first explain_neighbors() call (see neighbors.py)
+        self._neighbor_index: Optional[NeighborIndex] = None
+        self._neighbors_loaded = False
+        self._neighbors_lock = threading.Lock()
+
+        # Loaded on first mechanism_paths() call (see graph.py)
+        self._graph: Optional[CsrGraph] = None
+        self._graph_loaded = False
+        self._graph_lock = threading.Lock()
+
+        # LRU of full per-disease score vectors, keyed by resolved entities
+        self.score_cache_size = score_cache_size
+        self._score_cache: OrderedDict[tuple[str, ...], DiseaseScores] = OrderedDict()
+        self._score_cache_lock = threading.Lock()
+
+        t_load = time.perf_counter()
+        with metrics.stage("load_embeddings"):
+            self._load(bundle)
+        with metrics.stage("build_indices"):
+            self._build_indices()
+        if self.quantize is not None:
+            with metrics.stage("load_quantized"):
+                self._load_quantized()
+        if self.ensemble is not None:
+            with metrics.stage("load_partner"):
+                self.partner = load_partner(self)
+            if self.partner is None:
+                logger.warning("ensemble=%s but no second embedding model next to %s — "
+                               "scoring with %s alone", self.ensemble, self.method, self.method)
+                self.ensemble = None
+        self.load_ms = (time.perf_counter() - t_load) * 1000
+
+        # Precomputed disease × compound scores (see score_matrix.py)
+        self.score_matrix: Optional[ScoreMatrix] = (
+            load_score_matrix(self) if use_score_matrix else None
+        )
+
+        # Approximate top-k retrieval (see ann_index.py)
+        self.ann_index: Optional[AnnIndex] = load_ann_index(self) if use_ann else None
+        if use_ann and self.ann_index is None:
+            logger.warning("use_ann set but no usable index — scoring every compound. "
+                           "Build with: python scripts/build_kg.py ann")
+
+        # Percentiles / z-scores against a fixed null (see calibration.py)
+        if calibrate is None:
+            calibrate = os.environ.get("DRKG_CALIBRATE", "") not in ("", "0")
+        self.null_model: Optional[NullModel] = load_null_model(self) if calibrate else None
+        if calibrate and self.null_model is None:
+            logger.warning("calibrate set but no usable null model — percentiles are "
+                           "per query. Build with: python scripts/build_kg.py null")
 
     # ── Loading ──
 
-    def _load(self) -> None:
+    def _load(self, bundle: Optional[EmbeddingBundle] = None) -> None:
+        d = self.embeddings_dir
+
+        if bundle is None and self.use_bundle:
+            bundle = load_bundle(str(d))
+        if bundle is not None:
+            self._load_from_bundle(bundle)
+        else:
+            self._load_raw()
+
+        # Training metadata (optional). A release carries the metadata it
+        # was trained with; the file on disk may already describe a newer run.
+        meta = d.parent / "models" / "rotate_model" / "metadata.json"
+        if bundle is not None and bundle.manifest.get("training") is not None:
+            self.training_metadata = bundle.manifest["training"]
+        elif meta.exists():
+            with open(meta) as f:
+                self.training_metadata = json.load(f)
+
+        if bundle is not None and bundle.version:
+            self.embedding_version = bundle.version
+        else:
+            stamps = json.dumps(source_stamps(d), sort_keys=True).encode()
+            self.embedding_version = "raw-" + hashlib.sha1(stamps).hexdigest()[:12]
+
+    def _load_from_bundle(self, bundle: EmbeddingBundle) -> None:
+        """Memory-mapped float32 arrays, compounds first (see bundle.py)."""
+        self.bundle = bundle
+        self.entity_emb = bundle.entity_emb
+        self.relation_emb = bundle.relation_emb
+        self.entity_to_idx = bundle.entity_to_idx
+        self.relation_to_idx = bundle.relation_to_idx
+        self.method = bundle.method
+        self.complex_dim = bundle.complex_dim
+        logger.info("Mapped %s bundle %s: %s (complex_dim=%d, %.0f MB float32)",
+                    self.method, bundle.path, self.entity_emb.shape, self.complex_dim,
+                    self.entity_emb.nbytes / 1e6)
+
+    def _load_raw(self) -> None:
         d = self.embeddings_dir
 
         rotate_ent = d / "rotate_entity_embeddings.npy"
@@ -394,30 +746,62 @@ class DRKGScorer:
         else:
             raise FileNotFoundError(f"No ID mappings in {d}")
 
-        # Training metadata (optional)
-        meta = d.parent / "models" / "rotate_model" / "metadata.json"
-        if meta.exists():
-            with open(meta) as f:
-                self.training_metadata = json.load(f)
-
     def _build_indices(self) -> None:
-        indices, names = [], []
-        for name, idx in self.entity_to_idx.items():
-            if name.startswith("Compound::"):
-                indices.append(idx)
-                names.append(name)
-        self.compound_indices = np.array(indices, dtype=np.int64)
+        vocab = self.entity_to_idx
+        if isinstance(vocab, EntityVocab):
+            # Bundle rows are grouped by type — read the ranges, no scan.
+            names = vocab.names_of_type("Compound")
+            d_names = vocab.names_of_type("Disease")
+            self.compound_indices = np.arange(*vocab.range("Compound"), dtype=np.int64)
+            self.disease_indices = np.arange(*vocab.range("Disease"), dtype=np.int64)
+        else:
+            indices, names = [], []
+            d_indices, d_names = [], []
+            for name, idx in vocab.items():
+                if name.startswith("Compound::"):
+                    indices.append(idx)
+                    names.append(name)
+                elif name.startswith("Disease::"):
+                    d_indices.append(idx)
+                    d_names.append(name)
+            self.compound_indices = np.array(indices, dtype=np.int64)
+            self.disease_indices = np.array(d_indices, dtype=np.int64)
+        self.disease_names = d_names
         self.compound_names = names
-        self.compound_embs = self.entity_emb[self.compound_indices]
+        self.compound_pos = {name: i for i, name in enumerate(names)}
+        if self.bundle is not None:
+            # Bundle rows [0, n) are the compounds — slice the map, no copy.
+            self.compound_embs = self.entity_emb[:self.bundle.n_compounds]
+        else:
+            self.compound_embs = self.entity_emb[self.compound_indices]
 
-        self.resolver = DrugNameResolver(self.entity_to_idx, db_path=self.db_path)
+        self.resolver = DrugNameResolver(self.entity_to_idx, db_path=self.db_path,
+                                         compound_names=names)
         logger.info("Indexed %d compounds (%.0f MB pre-fetched)",
                      len(names), self.compound_embs.nbytes / 1e6)
 
+    def _load_quantized(self) -> None:
+        q = (load_quantized(self.bundle, str(self.embeddings_dir), self.quantize)
+             if self.bundle is not None else None)
+        if q is None:
+            logger.info("No prebuilt %s compounds — quantizing in memory "
+                        "(prebuild with: python scripts/build_kg.py quantize)", self.quantize)
+            q = quantize_compounds(self.compound_embs, self.quantize)
+        self.quantized = q
+        logger.info("Quantized scan: %s compounds (%.0f MB), rescoring top %d exactly",
+                    q.kind, q.nbytes / 1e6, self.rescore_k)
+
     # ── Entity Resolution ──
 
     def resolve_disease(self, query: str) -> list[str]:
         """Disease name → DRKG entity IDs. Demo entities checked first."""
+        hit = self._disease_cache.get(query)
+        if hit is NameCache.MISSING:
+            hit = tuple(self._resolve_disease(query))
+            self._disease_cache.put(query, hit)
+        return list(hit)
+
+    def _resolve_disease(self, query: str) -> list[str]:
         q = query.lower().strip()
         for key, entities in DEMO_DISEASE_ENTITIES.items():
             if key in q or q in key:
@@ -426,7 +810,7 @@ class DRKGScorer:
                     return valid
         if query in self.entity_to_idx:
             return [query]
-        return [n for n in self.entity_to_idx if n.startswith("Disease::") and q in n.lower()][:10]
+        return self._disease_index.search(q, limit=10)
 
     def find_treatment_relations(self) -> list[tuple[str, int]]:
         """Find all treatment-type relations in the graph."""
@@ -437,7 +821,8 @@ class DRKGScorer:
 
     # ── Scoring (THE CRITICAL MATH) ──
 
-    def _score_rotate(self, heads: np.ndarray, relation: np.ndarray, tail: np.ndarray) -> np.ndarray:
+    def _score_rotate(self, heads: np.ndarray, relation: np.ndarray, tail: np.ndarray,
+                      complex_dim: Optional[int] = None) -> np.ndarray:
         """
         RotatE: h ∘ r ≈ t — element-wise COMPLEX multiplication.
 
@@ -446,7 +831,7 @@ class DRKGScorer:
         The cookbook had a critical bug: naive h*r (element-wise real multiply).
         That ignores the complex structure entirely. Difference: ~0.748 on real data.
         """
-        d = self.complex_dim
+        d = self.complex_dim if complex_dim is None else complex_dim
         re_h, im_h = heads[:, :d], heads[:, d:]
         re_r, im_r = relation[:d], relation[d:]
         re_t, im_t = tail[:d], tail[d:]
@@ -460,152 +845,1167 @@ class DRKGScorer:
         """TransE: h + r ≈ t."""
         return -np.linalg.norm(heads + relation - tail, axis=1)
 
+    def _score_direct(self, rel_idx: int, tail: np.ndarray,
+                      heads: Optional[np.ndarray] = None,
+                      model: Optional[PartnerModel] = None) -> np.ndarray:
+        """
+        _score_rotate / _score_transe over every compound, chunk by chunk,
+        into one preallocated vector. Rows are independent, so the result is
+        identical to scoring compound_embs in one piece.
+
+        heads defaults to compound_embs; the quantized scan passes its
+        QuantizedCompounds (slices dequantize to float32). model=partner
+        scores the ensemble partner's compounds with its own math.
+        """
+        m = self if model is None else model
+        heads = m.compound_embs if heads is None else heads
+        rel = m.relation_emb[rel_idx]
+        if m.method == "RotatE":
+            score = lambda h, r, t: self._score_rotate(h, r, t, m.complex_dim)
+        else:
+            score = self._score_transe
+        n, step = len(heads), self.chunk_rows
+        out = np.empty(n, dtype=np.result_type(heads.dtype, rel.dtype, tail.dtype))
+
+        def run(start: int) -> None:
+            stop = min(start + step, n)
+            out[start:stop] = score(heads[start:stop], rel, tail)
+            metrics.count("score_chunks")
+
+        self._run_chunks(run, range(0, n, step))
+        return out
+
+    def _run_chunks(self, run: Callable[[int], None], starts: range) -> None:
+        """
+        run(start) for every chunk start, on the chunk pool when threaded.
+        Each task runs in a copy of the caller's context, so metrics stages
+        and counters recorded in the workers reach the caller's collector.
+        """
+        if self.threads == 1 or len(starts) < 2:
+            for start in starts:
+                run(start)
+            return
+        pool = self._get_chunk_pool()
+        for f in [pool.submit(contextvars.copy_context().run, run, s) for s in starts]:
+            f.result()
+
+    def _get_chunk_pool(self) -> ThreadPoolExecutor:
+        if self._chunk_pool is None:
+            with self._chunk_pool_lock:
+                if self._chunk_pool is None:
+                    self._chunk_pool = ThreadPoolExecutor(
+                        max_workers=self.threads, thread_name_prefix="drkg-score")
+        return self._chunk_pool
+
+    def _apply_relation(self, heads: np.ndarray, rel_idx: int,
+                        model: Optional[PartnerModel] = None) -> np.ndarray:
+        """h∘r (RotatE, complex product) or h+r (TransE) for rows of heads, float64."""
+        m = self if model is None else model
+        heads = np.atleast_2d(np.asarray(heads, dtype=np.float64))
+        rel = np.asarray(m.relation_emb[rel_idx], dtype=np.float64)
+        if m.method != "RotatE":
+            return heads + rel
+        d = m.complex_dim
+        re_h, im_h = heads[:, :d], heads[:, d:]
+        re_r, im_r = rel[:d], rel[d:]
+        hr = np.empty_like(heads)
+        hr[:, :d] = re_h * re_r - im_h * im_r
+        hr[:, d:] = re_h * im_r + im_h * re_r
+        return hr
+
+    def _rotated_heads(self, rel_idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (HR, ‖HR‖²) for one relation: h∘r (RotatE) or h+r (TransE) for every
+        compound, in float64. Built once per relation, then reused.
+        """
+        cached = self._hr_cache.get(rel_idx)
+        if cached is not None:
+            return cached
+        with self._hr_lock:
+            cached = self._hr_cache.get(rel_idx)
+            if cached is not None:
+                return cached
+
+            hr = self._apply_relation(self.compound_embs, rel_idx)
+            cached = (hr, np.einsum("ij,ij->i", hr, hr))
+            self._hr_cache[rel_idx] = cached
+            logger.info("Cached rotated heads for relation %d (%.0f MB)",
+                        rel_idx, hr.nbytes / 1e6)
+            return cached
+
+    def _score_gemm(self, rel_idx: int, tails: np.ndarray) -> np.ndarray:
+        """
+        Distance-based score for every compound × tail via one GEMM:
+
+            ‖h∘r − t‖² = ‖HR‖² − 2·HR·t + ‖t‖²
+
+        tails: (m, dim). Returns (n_compounds, m), float64 whatever the
+        embeddings' dtype (see GEMM_RTOL).
+        """
+        hr, hr_sq = self._rotated_heads(rel_idx)
+        t = np.asarray(tails, dtype=np.float64)
+        d2 = hr @ t.T
+        d2 *= -2.0
+        d2 += hr_sq[:, None]
+        d2 += np.einsum("ij,ij->i", t, t)[None, :]
+        np.maximum(d2, 0.0, out=d2)   # clamp tiny negatives from cancellation
+        return -np.sqrt(d2)
+
+    def _iter_scores(self, tail_indices: list[int], treatment_rels: list[tuple[str, int]]):
+        """
+        Yield (relation_name, scores over all compounds) for every disease
+        entity × treatment relation, entity-major (the order ties resolve in).
+        """
+        if self.backend == "gemm":
+            tails = self.entity_emb[tail_indices]
+            per_rel = [self._score_gemm(rel_idx, tails) for _, rel_idx in treatment_rels]
+            for j in range(len(tail_indices)):
+                for (rel_name, _), mat in zip(treatment_rels, per_rel):
+                    yield rel_name, mat[:, j]
+            return
+
+        for d_idx in tail_indices:
+            tail = self.entity_emb[d_idx]
+            for rel_name, rel_idx in treatment_rels:
+                yield rel_name, self._score_direct(rel_idx, tail)
+
     # ── Main Entry Points ──
 
-    def score_disease(self, disease_query: str, top_k: int = 50) -> KGResult:
+    @metrics.instrumented("score_disease")
+    def score_disease(self, disease_query: str, top_k: int = 50,
+                      aggregation: str = "max") -> KGResult:
         """
         Score ALL compounds against a disease. Returns top-k ranked.
 
         This is the discovery function. It scores every compound in DRKG
         (~24K) across all disease entities × treatment relations, keeps
         the best score per compound, and returns percentile-ranked results.
+        Any other `aggregation` (see AGGREGATIONS) goes through
+        score_disease_aggregated() and is not cached.
         """
+        if aggregation != "max":
+            return self.score_disease_aggregated(disease_query, [aggregation], top_k)[aggregation]
         t0 = time.perf_counter()
 
+        scores, err = self.disease_scores(disease_query, min_exact=top_k)
+        if err is not None:
+            return err
+        return self._build_result(disease_query, scores, top_k, t0)
+
+    def disease_scores(self, disease_query: str, min_exact: int = 0
+                       ) -> tuple[Optional[DiseaseScores], Optional[KGResult]]:
+        """
+        Full score vector for a disease query, or (None, error result).
+
+        Recent queries are served from an LRU keyed by the resolved disease
+        entities, so "glioblastoma" and "Glioblastoma" share one entry.
+        With a quantized scan, at least the top max(rescore_k, min_exact)
+        ranks are exact. An ensemble scorer returns the fused scores.
+        """
+        with metrics.stage("resolve"):
+            disease_entities, treatment_rels, err = self._prepare_query(disease_query)
+        if err is not None:
+            return None, err
+
+        key = tuple(disease_entities)
+        hit = self._cached_scores(key, min_exact)
+        if hit is not None:
+            return hit, None
+
+        with metrics.stage("score"):
+            if self.partner is not None:
+                scores = self._ensemble_scores(disease_entities, treatment_rels)
+            elif self._use_ann(disease_entities):
+                scores = self._ann_scores(disease_entities, treatment_rels,
+                                          max(ANN_DEPTH, min_exact))
+            else:
+                exact_depth = max(self.rescore_k, min_exact) if self.quantized is not None else None
+                best_scores, best_pair, pair_relations = self._score_vector(
+                    disease_entities, treatment_rels, exact_depth)
+                scores = DiseaseScores.from_scores(
+                    disease_entities, [r[0] for r in treatment_rels],
+                    best_scores, best_pair, pair_relations, exact_depth,
+                )
+            null = self._null_for(disease_entities)
+            if scores.models is not None:
+                # The null is of the primary model's score, not the fused one.
+                scores.models[self.method].null = null
+            else:
+                scores.null = null
+
+        self._cache_scores(key, scores)
+        return scores, None
+
+    def _null_for(self, disease_entities: list[str]) -> Optional[NullModel]:
+        """The null model for a best score over these entities (see calibration.py)."""
+        if self.null_model is None:
+            return None
+        k = sum(1 for e in disease_entities if e in self.entity_to_idx)
+        return self.null_model.for_entities(k)
+
+    def _cached_scores(self, key: tuple[str, ...], min_exact: int = 0) -> Optional[DiseaseScores]:
+        """LRU lookup for disease_scores(): a hit is exact at least min_exact deep."""
+        with self._score_cache_lock:
+            hit = self._score_cache.get(key)
+            if hit is not None and (hit.exact_depth is None or hit.exact_depth >= min_exact):
+                self._score_cache.move_to_end(key)
+                metrics.count("score_cache_hit")
+                return hit
+        metrics.count("score_cache_miss")
+        return None
+
+    def _cache_scores(self, key: tuple[str, ...], scores: DiseaseScores) -> None:
+        if self.score_cache_size > 0:
+            with self._score_cache_lock:
+                self._score_cache[key] = scores
+                self._score_cache.move_to_end(key)
+                while len(self._score_cache) > self.score_cache_size:
+                    self._score_cache.popitem(last=False)
+
+    def _ensemble_scores(self, disease_entities: list[str],
+                         treatment_rels: list[tuple[str, int]]) -> DiseaseScores:
+        """
+        Fused DiseaseScores: the primary model's exact best-pair vector
+        (from the score matrix when it covers the query), ONE scan of the
+        partner's compounds, then ensemble.fuse(). best_pair, and so
+        relation_used, is the primary model's.
+        """
+        rel_names = [r[0] for r in treatment_rels]
+        best, pair, pair_relations = self._score_vector(disease_entities, treatment_rels)
+        tail_indices = [self.entity_to_idx[e] for e in disease_entities if e in self.entity_to_idx]
+        p_best, p_pair = self._reduce_pairs(
+            [self._score_direct(rel_idx, self.partner.entity(t), model=self.partner)
+             for t in tail_indices for _, rel_idx in treatment_rels])
+        metrics.count("partner_compounds_scored", len(self.compound_names) * len(tail_indices))
+
+        models = {
+            method: DiseaseScores.from_scores(disease_entities, rel_names, b, bp, pair_relations)
+            for method, b, bp in ((self.method, best, pair), (self.partner.method, p_best, p_pair))
+        }
+        scores = DiseaseScores.from_scores(disease_entities, rel_names,
+                                           fuse([best, p_best], self.ensemble), pair,
+                                           pair_relations)
+        scores.models, scores.fusion = models, self.ensemble
+        return scores
+
+    def method_of(self, scores: DiseaseScores) -> str:
+        """Method reported for a score vector: "RotatE", or "RotatE+TransE" if fused."""
+        return "+".join(scores.models) if scores.models else self.method
+
+    def _model_scores(self, models: Optional[dict[str, DiseaseScores]],
+                      rows: np.ndarray) -> list[Optional[dict[str, dict]]]:
+        """Per-model {score, percentile, z_score, rank} of rows (ensemble), else Nones."""
+        if not models:
+            return [None] * len(rows)
+        out: list[dict[str, dict]] = [{} for _ in rows]
+        for method, ms in models.items():
+            vals = ms.best_scores[rows]
+            pctls, zs = ms.percentiles(vals), ms.z_scores(vals)
+            ranks = ms.n_valid - np.searchsorted(ms.sorted_valid, vals, side="right") + 1
+            for i, d in enumerate(out):
+                d[method] = {"score": round(float(vals[i]), 4),
+                             "percentile": round(float(pctls[i]), 2),
+                             "z_score": round(float(zs[i]), 3),
+                             "rank": int(ranks[i])}
+        return out
+
+    def ranked_predictions(self, scores: DiseaseScores, start: int, stop: int) -> list[KGPrediction]:
+        """KGPredictions for ranked positions [start, stop) — rank = position + 1."""
+        with metrics.stage("rank"):
+            rows = scores.ranked(start, stop)
+            return self._ranked_rows(scores, rows, np.arange(start, start + len(rows)))
+
+    def predictions_at(self, scores: DiseaseScores, positions: np.ndarray) -> list[KGPrediction]:
+        """KGPredictions for arbitrary ranked positions (e.g. a filtered ranking)."""
+        with metrics.stage("rank"):
+            positions = np.asarray(positions, dtype=np.intp)
+            return self._ranked_rows(scores, scores.order()[positions], positions)
+
+    def _ranked_rows(self, scores: DiseaseScores, rows: np.ndarray,
+                     positions: np.ndarray) -> list[KGPrediction]:
+        vals = scores.best_scores[rows]
+        pctls = scores.percentiles(vals)
+        zs = scores.z_scores(vals)
+        method = self.method_of(scores)
+        per_model = self._model_scores(scores.models, rows)
+        return [
+            self._prediction(self.compound_names[idx], vals[i], pctls[i], zs[i],
+                             int(positions[i]) + 1,
+                             scores.pair_relations[scores.best_pair[idx]],
+                             method=method, model_scores=per_model[i])
+            for i, idx in enumerate(rows)
+            if not np.isinf(vals[i])
+        ]
+
+    @metrics.instrumented("score_diseases")
+    def score_diseases(self, queries: list[str], top_k: int = 50,
+                       memory_budget_mb: float = BATCH_MEMORY_BUDGET_MB) -> list[KGResult]:
+        """
+        Score ALL compounds against a panel of diseases. One KGResult per
+        query, in input order, each what score_disease() returns for it.
+        Queries take the same route as in disease_scores(): LRU, score
+        matrix, quantized scan, ANN, ensemble. Every result lands in the LRU.
+
+        Only plain gemm scans are batched (backend="gemm", nothing
+        precomputed covers the query): the uncached queries' tails are
+        stacked into one matrix and scored with the cached rotated heads
+        (see _score_gemm), in blocks of tails sized so the n_compounds ×
+        block × n_relations score buffers fit memory_budget_mb. The wider
+        matrix product rounds differently, so these scores equal
+        score_disease()'s to float64 rounding, not bit for bit.
+        """
+        t_start = time.perf_counter()
+        results: list[Optional[KGResult]] = [None] * len(queries)
+
+        # Resolve everything up front; errors become results immediately.
+        pending: list[tuple[int, list[str], list[tuple[str, int]], list[int]]] = []
+        for qi, query in enumerate(queries):
+            with metrics.stage("resolve"):
+                disease_entities, treatment_rels, err = self._prepare_query(query)
+            if err is not None:
+                results[qi] = err
+                continue
+            t1 = time.perf_counter()
+            if not self._batchable(disease_entities):
+                scores, err = self.disease_scores(query, min_exact=top_k)
+                results[qi] = err if err is not None else self._build_result(query, scores, top_k, t1)
+                continue
+            hit = self._cached_scores(tuple(disease_entities), top_k)
+            if hit is not None:
+                results[qi] = self._build_result(query, hit, top_k, t1)
+                continue
+            tail_indices = [self.entity_to_idx[e] for e in disease_entities
+                            if e in self.entity_to_idx]
+            pending.append((qi, disease_entities, treatment_rels, tail_indices))
+
+        if pending:
+            treatment_rels = pending[0][2]
+            n = len(self.compound_indices)
+            bytes_per_tail = max(n * len(treatment_rels) * 8, 1)
+            max_tails = max(1, int(memory_budget_mb * 2**20 // bytes_per_tail))
+
+            # Greedily group queries so each group's unique tails fit the budget.
+            groups: list[list[int]] = [[]]
+            group_tails: set[int] = set()
+            for pi, (_, _, _, tails) in enumerate(pending):
+                merged = group_tails | set(tails)
+                if groups[-1] and len(merged) > max_tails:
+                    groups.append([])
+                    merged = set(tails)
+                groups[-1].append(pi)
+                group_tails = merged
+
+            for group in groups:
+                t0 = time.perf_counter()
+                tails = sorted({t for pi in group for t in pending[pi][3]})
+                col = {t: j for j, t in enumerate(tails)}
+                tail_emb = self.entity_emb[tails]
+                with metrics.stage("score"):
+                    mats = [self._score_gemm(rel_idx, tail_emb) for _, rel_idx in treatment_rels]
+                metrics.count("compounds_scored", n * len(tails))
+                share = (time.perf_counter() - t0) / len(group)
+
+                for pi in group:
+                    t1 = time.perf_counter() - share
+                    qi, disease_entities, rels, tail_indices = pending[pi]
+                    # Entity-major (entity × relation) rows: argmax keeps the
+                    # first best pair, same tie-breaking as score_disease.
+                    best_scores, best_pair = self._reduce_pairs(
+                        [mat[:, col[t]] for t in tail_indices for mat in mats])
+                    pair_relations = [name for _ in tail_indices for name, _ in rels]
+                    scores = DiseaseScores.from_scores(
+                        disease_entities, [r[0] for r in rels],
+                        best_scores, best_pair, pair_relations,
+                    )
+                    scores.null = self._null_for(disease_entities)
+                    self._cache_scores(tuple(disease_entities), scores)
+                    results[qi] = self._build_result(queries[qi], scores, top_k, t1)
+
+        logger.info("Scored %d diseases in %.0fms", len(queries),
+                    (time.perf_counter() - t_start) * 1000)
+        return results  # type: ignore[return-value]
+
+    def _batchable(self, disease_entities: list[str]) -> bool:
+        """Would disease_scores() answer these entities with a plain gemm scan?"""
+        if (self.backend != "gemm" or self.partner is not None or self.quantized is not None
+                or self._use_ann(disease_entities)):
+            return False
+        tails = [e for e in disease_entities if e in self.entity_to_idx]
+        return not (self.score_matrix is not None and self.score_matrix.covers(tails))
+
+    def score_disease_aggregated(self, disease_query: str,
+                                 modes: tuple[str, ...] | list[str] = AGGREGATIONS,
+                                 top_k: int = 50, breakdown: bool = False
+                                 ) -> dict[str, KGResult]:
+        """
+        Rank compounds under several reducers from ONE scan of the
+        entity × relation × compound scores. {mode: KGResult}, each with
+        its own percentiles / z-scores.
+
+            max        best pair (same ranking as score_disease)
+            mean       mean over pairs
+            logsumexp  soft maximum, log Σ exp(score)
+            weighted   mean weighted by relation_weights
+
+        Always an exact scan over compound_embs (the score matrix, quantized
+        scan and ANN index only hold the max). relation_used is the best
+        pair in every mode. breakdown=True adds relation_scores (best score
+        per treatment relation) to each top-k prediction.
+        """
+        unknown = [m for m in modes if m not in AGGREGATIONS]
+        if unknown:
+            raise ValueError(f"Unknown aggregation {unknown}. Expected one of {AGGREGATIONS}")
+        t0 = time.perf_counter()
+
+        with metrics.stage("resolve"):
+            disease_entities, treatment_rels, err = self._prepare_query(disease_query)
+        if err is not None:
+            return {m: err for m in modes}
+
+        tail_indices = [self.entity_to_idx[e] for e in disease_entities if e in self.entity_to_idx]
+        with metrics.stage("score"):
+            vectors = self._aggregate_vectors(tail_indices, treatment_rels, modes)
+        metrics.count("compounds_scored", len(self.compound_names) * len(tail_indices))
+        pair_relations = [name for _ in tail_indices for name, _ in treatment_rels]
+
+        results = {}
+        for mode in modes:
+            agg_scores, best_pair = vectors[mode]
+            scores = DiseaseScores.from_scores(
+                disease_entities, [r[0] for r in treatment_rels],
+                agg_scores, best_pair, pair_relations,
+            )
+            if mode == "max":
+                scores.null = self._null_for(disease_entities)   # null of the best-pair score
+            result = self._build_result(disease_query, scores, top_k, t0)
+            result.aggregation = mode
+            if breakdown and result.predictions:
+                with metrics.stage("breakdown"):
+                    self._relation_breakdown(result.predictions, tail_indices, treatment_rels)
+            results[mode] = result
+        return results
+
+    def _aggregate_vectors(self, tail_indices: list[int], treatment_rels: list[tuple[str, int]],
+                           modes: tuple[str, ...] | list[str]
+                           ) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        {mode: (scores, best_pair)} over every compound. Compounds are done
+        in chunks of chunk_rows, so the pair × compound block held at once
+        is n_pairs × chunk_rows float64, never the whole tensor. Pair rows
+        are entity-major and chunks are sliced as in _score_direct, so "max"
+        is identical to _score_vector.
+        """
+        pairs = [(self.entity_emb[t], rel_idx) for t in tail_indices for _, rel_idx in treatment_rels]
+        n = len(self.compound_embs)
+        best_pair = np.zeros(n, dtype=np.intp)
+        if not pairs:
+            return {m: (np.full(n, -np.inf, dtype=np.float64), best_pair) for m in modes}
+
+        weights = np.array([self._relation_weight(name)
+                            for _ in tail_indices for name, _ in treatment_rels])
+        weights /= max(weights.sum(), 1e-12)
+        score = self._score_rotate if self.method == "RotatE" else self._score_transe
+        out = {m: np.empty(n, dtype=np.float64) for m in modes}
+        step = self.chunk_rows
+
+        def run(start: int) -> None:
+            stop = min(start + step, n)
+            heads = self.compound_embs[start:stop]
+            block = np.empty((len(pairs), stop - start), dtype=np.float64)
+            for p, (tail, rel_idx) in enumerate(pairs):
+                block[p] = score(heads, self.relation_emb[rel_idx], tail)
+            block[np.isnan(block)] = -np.inf
+            bp = np.argmax(block, axis=0)
+            best = block[bp, np.arange(stop - start)]
+            best_pair[start:stop] = bp
+            with np.errstate(invalid="ignore", over="ignore"):
+                for mode in modes:
+                    if mode == "max":
+                        v = best
+                    elif mode == "mean":
+                        v = block.mean(axis=0)
+                    elif mode == "weighted":
+                        v = weights @ block
+                    else:   # logsumexp, shifted by the max for stability
+                        v = best + np.log(np.exp(block - best).sum(axis=0))
+                        v[np.isinf(best)] = -np.inf
+                    out[mode][start:stop] = np.where(np.isnan(v), -np.inf, v)
+
+        self._run_chunks(run, range(0, n, step))
+        return {m: (out[m], best_pair) for m in modes}
+
+    def _relation_weight(self, relation: str) -> float:
+        for pattern, w in self.relation_weights.items():
+            if pattern in relation:
+                return float(w)
+        return 1.0
+
+    def _relation_breakdown(self, predictions: list[KGPrediction], tail_indices: list[int],
+                            treatment_rels: list[tuple[str, int]]) -> None:
+        """Set relation_scores (best over disease entities, per relation) on predictions."""
+        rows = np.array([self.compound_pos[p.drug_entity] for p in predictions], dtype=np.int64)
+        order = np.argsort(rows)
+        heads = np.asarray(self.compound_embs[rows[order]])
+        score = self._score_rotate if self.method == "RotatE" else self._score_transe
+        for p in predictions:
+            p.relation_scores = {}
+        for rel_name, rel_idx in treatment_rels:
+            best, _ = self._reduce_pairs(
+                [score(heads, self.relation_emb[rel_idx], self.entity_emb[t]) for t in tail_indices])
+            per_row = np.empty_like(best)
+            per_row[order] = best
+            for p, v in zip(predictions, per_row):
+                p.relation_scores[rel_name] = None if np.isinf(v) else round(float(v), 4)
+
+    def _prepare_query(self, disease_query: str) -> tuple[list[str], list[tuple[str, int]], Optional[KGResult]]:
+        """Resolve disease entities + treatment relations, or an error result."""
         disease_entities = self.resolve_disease(disease_query)
         if not disease_entities:
-            return KGResult(
+            return [], [], KGResult(
                 disease_query=disease_query, disease_entities_used=[],
                 treatment_relations_used=[], method=self.method,
+                embedding_version=self.embedding_version,
                 total_compounds_scored=0, predictions=[], timing_ms=0,
                 error=f"Disease '{disease_query}' not found. Try: {list(DEMO_DISEASE_ENTITIES.keys())}",
             )
 
         treatment_rels = self.find_treatment_relations()
         if not treatment_rels:
-            return KGResult(
+            return disease_entities, [], KGResult(
                 disease_query=disease_query, disease_entities_used=disease_entities,
                 treatment_relations_used=[], method=self.method,
+                embedding_version=self.embedding_version,
                 total_compounds_scored=0, predictions=[], timing_ms=0,
                 error="No treatment relations found.",
             )
+        return disease_entities, treatment_rels, None
+
+    def _score_vector(self, disease_entities: list[str], treatment_rels: list[tuple[str, int]],
+                      exact_depth: Optional[int] = None
+                      ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """
+        Best score for EVERY compound over disease entities × treatment relations.
 
-        # Score all compounds (vectorized)
-        n = len(self.compound_indices)
+        Returns (best_scores, best_pair, pair_relations): best_pair[i] indexes
+        pair_relations, the relation name of each entity × relation row.
+        exact_depth selects the quantized scan (see _score_vector_quantized).
+        """
+        tail_entities = [e for e in disease_entities if e in self.entity_to_idx]
+        if self.score_matrix is not None and self.score_matrix.covers(tail_entities):
+            metrics.count("score_matrix_rows", len(tail_entities))
+            return self._score_vector_from_matrix(tail_entities, treatment_rels)
+
+        tail_indices = [self.entity_to_idx[e] for e in tail_entities]
+        if exact_depth is not None and self.quantized is not None:
+            return self._score_vector_quantized(tail_indices, treatment_rels, exact_depth)
+        metrics.count("compounds_scored", len(self.compound_names) * len(tail_indices))
+        pair_relations: list[str] = []
+        rows: list[np.ndarray] = []
+        for rel_name, scores in self._iter_scores(tail_indices, treatment_rels):
+            pair_relations.append(rel_name)
+            rows.append(scores)
+        best_scores, best_pair = self._reduce_pairs(rows)
+        return best_scores, best_pair, pair_relations
+
+    def _score_vector_quantized(self, tail_indices: list[int],
+                                treatment_rels: list[tuple[str, int]], depth: int
+                                ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """
+        _score_vector over the quantized compounds, then exact rescoring.
+
+        The best `depth` approximate rows are rescored at full precision;
+        τ is the worst of those exact scores. A row's exact distance is
+        within row_error × max|r| of its approximate one, so any other row
+        whose upper bound reaches τ is rescored too. Every remaining row is
+        then provably below τ, so ranks [0, depth) are exactly those of the
+        full-precision scan.
+        """
+        q = self.quantized
+        pairs = [(self.entity_emb[t], rel_idx) for t in tail_indices for _, rel_idx in treatment_rels]
+        pair_relations = [name for _ in tail_indices for name, _ in treatment_rels]
+        best_scores, best_pair = self._reduce_pairs(
+            [self._score_direct(rel_idx, tail, heads=q) for tail, rel_idx in pairs])
+        metrics.count("compounds_scanned_quantized", len(q) * len(tail_indices))
+
+        n = len(best_scores)
+        k = min(depth, int(np.count_nonzero(~np.isinf(best_scores))))
+        if k == 0:
+            return best_scores, best_pair, pair_relations
+
+        rows = np.argpartition(-best_scores, k - 1)[:k] if k < n else np.arange(n)
+        exact, exact_pair = self._rescore(rows, pairs)
+        tau = exact.min()
+
+        # Quantization bound, plus slack for float rounding in either scan.
+        rels = np.asarray(self.relation_emb[[r for _, r in treatment_rels]], dtype=np.float64)
+        if self.method == "RotatE":
+            d = self.complex_dim
+            r_max = float(np.sqrt(rels[:, :d] ** 2 + rels[:, d:] ** 2).max())
+        else:
+            r_max = 1.0
+        upper = best_scores + q.row_error * r_max + 1e-4 * (np.abs(best_scores) + 1.0)
+        upper[rows] = -np.inf
+        extra = np.flatnonzero(upper >= tau)
+        if len(extra):
+            extra_scores, extra_pair = self._rescore(extra, pairs)
+            rows = np.concatenate([rows, extra])
+            exact = np.concatenate([exact, extra_scores])
+            exact_pair = np.concatenate([exact_pair, extra_pair])
+
+        best_scores[rows] = exact
+        best_pair[rows] = exact_pair
+        metrics.count("compounds_rescored", len(rows))
+        logger.debug("Quantized scan: rescored %d rows (%d beyond depth %d)",
+                     len(rows), len(extra), depth)
+        return best_scores, best_pair, pair_relations
+
+    def _rescore(self, rows: np.ndarray, pairs: list[tuple[np.ndarray, int]]
+                 ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact best score + pair for selected compound rows (gathered in row order)."""
+        order = np.argsort(rows)
+        heads = np.asarray(self.compound_embs[rows[order]])
+        score = self._score_rotate if self.method == "RotatE" else self._score_transe
+        best, pair = self._reduce_pairs(
+            [score(heads, self.relation_emb[rel_idx], tail) for tail, rel_idx in pairs])
+        out_best, out_pair = np.empty_like(best), np.empty_like(pair)
+        out_best[order], out_pair[order] = best, pair
+        return out_best, out_pair
+
+    def _use_ann(self, disease_entities: list[str]) -> bool:
+        """ANN retrieval, unless the (exact) score matrix already has the rows."""
+        if self.ann_index is None:
+            return False
+        tails = [e for e in disease_entities if e in self.entity_to_idx]
+        return not (self.score_matrix is not None and self.score_matrix.covers(tails))
+
+    def _ann_scores(self, disease_entities: list[str], treatment_rels: list[tuple[str, int]],
+                    depth: int) -> DiseaseScores:
+        """
+        DiseaseScores from the IVF index: compounds in the probed lists get
+        exact scores, all others -inf (unranked). Stats come from the index's
+        fixed compound sample, so percentiles are estimates.
+        """
+        idx = self.ann_index
+        tail_indices = [self.entity_to_idx[e] for e in disease_entities if e in self.entity_to_idx]
+        rel_pos = {name: i for i, name in enumerate(idx.relation_names)}
+        pairs = [(self.entity_emb[t], rel_idx) for t in tail_indices for _, rel_idx in treatment_rels]
+        pair_relations = [name for _ in tail_indices for name, _ in treatment_rels]
+        queries = [(self.entity_emb[t], rel_pos[name])
+                   for t in tail_indices for name, _ in treatment_rels]
+
+        n = len(self.compound_names)
         best_scores = np.full(n, -np.inf, dtype=np.float64)
-        best_relations = [""] * n
+        best_pair = np.zeros(n, dtype=np.intp)
+        if not pairs:
+            return DiseaseScores.from_scores(disease_entities, [r[0] for r in treatment_rels],
+                                             best_scores, best_pair, pair_relations, depth)
+
+        nprobe = self.nprobe
+        rows = idx.candidates(queries, nprobe)
+        while len(rows) < min(depth, n) and nprobe < idx.nlist:
+            nprobe *= 2
+            rows = idx.candidates(queries, nprobe)
+        best_scores[rows], best_pair[rows] = self._rescore(rows, pairs)
+        metrics.count("ann_candidates", len(rows))
+
+        sample, _ = self._rescore(np.asarray(idx.sample, dtype=np.int64), pairs)
+        valid = np.sort(sample[~np.isinf(sample)])
+        mean_s = float(np.mean(valid)) if len(valid) else 0.0
+        std_s = float(max(np.std(valid), 1e-8)) if len(valid) else 1e-8
+        logger.debug("ANN: %d candidates from nprobe=%d", len(rows), nprobe)
+        return DiseaseScores(disease_entities, [r[0] for r in treatment_rels],
+                             best_scores, best_pair, pair_relations, valid,
+                             mean_s, std_s, exact_depth=depth)
+
+    def _exact_rows(self, scores: DiseaseScores, rows: np.ndarray
+                    ) -> tuple[np.ndarray, np.ndarray]:
+        """Full-precision (best score, best pair) for given compound rows of a query."""
+        treatment_rels = [r for r in self.find_treatment_relations()
+                          if r[0] in scores.treatment_relations]
+        pairs = [(self.entity_emb[self.entity_to_idx[e]], rel_idx)
+                 for e in scores.disease_entities if e in self.entity_to_idx
+                 for _, rel_idx in treatment_rels]
+        return self._rescore(rows, pairs)
+
+    def _score_vector_from_matrix(self, tail_entities: list[str],
+                                  treatment_rels: list[tuple[str, int]]
+                                  ) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """
+        Same as _score_vector, but read from the precomputed matrix.
 
-        for entity_id in disease_entities:
-            d_idx = self.entity_to_idx.get(entity_id)
-            if d_idx is None:
-                continue
-            tail = self.entity_emb[d_idx]
+        Each matrix row already holds the best relation per compound, so the
+        entity × relation pair is entity_pos * n_relations + stored relation.
+        """
+        m = self.score_matrix
+        rows = [m.disease_row[e] for e in tail_entities]
+        best_scores, best_entity = self._reduce_pairs(list(m.scores[rows]))
+        best_rel = m.relations[rows][best_entity, np.arange(len(best_scores))]
+        best_pair = best_entity * len(treatment_rels) + best_rel
+        pair_relations = [name for _ in tail_entities for name, _ in treatment_rels]
+        return best_scores, best_pair, pair_relations
+
+    def _reduce_pairs(self, rows: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Best score per column (compound, or disease for score_drug) over
+        entity × relation rows, and which row won.
 
-            for rel_name, rel_idx in treatment_rels:
-                rel = self.relation_emb[rel_idx]
-                if self.method == "RotatE":
-                    scores = self._score_rotate(self.compound_embs, rel, tail)
-                else:
-                    scores = self._score_transe(self.compound_embs, rel, tail)
-
-                improved = scores > best_scores
-                best_scores[improved] = scores[improved]
-                for i in np.where(improved)[0]:
-                    best_relations[i] = rel_name
-
-        # Stats
-        valid = best_scores[~np.isinf(best_scores)]
-        if len(valid) == 0:
+        argmax keeps the first maximum, so ties go to the earliest pair.
+        NaNs never win (they become -inf, i.e. "not scored").
+        """
+        n = len(rows[0]) if rows else len(self.compound_indices)
+        if not rows:
+            return np.full(n, -np.inf, dtype=np.float64), np.zeros(n, dtype=np.intp)
+        stacked = np.asarray(np.stack(rows), dtype=np.float64)
+        stacked[np.isnan(stacked)] = -np.inf
+        best_pair = np.argmax(stacked, axis=0)
+        return stacked[best_pair, np.arange(n)], best_pair
+
+    def _build_result(self, disease_query: str, scores: DiseaseScores,
+                      top_k: int, t0: float) -> KGResult:
+        """Top-k of a full score vector → KGResult."""
+        if scores.n_valid == 0:
             return KGResult(
-                disease_query=disease_query, disease_entities_used=disease_entities,
-                treatment_relations_used=[r[0] for r in treatment_rels], method=self.method,
+                disease_query=disease_query, disease_entities_used=scores.disease_entities,
+                treatment_relations_used=scores.treatment_relations,
+                method=self.method_of(scores), ensemble=scores.fusion,
+                embedding_version=self.embedding_version,
                 total_compounds_scored=0, predictions=[],
                 timing_ms=(time.perf_counter() - t0) * 1000,
                 error="No valid scores. Embeddings may be corrupted.",
             )
 
-        mean_s, std_s = float(np.mean(valid)), float(max(np.std(valid), 1e-8))
-
-        # Top-k
-        top_idx = np.argsort(best_scores)[-top_k:][::-1]
-        predictions = []
-        for rank, idx in enumerate(top_idx):
-            if np.isinf(best_scores[idx]):
-                continue
-            s = float(best_scores[idx])
-            pctl = float(np.sum(valid <= s) / len(valid) * 100)
-            z = round((s - mean_s) / std_s, 3)
-            predictions.append(KGPrediction(
-                drug_entity=self.compound_names[idx],
-                drug_name=self.compound_names[idx].replace("Compound::", ""),
-                score=round(s, 4),
-                percentile=round(pctl, 2),
-                z_score=z,
-                rank=rank + 1,
-                method=self.method,
-                relation_used=best_relations[idx],
-                normalized_score=round(normalize_kg_score(pctl, z), 2),
-            ))
+        predictions = self.ranked_predictions(scores, 0, top_k)
 
         elapsed = (time.perf_counter() - t0) * 1000
         return KGResult(
             disease_query=disease_query,
-            disease_entities_used=disease_entities,
-            treatment_relations_used=[r[0] for r in treatment_rels],
-            method=self.method,
-            total_compounds_scored=n,
+            disease_entities_used=scores.disease_entities,
+            treatment_relations_used=scores.treatment_relations,
+            method=self.method_of(scores),
+            embedding_version=self.embedding_version,
+            ensemble=scores.fusion,
+            total_compounds_scored=len(scores.best_scores),
             predictions=predictions,
             timing_ms=round(elapsed, 1),
             metadata=self.training_metadata,
         )
 
+    def _prediction(self, entity: str, score: float, pctl: float, z: float, rank: int,
+                    relation: str, drug_name: Optional[str] = None,
+                    disease_entity: Optional[str] = None, method: Optional[str] = None,
+                    model_scores: Optional[dict[str, dict]] = None) -> KGPrediction:
+        """One KGPrediction for a Compound:: entity (rounding shared by all paths)."""
+        pctl = float(pctl)
+        z = round(float(z), 3)
+        return KGPrediction(
+            drug_entity=entity,
+            drug_name=drug_name or entity.replace("Compound::", ""),
+            score=round(float(score), 4),
+            percentile=round(pctl, 2),
+            z_score=z,
+            rank=rank,
+            method=method or self.method,
+            relation_used=relation,
+            normalized_score=round(normalize_kg_score(pctl, z), 2),
+            disease_entity=disease_entity,
+            model_scores=model_scores,
+        )
+
+    @metrics.instrumented("score_specific_drugs")
     def score_specific_drugs(self, drug_names: list[str], disease_query: str) -> KGResult:
-        """Score specific drugs (by name) against a disease."""
-        full = self.score_disease(disease_query, top_k=len(self.compound_names))
-        if full.error:
-            return full
+        """
+        Score specific drugs (by name) against a disease.
 
-        by_entity = {p.drug_entity: p for p in full.predictions}
-        matched, unmatched = [], []
+        Names are resolved to compound rows first; the full score vector is
+        computed once and stats are derived for just those rows, so no
+        KGPrediction is built for the other ~24K compounds.
 
-        for name in drug_names:
-            entity = self.resolver.resolve(name) if self.resolver else None
-            if entity and entity in by_entity:
-                pred = by_entity[entity]
-                matched.append(KGPrediction(
-                    drug_entity=pred.drug_entity, drug_name=name,
-                    score=pred.score, percentile=pred.percentile,
-                    z_score=pred.z_score, rank=pred.rank,
-                    method=pred.method, relation_used=pred.relation_used,
-                    normalized_score=pred.normalized_score,
-                ))
-            else:
+        With a quantized scan (or ANN) the drugs' scores are rescored exactly,
+        but their percentile / z-score are against the approximate vector —
+        exact only with calibrate=True, which uses the fixed null instead.
+        """
+        t0 = time.perf_counter()
+
+        # Resolve before scoring: name → compound row (None if unknown)
+        rows: list[Optional[int]] = []
+        with metrics.stage("resolve_drugs"):
+            for name in drug_names:
+                entity = self.resolver.resolve(name) if self.resolver else None
+                rows.append(self.compound_pos.get(entity) if entity else None)
+
+        scores, err = self.disease_scores(disease_query)
+        if err is not None:
+            return err
+        if scores.n_valid == 0:
+            return self._build_result(disease_query, scores, 0, t0)
+
+        # Quantized / ANN vectors are approximate (or unset) off the top ranks:
+        # score the requested rows exactly.
+        exact: dict[int, tuple[float, int]] = {}
+        if scores.exact_depth is not None:
+            known = np.array(sorted({i for i in rows if i is not None}), dtype=np.int64)
+            if len(known):
+                vals, pairs = self._exact_rows(scores, known)
+                exact = {int(i): (v, p) for i, v, p in zip(known, vals, pairs)}
+
+        matched, unmatched = [], []
+        for name, idx in zip(drug_names, rows):
+            s, pair = exact.get(idx, (None, None)) if idx is not None else (None, None)
+            if idx is not None and s is None:
+                s, pair = scores.best_scores[idx], scores.best_pair[idx]
+            if idx is None or np.isinf(s):
                 unmatched.append(name)
+                continue
+            matched.append(self._prediction(
+                self.compound_names[idx], s, scores.percentiles(s), scores.z_scores(s), 0,
+                scores.pair_relations[pair], drug_name=name, method=self.method_of(scores),
+                model_scores=self._model_scores(scores.models, np.array([idx]))[0],
+            ))
 
         matched.sort(key=lambda p: p.score, reverse=True)
         for i, p in enumerate(matched):
             p.rank = i + 1
 
+        elapsed = (time.perf_counter() - t0) * 1000
         return KGResult(
-            disease_query=full.disease_query,
-            disease_entities_used=full.disease_entities_used,
-            treatment_relations_used=full.treatment_relations_used,
-            method=full.method,
-            total_compounds_scored=full.total_compounds_scored,
+            disease_query=disease_query,
+            disease_entities_used=scores.disease_entities,
+            treatment_relations_used=scores.treatment_relations,
+            method=self.method_of(scores),
+            embedding_version=self.embedding_version,
+            ensemble=scores.fusion,
+            total_compounds_scored=len(scores.best_scores),
             predictions=matched,
-            timing_ms=full.timing_ms,
-            metadata=full.metadata,
+            timing_ms=round(elapsed, 1),
+            metadata=self.training_metadata,
             error=f"Not resolved: {unmatched}" if unmatched and not matched else None,
         )
 
+    @metrics.instrumented("score_drug")
+    def score_drug(self, drug_name: str, top_k: int = 50) -> KGResult:
+        """
+        Reverse query: rank ALL diseases for one drug.
+
+        h∘r is computed once per treatment relation for the drug, then every
+        Disease:: embedding is scored in one vectorized pass; the best
+        relation per disease wins. Predictions carry disease_entity, and
+        percentile / z-score are relative to all diseases for this drug.
+        An ensemble scorer scores the diseases with the partner too and
+        ranks by the fused scores.
+        """
+        t0 = time.perf_counter()
+
+        def failed(error: str, entity: Optional[str] = None,
+                   relations: Optional[list[str]] = None) -> KGResult:
+            return KGResult(
+                disease_query="", disease_entities_used=[],
+                treatment_relations_used=relations or [], method=self.method,
+                embedding_version=self.embedding_version,
+                total_compounds_scored=0, predictions=[],
+                timing_ms=round((time.perf_counter() - t0) * 1000, 1),
+                error=error, drug_query=drug_name,
+            )
+
+        with metrics.stage("resolve"):
+            entity = self.resolver.resolve(drug_name) if self.resolver else None
+        if entity is None or entity not in self.entity_to_idx:
+            return failed(f"Drug '{drug_name}' not found in DRKG.")
+
+        treatment_rels = self.find_treatment_relations()
+        if not treatment_rels:
+            return failed("No treatment relations found.")
+        rel_names = [r[0] for r in treatment_rels]
+        if len(self.disease_indices) == 0:
+            return failed("No Disease:: entities in the graph.", relations=rel_names)
+
+        if self._disease_embs is None:
+            self._disease_embs = np.asarray(self.entity_emb[self.disease_indices], dtype=np.float64)
+        tails = self._disease_embs
+
+        head = self.entity_emb[self.entity_to_idx[entity]]
+        rows = []
+        with metrics.stage("score"):
+            for _, rel_idx in treatment_rels:
+                hr = self._apply_relation(head, rel_idx)[0]
+                diff = tails - hr
+                rows.append(-np.sqrt(np.einsum("ij,ij->i", diff, diff)))
+            best_scores, best_rel = self._reduce_pairs(rows)
+        metrics.count("diseases_scored", len(best_scores))
+
+        models = None
+        if self.partner is not None:
+            with metrics.stage("ensemble"):
+                models, best_scores = self._ensemble_drug(entity, treatment_rels,
+                                                          best_scores, best_rel)
+
+        valid = best_scores[~np.isinf(best_scores)]
+        if len(valid) == 0:
+            return failed("No valid scores. Embeddings may be corrupted.", relations=rel_names)
+        sorted_valid = np.sort(valid)
+        mean_s, std_s = float(np.mean(valid)), float(max(np.std(valid), 1e-8))
+
+        n = len(best_scores)
+        k = min(max(top_k, 0), n)
+        top = np.argpartition(-best_scores, k - 1)[:k] if 0 < k < n else np.arange(n)[:k]
+        top = top[np.lexsort((top, -best_scores[top]))]
+        pctls = np.searchsorted(sorted_valid, best_scores[top], side="right") / len(valid) * 100
+
+        method = "+".join(models) if models else self.method
+        per_model = self._model_scores(models, top)
+        predictions = []
+        for rank, d_idx in enumerate(top):
+            s = float(best_scores[d_idx])
+            if np.isinf(s):
+                continue
+            predictions.append(self._prediction(
+                entity, s, pctls[rank], (s - mean_s) / std_s, rank + 1,
+                rel_names[best_rel[d_idx]], drug_name=drug_name,
+                disease_entity=self.disease_names[d_idx], method=method,
+                model_scores=per_model[rank],
+            ))
+
+        elapsed = (time.perf_counter() - t0) * 1000
+        return KGResult(
+            disease_query="",
+            disease_entities_used=[],
+            treatment_relations_used=rel_names,
+            method=method,
+            embedding_version=self.embedding_version,
+            ensemble=self.ensemble if models else None,
+            total_compounds_scored=1,
+            predictions=predictions,
+            timing_ms=round(elapsed, 1),
+            metadata=self.training_metadata,
+            drug_query=drug_name,
+            total_diseases_scored=n,
+        )
+
+    def _ensemble_drug(self, entity: str, treatment_rels: list[tuple[str, int]],
+                       best_scores: np.ndarray, best_rel: np.ndarray
+                       ) -> tuple[dict[str, DiseaseScores], np.ndarray]:
+        """score_drug()'s disease vector from the partner, fused with the primary's."""
+        if self._partner_disease_embs is None:
+            self._partner_disease_embs = np.asarray(self.partner.entity(self.disease_indices),
+                                                    dtype=np.float64)
+        tails = self._partner_disease_embs
+        head = self.partner.entity(self.entity_to_idx[entity])
+        rows = []
+        for _, rel_idx in treatment_rels:
+            diff = tails - self._apply_relation(head, rel_idx, model=self.partner)[0]
+            rows.append(-np.sqrt(np.einsum("ij,ij->i", diff, diff)))
+        p_best, p_rel = self._reduce_pairs(rows)
+
+        rel_names = [r[0] for r in treatment_rels]
+        models = {
+            method: DiseaseScores.from_scores([], rel_names, b, br, rel_names)
+            for method, b, br in ((self.method, best_scores, best_rel),
+                                  (self.partner.method, p_best, p_rel))
+        }
+        return models, fuse([best_scores, p_best], self.ensemble)
+
+    # ── Neighbour explanations ──
+
+    @property
+    def neighbor_index(self) -> Optional[NeighborIndex]:
+        """Prebuilt neighbour index (see neighbors.py), loaded on first use."""
+        if not self._neighbors_loaded:
+            with self._neighbors_lock:
+                if not self._neighbors_loaded:
+                    self._neighbor_index = load_neighbor_index(self)
+                    self._neighbors_loaded = True
+        return self._neighbor_index
+
+    def _approved_rows(self, names: list[str]) -> np.ndarray:
+        """Sorted compound rows of the drug names the resolver finds."""
+        rows = set()
+        for name in names:
+            entity = self.resolver.resolve(name) if self.resolver else None
+            if entity in self.compound_pos:
+                rows.add(self.compound_pos[entity])
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def explain_neighbors(self, predictions: list[KGPrediction],
+                          disease_query: Optional[str] = None,
+                          k: int = NEIGHBOR_K) -> list[KGPrediction]:
+        """Set .neighbors on each prediction (see neighbors_of). Returns the predictions."""
+        found = self.neighbors_of([p.drug_entity for p in predictions], disease_query, k)
+        for p, nbs in zip(predictions, found):
+            p.neighbors = nbs
+        return predictions
+
+    def neighbors_of(self, entities: list[str], disease_query: Optional[str] = None,
+                     k: int = NEIGHBOR_K) -> list[list[dict]]:
+        """
+        The k nearest known treatments in embedding space of each Compound::
+        entity, nearest first, as {drug_entity, distance, evidence} ([] for
+        entities not in the graph).
+
+        With disease_query the references are that disease's treatment edges
+        ("treats_disease") and APPROVED_DRUGS entry ("approved_for_disease");
+        otherwise (or if it has none) every compound with a treatment edge
+        ("treatment_edge") or on an APPROVED_DRUGS list ("approved"), read
+        from the prebuilt index.
+        """
+        index = self.neighbor_index
+        metric = index.metric if index is not None else "cosine"
+        rows = np.array([self.compound_pos.get(e, -1) for e in entities], dtype=np.int64)
+        known = np.flatnonzero(rows >= 0)
+        k = max(k, 0)
+
+        with metrics.stage("neighbors"):
+            refs, tags = np.empty(0, dtype=np.int64), {}
+            if disease_query:
+                treated = np.empty(0, dtype=np.int64)
+                if index is not None:
+                    if self._disease_pos is None:
+                        self._disease_pos = {n: i for i, n in enumerate(self.disease_names)}
+                    diseases = self.resolve_disease(disease_query)
+                    treated = index.treating(np.array(
+                        [self._disease_pos[e] for e in diseases if e in self._disease_pos],
+                        dtype=np.int64))
+                approved = self._approved_rows(approved_names(disease_query))
+                refs = np.union1d(treated, approved)
+                tags = {int(r): ["treats_disease"] for r in treated}
+                for r in approved:
+                    tags.setdefault(int(r), []).append("approved_for_disease")
+
+            if len(refs):
+                nb_rows, nb_dist = nearest(self.compound_embs[rows[known]], rows[known],
+                                           self.compound_embs[refs], refs, k, metric)
+            elif index is not None:
+                k = min(k, index.depth)
+                nb_rows = np.asarray(index.ref_rows[rows[known], :k])
+                nb_dist = np.asarray(index.ref_dist[rows[known], :k])
+                flags = index.reference
+                tags = {int(r): [t for bit, t in ((REF_TREATED, "treatment_edge"),
+                                                  (REF_APPROVED, "approved"))
+                                 if flags[r] & bit]
+                        for r in np.unique(nb_rows[nb_rows >= 0])}
+            else:
+                refs = self._approved_rows([n for v in APPROVED_DRUGS.values() for n in v])
+                nb_rows, nb_dist = nearest(self.compound_embs[rows[known]], rows[known],
+                                           self.compound_embs[refs], refs, k, metric)
+                tags = {int(r): ["approved"] for r in refs}
+        metrics.count("neighbor_queries", len(known))
+
+        out: list[list[dict]] = [[] for _ in entities]
+        for i, qi in enumerate(known):
+            out[qi] = [
+                {"drug_entity": self.compound_names[r], "distance": round(float(d), 4),
+                 "evidence": tags.get(int(r), [])}
+                for r, d in zip(nb_rows[i], nb_dist[i]) if r >= 0
+            ]
+        return out
+
+    # ── Mechanism paths ──
+
+    @property
+    def graph(self) -> Optional[CsrGraph]:
+        """Prebuilt triples graph (see graph.py), loaded on first use."""
+        if not self._graph_loaded:
+            with self._graph_lock:
+                if not self._graph_loaded:
+                    self._graph = load_graph(self)
+                    self._graph_loaded = True
+        return self._graph
+
+    @metrics.instrumented("mechanism_paths")
+    def mechanism_paths(self, drugs: list[str], disease_query: str,
+                        max_hops: int = MAX_HOPS, max_paths: int = MAX_PATHS,
+                        via: Optional[tuple[str, ...]] = None) -> Optional[list[dict]]:
+        """
+        Graph paths of up to max_hops edges from each drug (Compound:: entity
+        or name) to the disease's entities, best first — e.g. Compound →
+        Gene → Disease with via=("Gene",).
+
+        One {drug, drug_entity, paths, counts} per drug; paths are
+        {nodes, hops, score} (see graph.find_paths). None without a graph.
+        """
+        graph = self.graph
+        if graph is None:
+            logger.warning("No usable graph for mechanism paths. "
+                           "Build with: python scripts/build_kg.py graph")
+            return None
+
+        with metrics.stage("resolve"):
+            entities = [d if d in self.compound_pos
+                        else (self.resolver.resolve(d) if self.resolver else None)
+                        for d in drugs]
+            targets = [int(self.entity_to_idx[e]) for e in self.resolve_disease(disease_query)]
+        rows = [int(self.entity_to_idx[e]) for e in entities if e is not None]
+
+        with metrics.stage("paths"):
+            found = iter(find_paths_many(graph, rows, targets, max_hops, max_paths, via))
+        metrics.count("path_queries", len(rows) * len(targets))
+
+        out = []
+        for drug, entity in zip(drugs, entities):
+            res = next(found) if entity is not None else {"paths": [], "counts": {}}
+            out.append({"drug": drug, "drug_entity": entity, **res})
+        return out
+
     def info(self) -> dict:
         n_compounds = len(self.compound_names)
-        n_diseases = sum(1 for e in self.entity_to_idx if e.startswith("Disease::"))
-        n_genes = sum(1 for e in self.entity_to_idx if e.startswith("Gene::"))
+        n_diseases = len(self.disease_names)
+        if isinstance(self.entity_to_idx, EntityVocab):
+            start, stop = self.entity_to_idx.range("Gene")
+            n_genes = stop - start
+        else:
+            n_genes = sum(1 for e in self.entity_to_idx if e.startswith("Gene::"))
         return {
             "method": self.method,
+            "embedding_version": self.embedding_version,
             "embedding_shape": list(self.entity_emb.shape),
+            "embedding_dtype": str(self.entity_emb.dtype),
+            "load_ms": round(self.load_ms, 1),
+            "bundle": str(self.bundle.path) if self.bundle is not None else None,
+            "release": (
+                {"version": self.bundle.version,
+                 "raw_sources_current": self.bundle.sources_current}
+                if self.bundle is not None and self.bundle.release else None
+            ),
             "complex_dim": self.complex_dim,
+            "scoring_backend": self.backend,
+            "ensemble": (
+                {"fusion": self.ensemble, "partner": self.partner.method,
+                 "path": str(self.partner.path) if self.partner.path is not None else None}
+                if self.partner is not None else None
+            ),
+            "scoring_threads": self.threads,
+            "quantized": (
+                {"dtype": self.quantized.kind, "rescore_k": self.rescore_k,
+                 "mb": round(self.quantized.nbytes / 1e6, 1)}
+                if self.quantized is not None else None
+            ),
+            "score_matrix": (
+                {"path": str(self.score_matrix.path),
+                 "diseases": len(self.score_matrix.disease_row),
+                 "dtype": self.score_matrix.manifest.get("dtype")}
+                if self.score_matrix is not None else None
+            ),
+            "ann_index": (
+                {"path": str(self.ann_index.path), "nlist": self.ann_index.nlist,
+                 "nprobe": self.nprobe}
+                if self.ann_index is not None else None
+            ),
+            "null_model": (
+                {"path": str(self.null_model.path),
+                 "samples": self.null_model.manifest.get("n_samples")}
+                if self.null_model is not None else None
+            ),
+            # Lazily loaded artifacts are reported, never loaded, by info().
+            "neighbor_index": (
+                "not loaded" if not self._neighbors_loaded else
+                {"path": str(self._neighbor_index.path), "metric": self._neighbor_index.metric,
+                 "references": self._neighbor_index.manifest.get("n_references")}
+                if self._neighbor_index is not None else None
+            ),
+            "graph": (
+                "not loaded" if not self._graph_loaded else
+                {"path": str(self._graph.path), "edges": self._graph.n_edges,
+                 "relations": len(self._graph.relation_names)}
+                if self._graph is not None else None
+            ),
             "total_entities": len(self.entity_to_idx),
             "total_relations": len(self.relation_to_idx),
             "compounds": n_compounds,
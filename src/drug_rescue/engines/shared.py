@@ -0,0 +1,206 @@
+"""
+shared.py — Publish a scorer's arrays in shared memory for worker processes
+=============================================================================
+
+Each serving worker that builds its own DRKGScorer holds its own copy of
+entity_emb / compound_embs and spends seconds loading them. Here one
+loader process publishes the arrays once into
+multiprocessing.shared_memory and every worker attaches read-only numpy
+views over the same pages:
+
+    # loader (keeps `shared` alive for as long as workers run)
+    shared = publish_scorer(get_scorer("./data"))
+    pool = multiprocessing.Pool(8, initializer=attach_scorer,
+                                initargs=(shared.spec,))
+
+    # worker — attach_scorer() also seeds the registry, so
+    # get_scorer("./data") returns the attached scorer
+    scorer = attach_scorer(spec)
+
+What is shared is exactly the bundle layout (see bundle.py): float32
+entity rows grouped by type (compounds first, so compound_embs is a
+slice) plus the EntityVocab arrays (see vocab.py). `spec` is a small
+JSON-serialisable dict, so it can also be passed through an env var or
+file. Per-worker state (score cache, name resolver, gemm heads) stays
+per process.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import secrets
+import threading
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .bundle import EmbeddingBundle
+from .scorer import DRKGScorer
+from .vocab import EntityVocab, group_by_type, vocab_arrays
+
+logger = logging.getLogger(__name__)
+
+SHARED_FORMAT = 1
+
+_attach_lock = threading.Lock()
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach without registering the block with this process's resource
+    tracker — otherwise a worker exiting would unlink the loader's memory.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # 3.13+
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda n, rtype: (
+            None if rtype == "shared_memory" else register(n, rtype))
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedScorer:
+    """
+    Owner of the published blocks. Workers need only `spec`.
+
+    close() unmaps and unlinks the blocks; call it after the workers exit.
+    """
+
+    def __init__(self, spec: dict, blocks: list[shared_memory.SharedMemory]):
+        self.spec = spec
+        self._blocks = blocks
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.size for b in self._blocks)
+
+    def close(self) -> None:
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self) -> "SharedScorer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def publish_scorer(scorer: DRKGScorer, prefix: Optional[str] = None) -> SharedScorer:
+    """Copy scorer's embeddings + vocab into shared memory blocks."""
+    t0 = time.perf_counter()
+    prefix = prefix or f"drkg_{os.getpid()}_{secrets.token_hex(4)}"
+
+    vocab = scorer.entity_to_idx
+    if isinstance(vocab, EntityVocab):
+        # Already in bundle row order.
+        order, type_ranges = list(vocab), {t: list(r) for t, r in vocab.type_ranges.items()}
+        entity_emb = np.asarray(scorer.entity_emb, dtype=np.float32)
+    else:
+        order, type_ranges = group_by_type(list(vocab))
+        rows = np.fromiter((vocab[n] for n in order), dtype=np.int64, count=len(order))
+        entity_emb = np.asarray(scorer.entity_emb[rows], dtype=np.float32)
+    names, sorted_names, sorted_rows = vocab_arrays(order)
+
+    arrays = {
+        "entity_emb": entity_emb,
+        "relation_emb": np.asarray(scorer.relation_emb, dtype=np.float32),
+        "entity_names": names,
+        "entity_sorted": sorted_names,
+        "entity_sorted_rows": sorted_rows,
+    }
+
+    blocks, specs = [], {}
+    try:
+        for key, arr in arrays.items():
+            shm = shared_memory.SharedMemory(name=f"{prefix}_{key}", create=True,
+                                             size=max(arr.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            specs[key] = {"name": shm.name, "shape": list(arr.shape), "dtype": arr.dtype.str}
+    except Exception:
+        SharedScorer({}, blocks).close()
+        raise
+
+    spec = {
+        "format": SHARED_FORMAT,
+        "prefix": prefix,
+        "method": scorer.method,
+        "version": scorer.embedding_version,
+        "release": scorer.bundle is not None and scorer.bundle.release,
+        "sources_current": scorer.bundle is None or scorer.bundle.sources_current,
+        "training": scorer.training_metadata,
+        "complex_dim": scorer.complex_dim,
+        "n_compounds": len(scorer.compound_names),
+        "type_ranges": type_ranges,
+        "relation_to_idx": dict(scorer.relation_to_idx),
+        "embeddings_dir": str(scorer.embeddings_dir),
+        "db_path": scorer.db_path,
+        "arrays": specs,
+    }
+    shared = SharedScorer(spec, blocks)
+    logger.info("Published %s scorer to shared memory %s (%.0f MB) in %.0fms",
+                scorer.method, prefix, shared.nbytes / 1e6,
+                (time.perf_counter() - t0) * 1000)
+    return shared
+
+
+def attach_scorer(spec: dict, register: bool = True, **scorer_kwargs) -> DRKGScorer:
+    """
+    Build a DRKGScorer over the shared blocks described by spec.
+
+    Arrays are read-only views; nothing is read from embeddings_dir except
+    the optional training metadata and score matrix. With register=True
+    the scorer is also installed in the registry for its data dir.
+    """
+    if spec.get("format") != SHARED_FORMAT:
+        raise ValueError(f"Shared scorer spec has format {spec.get('format')}, "
+                         f"expected {SHARED_FORMAT}")
+
+    t0 = time.perf_counter()
+    blocks, arrays = [], {}
+    for key, a in spec["arrays"].items():
+        shm = _attach_block(a["name"])
+        blocks.append(shm)
+        arr = np.ndarray(tuple(a["shape"]), dtype=np.dtype(a["dtype"]), buffer=shm.buf)
+        arr.flags.writeable = False
+        arrays[key] = arr
+
+    bundle = EmbeddingBundle(
+        path=Path(f"shm:{spec['prefix']}"),
+        method=spec["method"],
+        complex_dim=spec["complex_dim"],
+        n_compounds=spec["n_compounds"],
+        entity_emb=arrays["entity_emb"],
+        relation_emb=arrays["relation_emb"],
+        entity_to_idx=EntityVocab(arrays["entity_names"], arrays["entity_sorted"],
+                                  arrays["entity_sorted_rows"], spec["type_ranges"]),
+        relation_to_idx=spec["relation_to_idx"],
+        manifest=spec,
+        release=spec.get("release", False),
+        sources_current=spec.get("sources_current", True),
+        handles=blocks,
+    )
+    scorer = DRKGScorer(spec["embeddings_dir"], db_path=spec["db_path"],
+                        bundle=bundle, **scorer_kwargs)
+    logger.info("Attached shared scorer %s in %.0fms", spec["prefix"],
+                (time.perf_counter() - t0) * 1000)
+
+    if register:
+        from .registry import put_scorer
+        put_scorer(str(Path(spec["embeddings_dir"]).parent), scorer)
+    return scorer
@@ -0,0 +1,135 @@
+"""
+vocab.py — Compact, memory-mapped entity vocabulary
+=====================================================
+
+entity_to_idx.json is ~97K entries. Parsing it builds a dict of Python
+strings and ints (tens of MB per worker), and every consumer then
+rescans it with startswith("Compound::") to find the rows it cares about.
+
+EntityVocab holds the same mapping as three .npy arrays written next to
+the bundle:
+
+    entity_names.npy        S<w>   name of every row, rows grouped by type
+    entity_sorted.npy       S<w>   the same names, sorted (binary search)
+    entity_sorted_rows.npy  int32  row of each sorted name
+
+Rows are grouped Compound, Disease, Gene, then everything else, keeping
+the original relative order inside each group, so the type ranges are
+contiguous and stored in the bundle manifest. Lookups are a
+np.searchsorted over the memory map; nothing is parsed at load time.
+
+EntityVocab is a read-only Mapping[str, int], so code written against
+the entity_to_idx dict (`in`, `[]`, `.get`) works unchanged.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+# Types given their own contiguous row range, in row order.
+ENTITY_TYPES = ("Compound", "Disease", "Gene")
+
+NAMES_FILE = "entity_names.npy"
+SORTED_FILE = "entity_sorted.npy"
+SORTED_ROWS_FILE = "entity_sorted_rows.npy"
+
+
+def entity_type(name: str) -> str:
+    """'Compound::DB00001' → 'Compound'."""
+    return name.split("::", 1)[0]
+
+
+def group_by_type(names: list[str]) -> tuple[list[str], dict[str, list[int]]]:
+    """
+    Reorder names so each of ENTITY_TYPES is contiguous (stable).
+
+    Returns (ordered names, {type: [start, stop)}).
+    """
+    groups: dict[str, list[str]] = {t: [] for t in ENTITY_TYPES}
+    rest: list[str] = []
+    for name in names:
+        groups.get(entity_type(name), rest).append(name)
+
+    ordered: list[str] = []
+    ranges: dict[str, list[int]] = {}
+    for t in ENTITY_TYPES:
+        ranges[t] = [len(ordered), len(ordered) + len(groups[t])]
+        ordered.extend(groups[t])
+    ordered.extend(rest)
+    return ordered, ranges
+
+
+def vocab_arrays(names: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(names, sorted names, sorted rows) for names already in row order."""
+    encoded = np.array([n.encode("utf-8") for n in names])
+    order = np.argsort(encoded, kind="stable")
+    return encoded, encoded[order], order.astype(np.int32)
+
+
+def write_vocab(names: list[str], out_dir: Path) -> None:
+    """Write the vocab arrays for names (already in row order) to out_dir."""
+    encoded, sorted_names, sorted_rows = vocab_arrays(names)
+    np.save(out_dir / NAMES_FILE, encoded)
+    np.save(out_dir / SORTED_FILE, sorted_names)
+    np.save(out_dir / SORTED_ROWS_FILE, sorted_rows)
+
+
+class EntityVocab(Mapping):
+    """Entity name ↔ row, backed by (memory-mapped) numpy byte-string arrays."""
+
+    def __init__(self, names: np.ndarray, sorted_names: np.ndarray,
+                 sorted_rows: np.ndarray, type_ranges: dict[str, list[int]]):
+        self._names = names
+        self._sorted = sorted_names
+        self._sorted_rows = sorted_rows
+        self._width = names.dtype.itemsize
+        self.type_ranges = {t: (int(a), int(b)) for t, (a, b) in type_ranges.items()}
+
+    @classmethod
+    def load(cls, path: Path, type_ranges: dict[str, list[int]]) -> "EntityVocab":
+        return cls(
+            np.load(path / NAMES_FILE, mmap_mode="r"),
+            np.load(path / SORTED_FILE, mmap_mode="r"),
+            np.load(path / SORTED_ROWS_FILE, mmap_mode="r"),
+            type_ranges,
+        )
+
+    def _find(self, name: str) -> Optional[int]:
+        key = name.encode("utf-8")
+        if len(key) > self._width:
+            return None
+        i = int(np.searchsorted(self._sorted, key))
+        if i < len(self._sorted) and self._sorted[i] == key:
+            return int(self._sorted_rows[i])
+        return None
+
+    def __getitem__(self, name: str) -> int:
+        row = self._find(name) if isinstance(name, str) else None
+        if row is None:
+            raise KeyError(name)
+        return row
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._find(name) is not None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self._names:
+            yield raw.decode("utf-8")
+
+    def name(self, row: int) -> str:
+        return self._names[row].decode("utf-8")
+
+    def range(self, etype: str) -> tuple[int, int]:
+        """[start, stop) rows of one of ENTITY_TYPES."""
+        return self.type_ranges.get(etype, (0, 0))
+
+    def names_of_type(self, etype: str) -> list[str]:
+        start, stop = self.range(etype)
+        return [raw.decode("utf-8") for raw in self._names[start:stop]]
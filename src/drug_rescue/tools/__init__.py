@@ -35,7 +35,7 @@ from .docking import DOCK_TOOLS, DOCK_TOOL_NAMES
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 ALL_TOOLS = [
-    *KG_TOOLS,       # discover_candidates, score_specific_drugs, kg_info
+    *KG_TOOLS,       # discover_candidates, score_specific_drugs, rank_diseases_for_drug, kg_info
     *CT_TOOLS,       # clinical_trial_failure
     *FAERS_TOOLS,    # faers_inverse_signal, faers_suggest_events
     *LIT_TOOLS,      # literature_search
@@ -17,6 +17,7 @@ SDK contract:
 When registered under server key "drugrescue":
     mcp__drugrescue__discover_candidates
     mcp__drugrescue__score_specific_drugs
+    mcp__drugrescue__rank_diseases_for_drug
     mcp__drugrescue__kg_info
 """
 
@@ -26,8 +27,9 @@ import asyncio
 import concurrent.futures
 import json
 import logging
+import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 # ── SDK import (graceful fallback for testing without SDK) ──────────────
 try:
@@ -45,42 +47,61 @@ except ImportError:
             return fn
         return wrapper
 
+from ..engines import metrics
+
 logger = logging.getLogger(__name__)
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  GLOBAL STATE
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #
-#  The DRKGScorer holds ~190MB of embeddings in memory. We load it ONCE
-#  on first tool call and keep it alive. Safe because SDK MCP tools run
-#  in-process (same Python interpreter).
+#  The DRKGScorer holds ~190MB of embeddings in memory. It lives in the
+#  process-wide registry (engines/registry.py), shared with the discovery
+#  engine, and is rebuilt only when the files under data/ change. Safe
+#  because SDK MCP tools run in-process (same Python interpreter).
 #
 #  ThreadPoolExecutor for the CPU-bound numpy work — numpy releases the
 #  GIL during matrix operations so threads are fine here.
 
-_scorer = None
 _data_dir = "./data"
+_wanted_dir = _data_dir     # latest set_data_dir() target, possibly still loading
+_dir_lock = threading.Lock()
 _pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
 
 
 def set_data_dir(path: str):
-    """Point tools at your data/ directory. Call before first invocation."""
-    global _data_dir, _name_lookup, _scorer
-    _data_dir = path
-    _name_lookup = None  # Reset so lookup reloads from new path
-    _scorer = None        # Reset so scorer reloads from new path
-
-
-def _get_scorer():
-    """Lazy-load the DRKGScorer. First call ~2s, then instant."""
-    global _scorer
-    if _scorer is None:
-        from ..engines.scorer import DRKGScorer
-        _scorer = DRKGScorer(
-            embeddings_dir=str(Path(_data_dir) / "embeddings"),
-            db_path=str(Path(_data_dir) / "database" / "dropped_drugs.db"),
-        )
-    return _scorer
+    """
+    Point tools at your data/ directory.
+
+    If a scorer is already serving, the new directory's scorer loads in the
+    background and the tools switch over once it is ready; requests keep
+    using the current one until then (no blocking first request).
+    """
+    global _wanted_dir
+    from ..engines.registry import is_loaded, preload
+
+    with _dir_lock:
+        _wanted_dir = path
+        switch_now = path == _data_dir or not is_loaded(_data_dir) or is_loaded(path)
+    if switch_now:
+        _switch_data_dir(path)
+    else:
+        preload(path, on_ready=lambda _scorer: _switch_data_dir(path))
+
+
+def _switch_data_dir(path: str):
+    global _data_dir, _name_lookup
+    with _dir_lock:
+        if path != _wanted_dir:
+            return          # superseded by a later set_data_dir()
+        _data_dir = path
+        _name_lookup = None  # Reset so lookup reloads from new path
+
+
+def _get_scorer(data_dir: str | None = None):
+    """Shared DRKGScorer for _data_dir. First call ~2s, then instant."""
+    from ..engines.registry import get_scorer
+    return get_scorer(data_dir or _data_dir)
 
 
 # ── Name resolution ──────────────────────────────────────────────────
@@ -92,51 +113,44 @@ _NAME_FIXES = {
     "Compound::DB00112": "BEVACIZUMAB",
 }
 
-_name_lookup: dict[str, str] | None = None
+_name_lookup: tuple[str, dict[str, str]] | None = None   # (data dir, entity → name)
 
 
-def _get_name_lookup() -> dict[str, str]:
-    """Load drug name lookup files once. Returns entity → name mapping."""
+def _get_name_lookup(data_dir: str) -> dict[str, str]:
+    """Load drug name lookup files once per data dir. Returns entity → name mapping."""
     global _name_lookup
-    if _name_lookup is not None:
-        return _name_lookup
-
-    _name_lookup = {}
-    data = Path(_data_dir)
-
-    # Source 1: kg_entity_lookup.json
-    p1 = data / "database" / "kg_entity_lookup.json"
-    if p1.exists():
-        try:
-            with open(p1) as f:
-                for entity, info in json.load(f).items():
-                    if info.get("drug_name"):
-                        _name_lookup[entity] = info["drug_name"]
-        except Exception:
-            pass
-
-    # Source 2: drugbank_to_name.json
-    p2 = data / "drugbank_to_name.json"
-    if p2.exists():
-        try:
-            with open(p2) as f:
-                for db_id, name in json.load(f).items():
-                    entity = f"Compound::{db_id}"
-                    if entity not in _name_lookup:
-                        _name_lookup[entity] = name
-        except Exception:
-            pass
+    cached = _name_lookup
+    if cached is not None and cached[0] == data_dir:
+        return cached[1]
+
+    from ..engines.enrich_table import read_name_lookup
+
+    # kg_entity_lookup.json, then drugbank_to_name.json
+    lookup = read_name_lookup(Path(data_dir))
 
     # Apply manual fixes
-    _name_lookup.update(_NAME_FIXES)
-    logger.info("Name lookup: %d entries", len(_name_lookup))
-    return _name_lookup
+    lookup.update(_NAME_FIXES)
+    logger.info("Name lookup: %d entries", len(lookup))
+    _name_lookup = (data_dir, lookup)
+    return lookup
 
 
-def _resolve_name(drug_name: str, drkg_entity: str) -> str:
-    """Resolve a drug name: fix overrides, strip [OBSOLETE], try lookup."""
-    lookup = _get_name_lookup()
+def _name_source(data_dir: str) -> Callable[[str], str | None]:
+    """
+    entity → name for one request: the prebuilt enrichment table if any,
+    else the JSON files. Fetch once per request, not per name (the
+    registry lookup stats the data files).
+    """
+    from ..engines.registry import get_enrich_table
+    table = get_enrich_table(data_dir)
+    if table is not None:
+        return table.display_name
+    return _get_name_lookup(data_dir).get
 
+
+def _resolve_name(drug_name: str, drkg_entity: str,
+                  lookup: Callable[[str], str | None]) -> str:
+    """Resolve a drug name: fix overrides, strip [OBSOLETE], try lookup (see _name_source)."""
     # 1. Manual fix
     if drkg_entity in _NAME_FIXES:
         return _NAME_FIXES[drkg_entity]
@@ -144,7 +158,7 @@ def _resolve_name(drug_name: str, drkg_entity: str) -> str:
     # 2. If name is a raw ID, try lookup
     raw_id = drkg_entity.replace("Compound::", "")
     if drug_name == raw_id:
-        resolved = lookup.get(drkg_entity)
+        resolved = lookup(drkg_entity)
         if resolved:
             drug_name = resolved
 
@@ -159,29 +173,46 @@ def _resolve_name(drug_name: str, drkg_entity: str) -> str:
 #  SYNC HELPERS — these run in the thread pool
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+@metrics.instrumented("tool.discover_candidates")
 def _run_discovery(disease: str, max_candidates: int,
-                   min_percentile: float, include_novel: bool) -> dict:
+                   min_percentile: float, include_novel: bool,
+                   cursor: int = 0, neighbors: int = 3) -> dict:
     """
     The actual computation:
-      1. Score ALL compounds against disease (vectorized numpy)
-      2. Cross-reference top hits against dropped_drugs.db
+      1. Score ALL compounds against disease (vectorized numpy, cached)
+      2. Walk the ranking from `cursor`, cross-referencing against dropped_drugs.db
       3. Classify each as dropped / withdrawn / novel
-      4. Return structured dict
+      4. Attach each candidate's nearest known treatments (embedding space)
+      5. Return structured dict (next_cursor → next page, metrics → stage timings)
     """
     from ..engines.discover import discover_candidates as engine_discover
 
+    data_dir = _data_dir    # one directory for the whole call, even if switched meanwhile
     result = engine_discover(
         disease=disease,
-        data_dir=_data_dir,
-        top_k=max(500, max_candidates * 10) if not include_novel else max(100, max_candidates * 3),
+        data_dir=data_dir,
         max_candidates=max_candidates,
         min_percentile=min_percentile,
         include_novel=include_novel,
+        cursor=cursor,
     )
 
     if result.error:
         return {"error": result.error}
 
+    with metrics.stage("name_fix"):
+        lookup = _name_source(data_dir)
+        names = [_resolve_name(c.drug_name, c.drkg_entity, lookup) for c in result.candidates]
+
+    near: list[list[dict]] = [[] for _ in result.candidates]
+    if neighbors > 0 and result.candidates:
+        near = _get_scorer(data_dir).neighbors_of([c.drkg_entity for c in result.candidates],
+                                          disease, k=neighbors)
+        for nbs in near:
+            for nb in nbs:
+                raw_id = nb["drug_entity"].replace("Compound::", "")
+                nb["drug_name"] = _resolve_name(raw_id, nb["drug_entity"], lookup)
+
     return {
         "disease": result.disease,
         "method": result.method,
@@ -191,9 +222,11 @@ def _run_discovery(disease: str, max_candidates: int,
         "disease_entities_used": result.disease_entities_used,
         "treatment_relations_used": result.treatment_relations_used,
         "stats": result.stats,
+        "next_cursor": result.next_cursor,
+        "embedding_version": result.embedding_version,
         "candidates": [
             {
-                "drug_name": _resolve_name(c.drug_name, c.drkg_entity),
+                "drug_name": name,
                 "drkg_entity": c.drkg_entity,
                 "status": c.status,
                 "chembl_id": c.chembl_id,
@@ -207,12 +240,15 @@ def _run_discovery(disease: str, max_candidates: int,
                 "kg_normalized": c.kg_normalized,
                 "kg_rank": c.kg_rank,
                 "kg_relation": c.kg_relation,
+                **({"kg_model_scores": c.kg_model_scores} if c.kg_model_scores else {}),
+                "kg_neighbors": nbs,
             }
-            for c in result.candidates
+            for c, name, nbs in zip(result.candidates, names, near)
         ],
     }
 
 
+@metrics.instrumented("tool.score_specific_drugs")
 def _run_score_drugs(drug_names: list[str], disease: str) -> dict:
     """Score specific drugs by name against a disease."""
     scorer = _get_scorer()
@@ -223,6 +259,7 @@ def _run_score_drugs(drug_names: list[str], disease: str) -> dict:
 
     return {
         "disease": disease,
+        "embedding_version": result.embedding_version,
         "drugs_found": len(result.predictions),
         "drugs_missing": [n for n in drug_names
                           if not any(p.drug_name == n for p in result.predictions)],
@@ -235,6 +272,41 @@ def _run_score_drugs(drug_names: list[str], disease: str) -> dict:
                 "normalized_score": p.normalized_score,
                 "rank": p.rank,
                 "relation_used": p.relation_used,
+                **({"model_scores": p.model_scores} if p.model_scores else {}),
+            }
+            for p in result.predictions
+        ],
+    }
+
+
+@metrics.instrumented("tool.rank_diseases_for_drug")
+def _run_rank_diseases(drug_name: str, top_k: int) -> dict:
+    """Rank all diseases for one drug (reverse query)."""
+    scorer = _get_scorer()
+    result = scorer.score_drug(drug_name, top_k=top_k)
+
+    if result.error:
+        return {"error": result.error}
+
+    drkg_entity = result.predictions[0].drug_entity if result.predictions else None
+    return {
+        "drug": drug_name,
+        "drkg_entity": drkg_entity,
+        "method": result.method,
+        "embedding_version": result.embedding_version,
+        "total_diseases_scored": result.total_diseases_scored,
+        "timing_ms": result.timing_ms,
+        "treatment_relations_used": result.treatment_relations_used,
+        "diseases": [
+            {
+                "disease_entity": p.disease_entity,
+                "score": p.score,
+                "percentile": p.percentile,
+                "z_score": p.z_score,
+                "normalized_score": p.normalized_score,
+                "rank": p.rank,
+                "relation_used": p.relation_used,
+                **({"model_scores": p.model_scores} if p.model_scores else {}),
             }
             for p in result.predictions
         ],
@@ -287,6 +359,21 @@ def _run_get_info() -> dict:
                 "description": "Include compounds not in dropped_drugs database "
                 "(default false). Set true to also see approved/novel drugs.",
             },
+            "cursor": {
+                "type": "integer",
+                "description": "Resume from a previous call's next_cursor to get "
+                "the next page of candidates (default 0 = start of the ranking). "
+                "Keep the other arguments the same.",
+                "minimum": 0,
+            },
+            "neighbors": {
+                "type": "integer",
+                "description": "Nearest known treatments of this disease (in KG "
+                "embedding space) to list per candidate as kg_neighbors "
+                "(default 3, 0 = skip).",
+                "minimum": 0,
+                "maximum": 20,
+            },
         },
         "required": ["disease"],
     },
@@ -302,6 +389,8 @@ async def discover_candidates_tool(args: dict[str, Any]) -> dict[str, Any]:
             args.get("max_candidates", 20),
             args.get("min_percentile", 75.0),
             args.get("include_novel", False),
+            args.get("cursor", 0),
+            args.get("neighbors", 3),
         )
 
         if "error" in result and "candidates" not in result:
@@ -368,6 +457,48 @@ async def score_specific_drugs_tool(args: dict[str, Any]) -> dict[str, Any]:
         }
 
 
+@tool(
+    "rank_diseases_for_drug",
+    "Reverse query: rank ALL diseases in the DRKG knowledge graph for one drug. "
+    "Use this for a shelved compound when the question is 'which diseases is it "
+    "best suited for?'. Accepts generic names (metformin), DrugBank IDs (DB00331), "
+    "or ChEMBL IDs. Each disease includes percentile (0-100 among all diseases "
+    "for this drug) and normalized_score (0-1).",
+    {
+        "type": "object",
+        "properties": {
+            "drug_name": {
+                "type": "string",
+                "description": "Drug name, DrugBank ID, or ChEMBL ID",
+            },
+            "top_k": {
+                "type": "integer",
+                "description": "Number of diseases to return (default 25)",
+                "minimum": 1,
+                "maximum": 500,
+            },
+        },
+        "required": ["drug_name"],
+    },
+)
+async def rank_diseases_for_drug_tool(args: dict[str, Any]) -> dict[str, Any]:
+    """Rank diseases for one drug."""
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            _pool, _run_rank_diseases, args["drug_name"], args.get("top_k", 25),
+        )
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+            **({"is_error": True} if "error" in result else {}),
+        }
+    except Exception as e:
+        return {
+            "content": [{"type": "text", "text": json.dumps({"error": str(e)})}],
+            "is_error": True,
+        }
+
+
 @tool(
     "kg_info",
     "Get metadata about the DRKG knowledge graph: number of compounds, diseases, "
@@ -392,10 +523,14 @@ async def kg_info_tool(args: dict[str, Any]) -> dict[str, Any]:
 #  EXPORTS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-KG_TOOLS = [discover_candidates_tool, score_specific_drugs_tool, kg_info_tool]
+KG_TOOLS = [
+    discover_candidates_tool, score_specific_drugs_tool,
+    rank_diseases_for_drug_tool, kg_info_tool,
+]
 
 KG_TOOL_NAMES = [
     "mcp__drugrescue__discover_candidates",
     "mcp__drugrescue__score_specific_drugs",
+    "mcp__drugrescue__rank_diseases_for_drug",
     "mcp__drugrescue__kg_info",
 ]
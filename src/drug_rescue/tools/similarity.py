@@ -39,6 +39,9 @@ from typing import Any, Optional
 
 import numpy as np
 
+# Known approved drugs per disease — shared with the KG neighbour explanations.
+from ..engines.neighbors import APPROVED_DRUGS
+
 try:
     from claude_agent_sdk import tool
     SDK_AVAILABLE = True
@@ -75,24 +78,6 @@ def set_data_dir(path: str):
     _data_dir = path
 
 
-# Known approved drugs per disease — CACHE, not single source of truth.
-# PubChem lookup fills gaps for anything not here.
-APPROVED_DRUGS: dict[str, list[str]] = {
-    "glioblastoma": ["Temozolomide", "Carmustine", "Lomustine", "Bevacizumab"],
-    "alzheimer": ["Donepezil", "Memantine", "Rivastigmine", "Galantamine"],
-    "parkinson": ["Levodopa", "Rasagiline", "Selegiline", "Pramipexole", "Ropinirole"],
-    "als": ["Riluzole", "Edaravone"],
-    "breast cancer": ["Tamoxifen", "Letrozole", "Anastrozole", "Trastuzumab"],
-    "lung cancer": ["Erlotinib", "Gefitinib", "Osimertinib", "Pembrolizumab"],
-    "depression": ["Fluoxetine", "Sertraline", "Venlafaxine", "Bupropion"],
-    "diabetes": ["Metformin", "Pioglitazone", "Sitagliptin", "Empagliflozin"],
-    "epilepsy": ["Valproic acid", "Carbamazepine", "Levetiracetam", "Lamotrigine"],
-    "ipf": ["Pirfenidone", "Nintedanib"],
-    "multiple myeloma": ["Lenalidomide", "Thalidomide", "Bortezomib", "Dexamethasone"],
-    "leukemia": ["Imatinib", "Dasatinib", "Cytarabine"],
-}
-
-
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  PUBCHEM SMILES LOOKUP
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -0,0 +1,98 @@
+"""
+Tiny synthetic DRKG for the engine tests: raw RotatE (complex128) and
+TransE (float32) embeddings plus the ID maps, in a fresh data/ per test.
+Entity rows are shuffled across types, so bundles really reorder them.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from drug_rescue.engines import registry
+
+N_COMPOUNDS = 600
+N_DISEASES = 40
+N_GENES = 50
+COMPLEX_DIM = 16
+TRANSE_DIM = 24
+
+TREATMENT_RELATIONS = [
+    "Hetionet::CtD::Compound:Disease",
+    "GNBR::T::Compound:Disease",
+    "DRUGBANK::treats::Compound:Disease",
+]
+RELATIONS = TREATMENT_RELATIONS + ["Hetionet::GiG::Gene:Gene"]
+
+DISEASES = [f"Disease::MESH:D{i:06d}" for i in range(N_DISEASES)]
+
+# Treatment edges written by write_triples(): disease → compound numbers.
+TREATED = {DISEASES[0]: range(10, 20), DISEASES[1]: range(20, 25)}
+
+
+def write_embeddings(emb: Path, seed: int = 0) -> None:
+    """Write raw embeddings + ID maps into emb (replacing any there)."""
+    rng = np.random.default_rng(seed)
+    names = ([f"Compound::DB{i:05d}" for i in range(N_COMPOUNDS)] + DISEASES
+             + [f"Gene::{i}" for i in range(N_GENES)])
+    names = [names[i] for i in rng.permutation(len(names))]
+    n = len(names)
+
+    emb.mkdir(parents=True, exist_ok=True)
+    ent = rng.normal(scale=0.5, size=(n, COMPLEX_DIM)) + 1j * rng.normal(scale=0.5, size=(n, COMPLEX_DIM))
+    rel = np.exp(1j * rng.uniform(0, 2 * np.pi, size=(len(RELATIONS), COMPLEX_DIM)))
+    np.save(emb / "rotate_entity_embeddings.npy", ent)
+    np.save(emb / "rotate_relation_embeddings.npy", rel)
+    np.save(emb / "transe_DRKG_TransE_l2_entity.npy",
+            rng.normal(scale=0.5, size=(n, TRANSE_DIM)).astype(np.float32))
+    np.save(emb / "transe_DRKG_TransE_l2_relation.npy",
+            rng.normal(scale=0.5, size=(len(RELATIONS), TRANSE_DIM)).astype(np.float32))
+    with open(emb / "entity_to_idx.json", "w") as f:
+        json.dump({name: i for i, name in enumerate(names)}, f)
+    with open(emb / "relation_to_idx.json", "w") as f:
+        json.dump({name: i for i, name in enumerate(RELATIONS)}, f)
+
+
+def write_triples(emb: Path, seed: int = 0, n_random: int = 800) -> None:
+    """drkg.tsv in emb: the TREATED edges plus random compound / gene / disease triples."""
+    rng = np.random.default_rng(seed)
+    pools = {"Compound": [f"Compound::DB{i:05d}" for i in range(100)],
+             "Gene": [f"Gene::{i}" for i in range(N_GENES)], "Disease": DISEASES}
+    kinds = [("Compound", "Hetionet::CbG::Compound:Gene", "Gene"),
+             ("Gene", RELATIONS[3], "Gene"),
+             ("Disease", "Hetionet::DaG::Disease:Gene", "Gene"),
+             ("Compound", "Hetionet::CpD::Compound:Disease", "Disease")]
+    rows = [(f"Compound::DB{c:05d}", TREATMENT_RELATIONS[0], d)
+            for d, compounds in TREATED.items() for c in compounds]
+    for _ in range(n_random):
+        head, rel, tail = kinds[rng.integers(len(kinds))]
+        rows.append((rng.choice(pools[head]), rel, rng.choice(pools[tail])))
+    rows += [rows[0], ("Compound::NOT_EMBEDDED", RELATIONS[0], DISEASES[0])]
+    with open(emb / "drkg.tsv", "w") as f:
+        f.writelines("\t".join(row) + "\n" for row in rows)
+
+
+def write_database(path: Path, dropped: list[dict], withdrawn: list[str] = ()) -> None:
+    """dropped_drugs.db with the given rows (missing columns are NULL)."""
+    cols = ("drug_name", "chembl_id", "drugbank_id", "smiles", "inchikey",
+            "max_phase", "molecule_type")
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE dropped_drugs ({', '.join(cols)})")
+    conn.execute("CREATE TABLE withdrawn_drugs (drug_name)")
+    conn.executemany(f"INSERT INTO dropped_drugs VALUES ({', '.join('?' * len(cols))})",
+                     [tuple(row.get(c) for c in cols) for row in dropped])
+    conn.executemany("INSERT INTO withdrawn_drugs VALUES (?)", [(n,) for n in withdrawn])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    """data/ with raw embeddings under data/embeddings and no database."""
+    root = tmp_path / "data"
+    write_embeddings(root / "embeddings")
+    (root / "database").mkdir()
+    yield root
+    registry.clear()
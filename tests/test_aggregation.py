@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.scorer import AGGREGATIONS, DRKGScorer
+
+from conftest import DISEASES
+
+WEIGHTS = {"Hetionet": 2.0, "GNBR": 0.5}
+
+
+def _pairs(scorer, query):
+    entities = scorer.resolve_disease(query)
+    tails = [scorer.entity_to_idx[e] for e in entities if e in scorer.entity_to_idx]
+    pairs = list(scorer._iter_scores(tails, scorer.find_treatment_relations()))
+    return [rel for rel, _ in pairs], np.stack([s for _, s in pairs]).astype(np.float64)
+
+
+def _reference(scorer, query, mode):
+    rels, block = _pairs(scorer, query)
+    if mode == "max":
+        return block.max(axis=0)
+    if mode == "mean":
+        return block.mean(axis=0)
+    if mode == "logsumexp":
+        top = block.max(axis=0)
+        return top + np.log(np.exp(block - top).sum(axis=0))
+    w = np.array([next((v for k, v in WEIGHTS.items() if k in r), 1.0) for r in rels])
+    return (w / w.sum()) @ block
+
+
+@pytest.mark.parametrize("query", [DISEASES[4], "MESH:D00003"])
+def test_modes_match_a_full_pair_tensor(data_dir, query):
+    scorer = DRKGScorer(str(data_dir / "embeddings"), relation_weights=WEIGHTS, chunk_rows=128)
+    results = scorer.score_disease_aggregated(query, top_k=40)
+    assert set(results) == set(AGGREGATIONS)
+    for mode, result in results.items():
+        want = _reference(scorer, query, mode)
+        order = np.argsort(-want, kind="stable")[:40]
+        assert [p.drug_entity for p in result.predictions] == [scorer.compound_names[i] for i in order]
+        np.testing.assert_allclose([p.score for p in result.predictions], want[order], atol=1e-4)
+        assert result.predictions[0].percentile == 100.0
+
+    plain = scorer.score_disease(query, top_k=40)
+    assert [p.to_dict() for p in results["max"].predictions] == [p.to_dict() for p in plain.predictions]
+    mean = scorer.score_disease(query, top_k=40, aggregation="mean")
+    assert [p.to_dict() for p in mean.predictions] == [p.to_dict() for p in results["mean"].predictions]
+
+
+def test_breakdown_is_best_per_relation(data_dir):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    result = scorer.score_disease_aggregated("MESH:D00001", modes=["mean"], top_k=10,
+                                             breakdown=True)["mean"]
+    rels, block = _pairs(scorer, "MESH:D00001")
+    for p in result.predictions:
+        col = block[:, scorer.compound_names.index(p.drug_entity)]
+        want = {r: round(float(max(v for rr, v in zip(rels, col) if rr == r)), 4) for r in set(rels)}
+        assert p.relation_scores == want
+        assert p.relation_used == rels[int(np.argmax(col))]
+
+
+def test_unknown_mode(data_dir):
+    with pytest.raises(ValueError):
+        DRKGScorer(str(data_dir / "embeddings")).score_disease_aggregated(DISEASES[0], ["median"])
@@ -0,0 +1,61 @@
+import numpy as np
+
+from drug_rescue.engines import scorer as scorer_mod
+from drug_rescue.engines.ann_index import build_ann_index, load_ann_index
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_COMPOUNDS, write_embeddings
+
+NLIST = 16
+
+
+def _recall(got, want):
+    return len({p.drug_entity for p in got} & {p.drug_entity for p in want}) / len(want)
+
+
+def test_ann_ranks_its_candidates_exactly(data_dir, monkeypatch):
+    emb = str(data_dir / "embeddings")
+    exact = DRKGScorer(emb)
+    build_ann_index(exact, nlist=NLIST)
+    monkeypatch.setattr(scorer_mod, "ANN_DEPTH", 60)
+
+    recalls = []
+    for nprobe in (1, 4, NLIST):
+        ann = DRKGScorer(emb, use_ann=True, nprobe=nprobe)
+        assert ann.ann_index is not None and ann.ann_index.nlist == NLIST
+        recall = []
+        for query in DISEASES[:10]:
+            scores, _ = ann.disease_scores(query)
+            ranked = np.flatnonzero(np.isfinite(scores.best_scores))
+            assert scores.n_ranked == len(ranked) >= 60
+            # Every candidate is scored exactly; ranks are among candidates.
+            full, _ = exact.disease_scores(query)
+            np.testing.assert_array_equal(scores.best_scores[ranked], full.best_scores[ranked])
+
+            got = ann.score_disease(query, top_k=10).predictions
+            want = exact.score_disease(query, top_k=10).predictions
+            recall.append(_recall(got, want))
+        recalls.append(np.mean(recall))
+    assert recalls == sorted(recalls) and recalls[-1] == 1.0
+
+
+def test_full_probe_reproduces_the_exact_ranking(data_dir):
+    emb = str(data_dir / "embeddings")
+    exact = DRKGScorer(emb)
+    build_ann_index(exact, nlist=NLIST)
+    ann = DRKGScorer(emb, use_ann=True)
+    idx = ann.ann_index
+    queries = [(ann.entity_emb[ann.entity_to_idx[DISEASES[0]]], 0)]
+    np.testing.assert_array_equal(idx.candidates(queries, NLIST), np.arange(N_COMPOUNDS))
+
+    got = ann.score_disease(DISEASES[0], top_k=30).predictions
+    want = exact.score_disease(DISEASES[0], top_k=30).predictions
+    assert [(p.drug_entity, p.score) for p in got] == [(p.drug_entity, p.score) for p in want]
+
+
+def test_stale_index_is_not_loaded(data_dir):
+    emb = data_dir / "embeddings"
+    build_ann_index(DRKGScorer(str(emb)), nlist=NLIST)
+    write_embeddings(emb, seed=1)
+    scorer = DRKGScorer(str(emb), use_ann=True)
+    assert scorer.ann_index is None and load_ann_index(scorer) is None
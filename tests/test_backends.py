@@ -0,0 +1,48 @@
+import numpy as np
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.scorer import GEMM_RTOL, DRKGScorer
+
+from conftest import DISEASES
+
+
+def _best(scorer, disease):
+    """(best score, best entity × relation pair) per compound, as score_disease keeps them."""
+    tails = [scorer.entity_to_idx[e] for e in scorer.resolve_disease(disease)]
+    pairs = np.stack([s for _, s in scorer._iter_scores(tails, scorer.find_treatment_relations())])
+    return pairs.max(axis=0).astype(np.float64), pairs.argmax(axis=0)
+
+
+def _order(scores):
+    return np.argsort(-scores, kind="stable")
+
+
+def test_gemm_ranks_equal_direct_on_float64(data_dir):
+    emb = str(data_dir / "embeddings")
+    direct = DRKGScorer(emb, use_bundle=False)
+    gemm = DRKGScorer(emb, use_bundle=False, backend="gemm")
+    assert direct.compound_embs.dtype == np.float64
+
+    for disease in DISEASES[:8]:
+        a, a_pair = _best(direct, disease)
+        b, b_pair = _best(gemm, disease)
+        assert np.array_equal(_order(a), _order(b))
+        np.testing.assert_allclose(a, b, rtol=1e-9)
+        assert np.array_equal(a_pair, b_pair)
+
+
+def test_gemm_within_tolerance_of_direct_on_float32_bundle(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+    direct = DRKGScorer(emb)
+    gemm = DRKGScorer(emb, backend="gemm")
+    assert direct.bundle is not None and direct.compound_embs.dtype == np.float32
+
+    for disease in DISEASES[:8]:
+        a, _ = _best(direct, disease)
+        b, _ = _best(gemm, disease)
+        tol = GEMM_RTOL * (np.abs(a) + 1)
+        assert np.all(np.abs(a - b) <= tol)
+        # Rank by rank, gemm's order may only differ from direct's by near-ties.
+        gap = np.abs(a[_order(a)] - a[_order(b)])
+        assert np.all(gap <= 2 * tol.max())
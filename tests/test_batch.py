@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+QUERIES = DISEASES[:6] + ["no such disease", DISEASES[0]]
+
+
+def _ranked(result):
+    return [(p.drug_entity, p.rank, p.relation_used) for p in result.predictions]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"quantize": "int8", "rescore_k": 16},
+                                    {"ensemble": "rank"}])
+def test_score_diseases_equals_score_disease(data_dir, kwargs):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+    batch = DRKGScorer(emb, **kwargs).score_diseases(QUERIES, top_k=40)
+    single = DRKGScorer(emb, **kwargs)
+
+    for query, got in zip(QUERIES, batch):
+        want = single.score_disease(query, top_k=40)
+        assert got.error == want.error
+        assert [p.to_dict() for p in got.predictions] == [p.to_dict() for p in want.predictions]
+
+
+def test_score_diseases_gemm_batch_matches_score_disease(data_dir):
+    emb = str(data_dir / "embeddings")
+    scorer = DRKGScorer(emb, use_bundle=False, backend="gemm")
+    batch = scorer.score_diseases(QUERIES, top_k=40, memory_budget_mb=0.05)
+    single = DRKGScorer(emb, use_bundle=False, backend="gemm")
+
+    for query, got in zip(QUERIES, batch):
+        want = single.score_disease(query, top_k=40)
+        assert got.error == want.error
+        assert _ranked(got) == _ranked(want)
+        np.testing.assert_allclose([p.score for p in got.predictions],
+                                   [p.score for p in want.predictions], atol=1e-4)
+    # Batched vectors are in the LRU: score_disease reuses them.
+    assert _ranked(scorer.score_disease(DISEASES[1], top_k=40)) == _ranked(batch[1])
+    assert len(scorer._score_cache) == 6
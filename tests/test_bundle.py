@@ -0,0 +1,43 @@
+import numpy as np
+
+from drug_rescue.engines.bundle import build_bundle, load_bundle
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_COMPOUNDS, write_embeddings
+
+
+def _scores(scorer, query):
+    result = scorer.score_disease(query, top_k=N_COMPOUNDS)
+    return {p.drug_entity: p.score for p in result.predictions}
+
+
+def test_bundle_scores_match_raw(data_dir):
+    emb = str(data_dir / "embeddings")
+    raw = DRKGScorer(emb)
+    assert raw.bundle is None
+    build_bundle(emb)
+
+    mapped = DRKGScorer(emb)
+    assert mapped.bundle is not None
+    assert mapped.entity_emb.dtype == np.float32 and isinstance(mapped.entity_emb, np.memmap)
+    # Compounds are the first rows of the map: a view, not a copy.
+    assert np.shares_memory(mapped.compound_embs, mapped.entity_emb)
+    assert sorted(mapped.compound_names) == sorted(raw.compound_names)
+    assert mapped.entity_to_idx.keys() == raw.entity_to_idx.keys()
+
+    for query in DISEASES[:5]:
+        # Scores are reported to 4 decimals; float32 may round the other way.
+        want, got = _scores(raw, query), _scores(mapped, query)
+        assert got.keys() == want.keys()
+        np.testing.assert_allclose([got[k] for k in want], list(want.values()), atol=2e-4)
+
+
+def test_stale_bundle_falls_back_to_raw(data_dir):
+    emb = data_dir / "embeddings"
+    build_bundle(str(emb))
+    assert load_bundle(str(emb)) is not None
+
+    write_embeddings(emb, seed=1)
+    assert load_bundle(str(emb)) is None
+    assert DRKGScorer(str(emb)).bundle is None
+    assert DRKGScorer(str(emb), use_bundle=False).bundle is None
@@ -0,0 +1,46 @@
+import numpy as np
+
+from drug_rescue.engines.calibration import build_null_model
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_DISEASES
+
+# Each resolves to the ten entities Disease::MESH:D0000i0 .. D0000i9.
+MULTI = [f"MESH:D0000{i}" for i in range(N_DISEASES // 10)]
+
+
+def _mean_percentile(scorer, queries, raw=False):
+    out = []
+    for query in queries:
+        scores, _ = scorer.disease_scores(query)
+        null = scorer.null_model if raw else scores.null
+        out.append(null.percentiles(scores.best_scores).mean())
+    return float(np.mean(out))
+
+
+def test_percentiles_compare_across_entity_counts(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_null_model(DRKGScorer(emb, calibrate=False), n_samples=N_DISEASES)
+    scorer = DRKGScorer(emb, calibrate=True)
+    assert scorer.null_model is not None
+
+    scores, _ = scorer.disease_scores(MULTI[0])
+    assert len(scores.disease_entities) == 10 and scores.null.n_entities == 10
+    assert scorer.disease_scores(DISEASES[0])[0].null is scorer.null_model
+
+    # Null built from every disease: one entity averages the 50th percentile.
+    assert abs(_mean_percentile(scorer, DISEASES) - 50.0) < 1.0
+    # The best of ten entities stays near it only against the max-of-ten null.
+    assert abs(_mean_percentile(scorer, MULTI) - 50.0) < 10.0
+    assert _mean_percentile(scorer, MULTI, raw=True) > 75.0
+
+
+def test_null_for_entities_is_max_of_draws(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_null_model(DRKGScorer(emb, calibrate=False), n_samples=N_DISEASES)
+    null = DRKGScorer(emb, calibrate=True).null_model
+
+    assert null.for_entities(1) is null and null.for_entities(4) is null.for_entities(4)
+    s = null.quantiles[-1, ::50]
+    p1 = null.percentiles(s) / 100
+    np.testing.assert_allclose(null.for_entities(4).percentiles(s) / 100, p1 ** 4, atol=2e-3)
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from drug_rescue.engines import drug_db
+from drug_rescue.engines.drug_db import DrugDB, index_database
+from drug_rescue.engines.scorer import DrugNameResolver
+
+from conftest import write_database
+
+ROWS = [
+    {"drug_name": "Metformin", "drugbank_id": "DB00331", "chembl_id": "CHEMBL1431"},
+    {"drug_name": "  Metformin\t", "drugbank_id": None, "chembl_id": "chembl1431 "},
+    {"drug_name": "Ésoméprazole", "drugbank_id": "db00736", "smiles": "C"},
+    {"drug_name": "rofecoxib\n", "drugbank_id": "DB00533"},
+    {"drug_name": None, "drugbank_id": "DB09999"},
+]
+
+
+def _old_dicts(rows, withdrawn):
+    """The dicts _DBEnricher and DrugNameResolver used to preload."""
+    by_id, by_name, ids = {}, {}, {}
+    for r in rows:
+        name = (r.get("drug_name") or "").lower().strip()
+        db_id = (r.get("drugbank_id") or "").upper().strip()
+        if db_id:
+            by_id[db_id] = r
+        if name:
+            by_name[name] = r
+            for col in ("drugbank_id", "chembl_id"):
+                if r.get(col):
+                    ids.setdefault(name, {})[col] = r[col]
+    return by_id, by_name, ids, {n.lower().strip() for n in withdrawn}
+
+
+@pytest.fixture(params=["plain", "indexed"])
+def db_path(tmp_path, request):
+    path = tmp_path / "dropped_drugs.db"
+    write_database(path, ROWS, withdrawn=["ROFECOXIB "])
+    if request.param == "indexed":
+        assert index_database(str(path))
+    drug_db._warned.add(str(path))
+    return path
+
+
+def test_lookups_match_the_old_dicts(db_path):
+    db = DrugDB(str(db_path))
+    by_id, by_name, ids, withdrawn = _old_dicts(ROWS, ["ROFECOXIB "])
+
+    got = db.by_drugbank(list(by_id) + ["DB00000"])
+    assert {k: v["drug_name"] for k, v in got.items()} == \
+        {k: v["drug_name"] for k, v in by_id.items()}
+    got = db.by_name(list(by_name) + ["nope"])
+    assert {k: v["drug_name"] for k, v in got.items()} == \
+        {k: v["drug_name"] for k, v in by_name.items()}
+    assert set(by_name) == {"metformin", "ésoméprazole", "rofecoxib"}
+    # The last Metformin row has no DrugBank id: the earlier one's is kept.
+    assert db.drug_ids(["metformin"])["metformin"] == \
+        {"drugbank_id": "DB00331", "chembl_id": "chembl1431 "} == \
+        {"drugbank_id": ids["metformin"]["drugbank_id"], "chembl_id": ids["metformin"]["chembl_id"]}
+    assert db.withdrawn(["rofecoxib", "metformin"]) == withdrawn & {"rofecoxib", "metformin"}
+
+
+def test_updated_rows_are_still_found(tmp_path):
+    path = tmp_path / "dropped_drugs.db"
+    write_database(path, ROWS)
+    index_database(str(path))
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE dropped_drugs SET drug_name = ' Naproxène' WHERE drugbank_id = 'DB00533'")
+    conn.execute("INSERT INTO dropped_drugs (drug_name, drugbank_id) VALUES ('ASPIRIN ', 'DB00945')")
+    conn.commit()
+    conn.close()
+
+    db = DrugDB(str(path))
+    assert set(db.by_name(["naproxène", "aspirin", "rofecoxib"])) == {"naproxène", "aspirin"}
+    assert db.by_drugbank(["DB00945"])["DB00945"]["drug_name"] == "ASPIRIN "
+
+
+def test_read_only_directory_opens_immutable(tmp_path, monkeypatch):
+    path = tmp_path / "dropped_drugs.db"
+    write_database(path, ROWS)
+    index_database(str(path))          # WAL
+    monkeypatch.setattr(drug_db.os, "access", lambda p, mode: False)
+    db = DrugDB(str(path))
+    assert "immutable=1" in db._uri
+    assert set(db.by_name(["metformin"])) == {"metformin"}
+
+
+def test_resolver_uses_database_ids(db_path):
+    entities = {"Compound::DB00331": 0, "Compound::DB00736": 1, "Compound::CHEMBL7": 2}
+    resolver = DrugNameResolver(entities, db_path=str(db_path))
+    assert resolver.resolve("metformin") == "Compound::DB00331"
+    assert resolver.resolve("ÉSOMÉPRAZOLE") == "Compound::DB00736"
+    assert resolver.resolve("unknown drug") is None
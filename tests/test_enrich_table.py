@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from drug_rescue.engines import registry
+from drug_rescue.engines.discover import discover_candidates
+from drug_rescue.engines.enrich_table import build_enrich_table, read_name_lookup
+from drug_rescue.tools import kg_discovery
+
+from conftest import DISEASES, N_COMPOUNDS, write_database
+
+
+@pytest.fixture
+def db_dir(data_dir):
+    db = data_dir / "database"
+    dropped = [{"drug_name": f"drug {i}", "drugbank_id": f"DB{i:05d}", "max_phase": i % 4,
+                "smiles": "CCO" if i % 4 == 0 else "", "chembl_id": f"CHEMBL{i}",
+                "inchikey": None, "molecule_type": "Small molecule"}
+               for i in range(0, N_COMPOUNDS, 3)]
+    dropped.append({"drug_name": "resolved", "chembl_id": "CHEMBL9999", "smiles": "N"})
+    write_database(db / "dropped_drugs.db", dropped, withdrawn=["drug 0", "drug 30"])
+    with open(db / "kg_entity_lookup.json", "w") as f:
+        json.dump({"Compound::DB00001": {"chembl_id": "chembl9999"},
+                   "Compound::DB00002": {"drug_name": "Named Novel", "smiles": "O"},
+                   "Compound::DB00004": {"drug_name": "Fourth"}}, f)
+    with open(data_dir / "drugbank_to_name.json", "w") as f:
+        json.dump({"DB00004": "not used", "DB00005": "Fifth"}, f)
+    return data_dir
+
+
+def test_table_records_equal_enrich(db_dir):
+    scorer = registry.get_scorer(str(db_dir))
+    assert registry.get_enrich_table(str(db_dir)) is None
+    build_enrich_table(str(db_dir), scorer.compound_names)
+    table = registry.get_enrich_table(str(db_dir))
+    assert table is not None and len(table) == N_COMPOUNDS
+
+    enricher = registry.get_enricher(str(db_dir))
+    rows = np.arange(N_COMPOUNDS)
+    assert table.records(rows) == [enricher.enrich(e) for e in scorer.compound_names]
+    assert table.records([scorer.compound_pos["Compound::DB00001"]])[0]["drug_name"] == "resolved"
+
+    names = read_name_lookup(db_dir)
+    assert names["Compound::DB00004"] == "Fourth" and names["Compound::DB00005"] == "Fifth"
+    for entity in scorer.compound_names:
+        assert table.display_name(entity) == names.get(entity)
+    assert table.display_name("Compound::nope") is None
+
+
+def test_discovery_with_and_without_table(db_dir):
+    def run():
+        res = discover_candidates(DISEASES[2], data_dir=str(db_dir), max_candidates=40,
+                                  min_percentile=0.0, require_smiles=False)
+        return [c.to_dict() for c in res.candidates], res.stats
+
+    without = run()
+    build_enrich_table(str(db_dir), registry.get_scorer(str(db_dir)).compound_names)
+    assert registry.get_enrich_table(str(db_dir)) is not None
+    assert run() == without
+
+
+def test_tool_names_with_and_without_table(db_dir, monkeypatch):
+    monkeypatch.setattr(kg_discovery, "_data_dir", str(db_dir))
+
+    def names():
+        out = kg_discovery._run_discovery(DISEASES[2], N_COMPOUNDS, 0.0, True)
+        return {c["drkg_entity"]: c["drug_name"] for c in out["candidates"]}
+
+    without = names()
+    assert without["Compound::DB00004"] == "Fourth"
+    build_enrich_table(str(db_dir), registry.get_scorer(str(db_dir)).compound_names)
+    assert names() == without
+
+
+def test_table_goes_stale_with_its_sources(db_dir):
+    build_enrich_table(str(db_dir), registry.get_scorer(str(db_dir)).compound_names)
+    assert registry.get_enrich_table(str(db_dir)) is not None
+    path = db_dir / "database" / "kg_entity_lookup.json"
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert registry.get_enrich_table(str(db_dir)) is None
@@ -0,0 +1,87 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.ensemble import build_partner, fuse
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_COMPOUNDS
+
+
+def _transe_only(data_dir, tmp_path):
+    """A TransE scorer over the same raw files, RotatE removed."""
+    emb = tmp_path / "transe"
+    shutil.copytree(data_dir / "embeddings", emb)
+    for f in emb.glob("rotate_*"):
+        f.unlink()
+    scorer = DRKGScorer(str(emb))
+    assert scorer.method == "TransE"
+    return scorer
+
+
+def test_fuse_rank_and_zscore():
+    a = np.array([1.0, 3.0, 2.0, -np.inf])
+    b = np.array([30.0, 10.0, 20.0, 5.0])
+    np.testing.assert_allclose(fuse([a, b], "rank"), [(1 / 3 + 1) / 2, (1 + 1 / 3) / 2,
+                                                       (2 / 3 + 2 / 3) / 2, -np.inf])
+    za, zb = (a[:3] - a[:3].mean()) / a[:3].std(), (b[:3] - b[:3].mean()) / b[:3].std()
+    np.testing.assert_allclose(fuse([a, b], "zscore")[:3], (za + zb) / 2)
+    assert fuse([a, b], "zscore")[3] == -np.inf
+    assert np.all(np.isinf(fuse([np.full(3, -np.inf), np.ones(3)], "rank")))
+    with pytest.raises(ValueError):
+        fuse([a, b], "mean")
+
+
+@pytest.mark.parametrize("fusion", ["rank", "zscore"])
+def test_ensemble_fuses_both_models(data_dir, tmp_path, fusion):
+    emb = str(data_dir / "embeddings")
+    plain = DRKGScorer(emb)
+    transe = _transe_only(data_dir, tmp_path)
+    scorer = DRKGScorer(emb, ensemble=fusion)
+    assert scorer.partner is not None and scorer.partner.method == "TransE"
+    assert scorer.info()["ensemble"]["fusion"] == fusion
+
+    for query in DISEASES[:4]:
+        scores, err = scorer.disease_scores(query)
+        assert err is None and list(scores.models) == ["RotatE", "TransE"]
+        rotate = plain.disease_scores(query)[0].best_scores
+        other = transe.disease_scores(query)[0].best_scores
+        np.testing.assert_array_equal(scores.models["RotatE"].best_scores, rotate)
+        # The partner is scored in float32, the TransE scorer in float64.
+        partner = scores.models["TransE"].best_scores
+        np.testing.assert_allclose(partner, other, atol=1e-5)
+        np.testing.assert_array_equal(scores.best_scores, fuse([rotate, partner], fusion))
+
+        result = scorer.score_disease(query, top_k=N_COMPOUNDS)
+        assert result.method == "RotatE+TransE" and result.ensemble == fusion
+        fused = [p.score for p in result.predictions]
+        assert fused == sorted(fused, reverse=True)
+        want = {p.drug_entity: p.score for p in plain.score_disease(query, top_k=N_COMPOUNDS).predictions}
+        for p in result.predictions[:20]:
+            assert p.model_scores["RotatE"]["score"] == want[p.drug_entity]
+
+
+def test_prebuilt_partner_matches_raw(data_dir):
+    emb = str(data_dir / "embeddings")
+    raw = DRKGScorer(emb, ensemble="rank")
+    assert raw.partner.path is None
+    build_bundle(emb)
+    build_partner(DRKGScorer(emb))
+
+    mapped = DRKGScorer(emb, ensemble="rank")
+    assert mapped.bundle is not None and mapped.partner.path is not None
+    assert np.shares_memory(mapped.partner.compound_embs, mapped.partner.entity_emb)
+    for query in DISEASES[:3]:
+        want = {p.drug_entity: p.model_scores["TransE"]["score"]
+                for p in raw.score_disease(query, top_k=N_COMPOUNDS).predictions}
+        got = {p.drug_entity: p.model_scores["TransE"]["score"]
+               for p in mapped.score_disease(query, top_k=N_COMPOUNDS).predictions}
+        assert got.keys() == want.keys()
+        np.testing.assert_allclose([got[k] for k in want], list(want.values()), atol=2e-4)
+
+
+def test_unknown_ensemble_raises(data_dir):
+    with pytest.raises(ValueError):
+        DRKGScorer(str(data_dir / "embeddings"), ensemble="vote")
@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.graph import PATH_DAMPING, build_graph, find_paths, load_graph
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, write_triples
+
+SOURCES = [f"Compound::DB{i:05d}" for i in (3, 12, 47, 88)]
+
+
+def _brute_graph(scorer, path):
+    """Undirected adjacency and stored-edge degree straight from the TSV."""
+    triples = set()
+    with open(path) as f:
+        for line in f:
+            h, r, t = line.rstrip("\n").split("\t")
+            if h in scorer.entity_to_idx and t in scorer.entity_to_idx:
+                triples.add((scorer.entity_to_idx[h], r, scorer.entity_to_idx[t]))
+    adj, degree = defaultdict(set), defaultdict(int)
+    for h, _, t in triples:
+        adj[h].add(t)
+        adj[t].add(h)
+        degree[h] += 1
+        degree[t] += 1
+    return adj, degree
+
+
+def _brute_paths(adj, degree, s, t):
+    paths = [(s, t)] if t in adj[s] else []
+    paths += [(s, m, t) for m in adj[s] & adj[t] if m not in (s, t)]
+    paths += [(s, a, b, t) for a in adj[s] for b in adj[t]
+              if a != b and {a, b}.isdisjoint((s, t)) and b in adj[a]]
+    weight = {}
+    for p in paths:
+        w = 1.0
+        for node in p[1:-1]:
+            w *= max(degree[node], 1) ** -PATH_DAMPING
+        weight[p] = round(w, 6)
+    return weight
+
+
+@pytest.mark.parametrize("use_bundle", [False, True])
+def test_paths_match_brute_force(data_dir, use_bundle):
+    emb = data_dir / "embeddings"
+    write_triples(emb)
+    if use_bundle:
+        build_bundle(str(emb))
+    scorer = DRKGScorer(str(emb))
+    build_graph(scorer)
+    graph = scorer.graph
+    assert graph is not None
+    adj, degree = _brute_graph(scorer, emb / "drkg.tsv")
+    assert graph.n_edges == sum(degree.values()) // 2
+
+    idx = scorer.entity_to_idx
+    for source in SOURCES:
+        for target in DISEASES[:3]:
+            s, t = idx[source], idx[target]
+            want = _brute_paths(adj, degree, s, t)
+            got = find_paths(graph, s, t, max_paths=10**6)
+            counts = {f"{h}_hop": sum(1 for p in want if len(p) == h + 1) for h in (1, 2, 3)}
+            if not counts["1_hop"]:
+                del counts["1_hop"]       # only reported when there is a direct edge
+            assert got["counts"] == counts
+            nodes = {tuple(idx[n] for n in p["nodes"]): p["score"] for p in got["paths"]}
+            assert nodes == want
+            scores = [p["score"] for p in got["paths"]]
+            assert scores == sorted(scores, reverse=True)
+
+            genes = find_paths(graph, s, t, max_paths=10**6, via=("Gene",))
+            assert all(n.startswith("Gene::") for p in genes["paths"] for n in p["nodes"][1:-1])
+
+
+def test_mechanism_paths_resolve_drugs_and_relations(data_dir):
+    emb = data_dir / "embeddings"
+    write_triples(emb)
+    assert DRKGScorer(str(emb)).mechanism_paths(["DB00012"], DISEASES[0]) is None
+    build_graph(DRKGScorer(str(emb)))
+    scorer = DRKGScorer(str(emb))
+
+    out = scorer.mechanism_paths(["DB00012", "not a drug"], DISEASES[0], max_hops=2, max_paths=3)
+    first, missing = out
+    assert first["drug_entity"] == "Compound::DB00012" and first["paths"]
+    direct = [p for p in first["paths"] if len(p["nodes"]) == 2]
+    assert direct and "Hetionet::CtD::Compound:Disease" in direct[0]["hops"][0]["relations"]
+    assert direct[0]["hops"][0]["inverse"] == []
+    assert len(first["paths"]) <= 3 and max(len(p["nodes"]) for p in first["paths"]) <= 3
+    assert (missing["drug"], missing["drug_entity"], missing["paths"]) == ("not a drug", None, [])
+    with pytest.raises(ValueError):
+        scorer.mechanism_paths(["DB00012"], DISEASES[0], max_hops=4)
+
+
+def test_graph_goes_stale_with_the_triples(data_dir):
+    emb = data_dir / "embeddings"
+    write_triples(emb)
+    scorer = DRKGScorer(str(emb))
+    build_graph(scorer)
+    assert load_graph(scorer) is not None
+    write_triples(emb, seed=1, n_random=10)
+    assert load_graph(scorer) is None
@@ -0,0 +1,65 @@
+import pytest
+
+from drug_rescue.engines import registry
+from drug_rescue.engines.discover import discover_candidates
+
+from conftest import DISEASES, N_COMPOUNDS, write_database
+
+QUERY = DISEASES[5]
+
+
+@pytest.fixture
+def db_dir(data_dir):
+    dropped = [{"drug_name": f"drug {i}", "drugbank_id": f"DB{i:05d}",
+                "smiles": "CCO" if i % 4 == 0 else None,
+                "chembl_id": f"CHEMBL{i}" if i % 6 == 0 else None}
+               for i in range(0, N_COMPOUNDS, 2)]
+    write_database(data_dir / "database" / "dropped_drugs.db", dropped,
+                   withdrawn=[f"drug {i}" for i in range(0, N_COMPOUNDS, 10)])
+    return data_dir
+
+
+def _reference(data_dir, include_novel, require_smiles):
+    """Walk the full ranking and enrich every compound, as before the masks."""
+    scorer = registry.get_scorer(str(data_dir))
+    enricher = registry.get_enricher(str(data_dir))
+    out = []
+    for p in scorer.score_disease(QUERY, top_k=N_COMPOUNDS).predictions:
+        info = enricher.enrich(p.drug_entity)
+        if (info or include_novel) and (info.get("smiles") or not require_smiles):
+            out.append((p.rank, info.get("status", "novel")))
+    return out
+
+
+def test_masks_agree_with_enrich(db_dir):
+    scorer = registry.get_scorer(str(db_dir))
+    enricher = registry.get_enricher(str(db_dir))
+    masks = enricher.masks(scorer.compound_names)
+    assert enricher.masks(scorer.compound_names) is masks
+    for i, entity in enumerate(scorer.compound_names):
+        info = enricher.enrich(entity)
+        assert masks.dropped[i] == (info.get("status") == "dropped")
+        assert masks.withdrawn[i] == (info.get("status") == "withdrawn")
+        assert masks.has_smiles[i] == bool(info.get("smiles"))
+        assert masks.has_chembl[i] == bool(info.get("chembl_id"))
+    assert masks.withdrawn.sum() == N_COMPOUNDS // 10
+    assert masks.in_db.sum() == N_COMPOUNDS // 2
+
+
+@pytest.mark.parametrize("include_novel,require_smiles",
+                         [(True, False), (False, False), (True, True), (False, True)])
+def test_filtered_discovery_matches_a_full_walk(db_dir, include_novel, require_smiles):
+    want = _reference(db_dir, include_novel, require_smiles)
+    kwargs = dict(data_dir=str(db_dir), min_percentile=0.0,
+                  include_novel=include_novel, require_smiles=require_smiles)
+    result = discover_candidates(QUERY, max_candidates=N_COMPOUNDS, **kwargs)
+    assert [(c.kg_rank, c.status) for c in result.candidates] == want
+    for status in ("dropped", "withdrawn", "novel"):
+        assert result.stats[status] == sum(1 for _, s in want if s == status)
+
+    cursor, paged = 0, []
+    while cursor is not None:
+        page = discover_candidates(QUERY, max_candidates=9, cursor=cursor, **kwargs)
+        paged += [c.kg_rank for c in page.candidates]
+        cursor = page.next_cursor
+    assert paged == [rank for rank, _ in want]
@@ -0,0 +1,76 @@
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from drug_rescue.engines import metrics
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_threaded_chunks_count_into_the_caller(data_dir):
+    emb = str(data_dir / "embeddings")
+    one = DRKGScorer(emb, threads=1, chunk_rows=64).score_disease(DISEASES[0], top_k=5)
+    four = DRKGScorer(emb, threads=4, chunk_rows=64).score_disease(DISEASES[0], top_k=5)
+    assert one.metrics["counters"]["score_chunks"] > 3
+    assert four.metrics["counters"]["score_chunks"] == one.metrics["counters"]["score_chunks"]
+    assert set(four.metrics["stages_ms"]) == set(one.metrics["stages_ms"])
+
+
+def test_hook_receives_instrumented_calls(data_dir):
+    seen = []
+    metrics.set_metrics_hook(lambda event, block: seen.append((event, block)))
+    try:
+        result = DRKGScorer(str(data_dir / "embeddings")).score_disease(DISEASES[1], top_k=5)
+    finally:
+        metrics.set_metrics_hook(None)
+    assert seen == [("score_disease", result.metrics)]
+    assert result.metrics["counters"]["score_cache_miss"] == 1
+
+
+def test_nested_stage_keeps_enclosing_peak(tracing):
+    with metrics.collect() as m:
+        with metrics.stage("outer"):
+            big = np.ones(1_250_000)          # 10 MB
+            del big
+            with metrics.stage("inner"):
+                small = np.ones(1000)
+                del small
+    assert m.bytes["outer"] >= 10_000_000
+    assert m.bytes["inner"] < 1_000_000
+
+
+def test_overlapping_threads_report_no_bytes(tracing):
+    barrier = threading.Barrier(2)
+    blocks = []
+
+    def request():
+        with metrics.collect() as m:
+            with metrics.stage("work"):
+                barrier.wait()
+                x = np.ones(100_000)
+                barrier.wait()
+                del x
+        blocks.append(m.to_dict())
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all("work" in b["stages_ms"] and "peak_bytes" not in b for b in blocks)
+
+    # Alone again: bytes are reported.
+    with metrics.collect() as m:
+        with metrics.stage("work"):
+            pass
+    assert "work" in m.bytes
@@ -0,0 +1,61 @@
+import threading
+
+from drug_rescue.engines.name_index import NameCache, SubstringIndex
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+NAMES = DISEASES + [f"Compound::DB{i:05d}" for i in range(200)] + ["Gene::ABC", "gene::abd"]
+
+
+def test_substring_index_matches_a_scan():
+    idx = SubstringIndex(NAMES)
+    for query in ["mesh:d0000", "D00001", "db001", "Compound::DB00042", "ab", "gene::", "zzz", "x", ""]:
+        want = [n for n in NAMES if query.lower() in n.lower()]
+        assert idx.search(query) == want
+        assert idx.search(query, limit=3) == want[:3]
+
+
+def test_name_cache_is_lru_and_caches_none():
+    cache = NameCache(size=2)
+    cache.put("a", None)
+    cache.put("b", ["x"])
+    assert cache.get("a") is None          # a hit, and now most recent
+    cache.put("c", ["y"])
+    assert cache.get("b") is NameCache.MISSING
+    assert cache.get("a") is None and cache.get("c") == ["y"] and len(cache) == 2
+    assert NameCache(size=0).get("a") is NameCache.MISSING
+
+
+def test_name_cache_bounded_under_threads():
+    cache = NameCache(size=64)
+
+    def work(t):
+        for i in range(2000):
+            cache.put((t, i % 100), i)
+            cache.get((t, (i * 7) % 100))
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(cache) == 64
+
+
+def test_resolvers_cache_results(data_dir, monkeypatch):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    calls = []
+    for obj, name in [(scorer.resolver, "_resolve"), (scorer, "_resolve_disease")]:
+        real = getattr(obj, name)
+        monkeypatch.setattr(obj, name, lambda q, real=real: calls.append(q) or real(q))
+
+    for _ in range(3):
+        assert scorer.resolver.resolve("DB00007") == "Compound::DB00007"
+        assert scorer.resolver.resolve("no such drug") is None
+    entities = scorer.resolve_disease("MESH:D00000")
+    assert sorted(entities) == DISEASES[:10]
+    entities.append("mutated")
+    assert scorer.resolve_disease("MESH:D00000") == entities[:-1]
+    assert scorer.resolve_disease("nothing like it") == []
+    assert calls == ["DB00007", "no such drug", "MESH:D00000", "nothing like it"]
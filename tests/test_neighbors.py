@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.neighbors import (REF_TREATED, build_neighbor_index, distances,
+                                           load_neighbor_index)
+from drug_rescue.engines.scorer import DRKGScorer
+from drug_rescue.tools import kg_discovery
+
+from conftest import DISEASES, TREATED, write_triples
+
+SAMPLE = [f"Compound::DB{i:05d}" for i in (0, 12, 21, 99, 350, 599)]
+
+
+@pytest.fixture
+def scorer(data_dir):
+    emb = data_dir / "embeddings"
+    write_triples(emb)
+    scorer = DRKGScorer(str(emb))
+    build_neighbor_index(scorer, metric="cosine")
+    return scorer
+
+
+def _brute(scorer, entity, refs, k):
+    row = scorer.compound_pos[entity]
+    d = distances(scorer.compound_embs[[row]], scorer.compound_embs[refs], "cosine")[0]
+    d[refs == row] = np.inf
+    order = np.argsort(d, kind="stable")[:k]
+    return [(scorer.compound_names[refs[i]], round(float(d[i]), 4)) for i in order]
+
+
+def test_index_finds_nearest_references(scorer):
+    index = scorer.neighbor_index
+    assert index is not None and index.metric == "cosine"
+    treated = {scorer.compound_pos[f"Compound::DB{c:05d}"] for cs in TREATED.values() for c in cs}
+    assert set(np.flatnonzero(index.reference & REF_TREATED)) == treated
+
+    refs = np.flatnonzero(index.reference)
+    found = scorer.neighbors_of(SAMPLE + ["Compound::nope"], k=5)
+    assert found[-1] == []
+    for entity, nbs in zip(SAMPLE, found):
+        assert [(n["drug_entity"], n["distance"]) for n in nbs] == _brute(scorer, entity, refs, 5)
+        for n in nbs:
+            row = scorer.compound_pos[n["drug_entity"]]
+            assert ("treatment_edge" in n["evidence"]) == (row in treated)
+
+
+def test_disease_query_uses_its_own_treatments(scorer):
+    refs = np.array(sorted(scorer.compound_pos[f"Compound::DB{c:05d}"] for c in TREATED[DISEASES[0]]))
+    predictions = scorer.score_disease(DISEASES[0], top_k=4).predictions
+    scorer.explain_neighbors(predictions, disease_query=DISEASES[0], k=3)
+    for p in predictions:
+        assert [(n["drug_entity"], n["distance"]) for n in p.neighbors] == \
+            _brute(scorer, p.drug_entity, refs, 3)
+        assert all(n["evidence"] == ["treats_disease"] for n in p.neighbors)
+
+
+def test_stale_index_is_ignored(scorer, data_dir):
+    assert load_neighbor_index(scorer) is not None
+    write_triples(data_dir / "embeddings", seed=1)
+    assert load_neighbor_index(DRKGScorer(str(data_dir / "embeddings"))) is None
+
+
+def test_discovery_tool_names_the_neighbours(scorer, data_dir, monkeypatch):
+    monkeypatch.setattr(kg_discovery, "_data_dir", str(data_dir))
+    out = kg_discovery._run_discovery(DISEASES[0], 3, 0.0, True, neighbors=2)
+    assert len(out["candidates"]) == 3
+    for c in out["candidates"]:
+        assert len(c["kg_neighbors"]) == 2
+        assert all(n["drug_name"] == n["drug_entity"].replace("Compound::", "")
+                   for n in c["kg_neighbors"])
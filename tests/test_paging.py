@@ -0,0 +1,40 @@
+import pytest
+
+from drug_rescue.engines.discover import discover_candidates
+
+from conftest import DISEASES, N_COMPOUNDS
+
+
+def _pages(data_dir, **kwargs):
+    cursor, pages = 0, []
+    while cursor is not None:
+        page = discover_candidates(DISEASES[3], data_dir=str(data_dir), cursor=cursor, **kwargs)
+        assert page.error is None
+        pages.append(page)
+        assert len(pages) <= N_COMPOUNDS, "cursor does not advance"
+        cursor = page.next_cursor
+    return pages
+
+
+@pytest.mark.parametrize("page_size", [1, 7, 50, N_COMPOUNDS])
+def test_pages_cover_every_rank_once(data_dir, page_size):
+    pages = _pages(data_dir, max_candidates=page_size, min_percentile=0.0, include_novel=True)
+    ranks = [c.kg_rank for p in pages for c in p.candidates]
+    assert ranks == list(range(1, N_COMPOUNDS + 1))
+    assert all(len(p.candidates) == page_size for p in pages[:-1])
+
+
+def test_pages_stop_at_percentile_floor(data_dir):
+    pages = _pages(data_dir, max_candidates=9, min_percentile=80.0, include_novel=True)
+    got = [c for p in pages for c in p.candidates]
+    full = discover_candidates(DISEASES[3], data_dir=str(data_dir), max_candidates=N_COMPOUNDS,
+                               min_percentile=80.0, include_novel=True).candidates
+    assert [c.kg_rank for c in got] == [c.kg_rank for c in full]
+    assert [c.kg_rank for c in got] == list(range(1, len(got) + 1))
+    assert all(c.kg_percentile >= 80.0 for c in got)
+
+
+def test_no_eligible_candidates_ends_paging(data_dir):
+    # No database: every compound is novel, so excluding novel leaves nothing.
+    pages = _pages(data_dir, max_candidates=10, min_percentile=0.0, include_novel=False)
+    assert len(pages) == 1 and pages[0].candidates == []
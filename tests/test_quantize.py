@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines import registry
+from drug_rescue.engines.bundle import build_bundle, load_bundle
+from drug_rescue.engines.discover import discover_candidates
+from drug_rescue.engines.quantize import build_quantized
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, write_embeddings
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+@pytest.mark.parametrize("prebuilt", [False, True])
+def test_quantized_scan_top_k_is_exact(data_dir, dtype, prebuilt):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+    if prebuilt:
+        build_quantized(load_bundle(emb), emb, dtype)
+    exact = DRKGScorer(emb)
+    quant = DRKGScorer(emb, quantize=dtype, rescore_k=16)
+    assert quant.quantized is not None and quant.quantized.kind == dtype
+
+    for disease in DISEASES[:10]:
+        a, _ = exact.disease_scores(disease)
+        b, _ = quant.disease_scores(disease, min_exact=16)
+        assert np.array_equal(a.order()[:16], b.order()[:16])
+        np.testing.assert_array_equal(a.best_scores[a.order()[:16]],
+                                      b.best_scores[b.order()[:16]])
+
+
+def test_quantized_store_stays_out_of_releases(data_dir):
+    emb = data_dir / "embeddings"
+    release = build_bundle(str(emb), release=True)
+    before = sorted(p.name for p in release.iterdir())
+    build_quantized(load_bundle(str(emb)), str(emb), "int8")
+    assert sorted(p.name for p in release.iterdir()) == before
+    assert (emb / "quantized" / "compounds_int8.json").exists()
+    assert isinstance(DRKGScorer(str(emb), quantize="int8").quantized.codes, np.memmap)
+
+    # Another release does not pick up the first one's store.
+    write_embeddings(emb, seed=1)
+    assert build_bundle(str(emb), release=True) != release
+    assert not isinstance(DRKGScorer(str(emb), quantize="int8").quantized.codes, np.memmap)
+
+
+def test_quantized_discovery_pages_match_exact(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+
+    def pages():
+        cursor, out = 0, []
+        while cursor is not None:
+            page = discover_candidates(DISEASES[2], data_dir=str(data_dir), cursor=cursor,
+                                       max_candidates=50, min_percentile=0.0)
+            out += [(c.drkg_entity, c.kg_rank, c.kg_score) for c in page.candidates]
+            cursor = page.next_cursor
+        return out
+
+    registry.put_scorer(str(data_dir), DRKGScorer(emb))
+    want = pages()
+    # rescore_k far below the first page: every later page walks past it.
+    registry.put_scorer(str(data_dir), DRKGScorer(emb, quantize="int8", rescore_k=8))
+    assert pages() == want
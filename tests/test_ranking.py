@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_COMPOUNDS
+
+
+def _reference(scorer, query, top_k):
+    """The per-compound loop the vectorised ranking replaced."""
+    entities = scorer.resolve_disease(query)
+    tails = [scorer.entity_to_idx[e] for e in entities if e in scorer.entity_to_idx]
+    n = len(scorer.compound_names)
+    best, relation = np.full(n, -np.inf), [None] * n
+    for rel, scores in scorer._iter_scores(tails, scorer.find_treatment_relations()):
+        for i, s in enumerate(scores):
+            if s > best[i]:
+                best[i], relation[i] = s, rel
+    valid = best[np.isfinite(best)]
+    mean, std = valid.mean(), max(valid.std(), 1e-8)
+    order = sorted(range(n), key=lambda i: -best[i])[:top_k]
+    return [(scorer.compound_names[i], rank, round(best[i], 4),
+             round(float(np.sum(valid <= best[i]) / len(valid) * 100), 2),
+             round((best[i] - mean) / std, 3), relation[i])
+            for rank, i in enumerate(order, 1)]
+
+
+@pytest.mark.parametrize("query", [DISEASES[0], DISEASES[7], "MESH:D00001"])
+@pytest.mark.parametrize("top_k", [0, 1, 25, N_COMPOUNDS])
+def test_ranking_matches_full_sort(data_dir, query, top_k):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    got = scorer.score_disease(query, top_k=top_k).predictions
+    want = _reference(scorer, query, top_k)
+    assert [(p.drug_entity, p.rank, p.score, p.relation_used) for p in got] == \
+        [(w[0], w[1], w[2], w[5]) for w in want]
+    np.testing.assert_allclose([p.percentile for p in got], [w[3] for w in want], atol=0.011)
+    np.testing.assert_allclose([p.z_score for p in got], [w[4] for w in want], atol=0.0011)
+
+
+def test_reduce_pairs_keeps_first_best_and_drops_nan(data_dir):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    rows = [np.zeros(N_COMPOUNDS), np.zeros(N_COMPOUNDS), np.zeros(N_COMPOUNDS)]
+    rows[0][0], rows[1][1], rows[2][1] = np.nan, 2.0, 2.0
+    rows[1][0] = np.nan
+    rows[2][0] = np.nan
+    best, pair = scorer._reduce_pairs(rows)
+    assert best[0] == -np.inf
+    assert (best[1], pair[1]) == (2.0, 1)
+    assert (best[2], pair[2]) == (0.0, 0)
+    best, _ = scorer._reduce_pairs([])
+    assert np.all(best == -np.inf)
@@ -0,0 +1,53 @@
+import os
+
+from drug_rescue.engines import registry
+from drug_rescue.engines.discover import discover_candidates
+
+from conftest import DISEASES
+
+
+def test_discovery_reuses_the_warm_scorer(data_dir, monkeypatch):
+    built = []
+
+    class Counting(registry.DRKGScorer):
+        def __init__(self, *args, **kwargs):
+            built.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(registry, "DRKGScorer", Counting)
+    first = discover_candidates(DISEASES[0], data_dir=str(data_dir))
+    second = discover_candidates(DISEASES[1], data_dir=str(data_dir))
+    assert first.error is None and second.error is None
+    assert len(built) == 1
+    assert registry.get_scorer(str(data_dir)) is built[0]
+    assert registry.get_enricher(str(data_dir)) is registry.get_enricher(str(data_dir))
+
+    registry.clear(str(data_dir))
+    assert registry.get_scorer(str(data_dir)) is not built[0]
+    assert len(built) == 2
+
+
+def _touch(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_changed_files_rebuild_the_scorer(data_dir, monkeypatch):
+    monkeypatch.setattr(registry, "BACKGROUND_RELOAD", False)
+    scorer = registry.get_scorer(str(data_dir))
+    _touch(data_dir / "embeddings" / "entity_to_idx.json")
+    fresh = registry.get_scorer(str(data_dir))
+    assert fresh is not scorer
+    assert registry.get_scorer(str(data_dir)) is fresh
+
+
+def test_changed_files_swap_in_the_background(data_dir):
+    assert registry.BACKGROUND_RELOAD
+    scorer = registry.get_scorer(str(data_dir))
+    _touch(data_dir / "embeddings" / "entity_to_idx.json")
+
+    ready = []
+    assert registry.get_scorer(str(data_dir)) is scorer     # still serving the old one
+    registry.preload(str(data_dir), on_ready=ready.append).join()
+    assert len(ready) == 1 and ready[0] is not scorer
+    assert registry.get_scorer(str(data_dir)) is ready[0]
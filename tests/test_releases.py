@@ -0,0 +1,62 @@
+import numpy as np
+
+from drug_rescue.engines.ann_index import build_ann_index
+from drug_rescue.engines.bundle import build_bundle, set_current_release
+from drug_rescue.engines.calibration import build_null_model
+from drug_rescue.engines.ensemble import build_partner
+from drug_rescue.engines.score_matrix import build_score_matrix
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+
+def _artifacts(scorer):
+    return {
+        "score_matrix": scorer.score_matrix,
+        "ann_index": scorer.ann_index,
+        "null_model": scorer.null_model,
+        "partner": scorer.partner is not None and scorer.partner.path,
+    }
+
+
+def test_artifacts_follow_the_served_release(data_dir):
+    emb = data_dir / "embeddings"
+    a = build_bundle(str(emb), release=True).name
+
+    # Retrain: same entities, new RotatE vectors. Release B becomes CURRENT.
+    ent = np.load(emb / "rotate_entity_embeddings.npy")
+    np.save(emb / "rotate_entity_embeddings.npy", ent * 1.1)
+    b = build_bundle(str(emb), release=True).name
+    assert a != b
+
+    builder = DRKGScorer(str(emb), use_score_matrix=False, use_ann=False, calibrate=False)
+    assert builder.embedding_version == b
+    build_score_matrix(builder, diseases=DISEASES[:5], dtype="float32")
+    build_ann_index(builder, nlist=8)
+    build_null_model(builder, n_samples=20)
+    build_partner(builder)
+
+    on_b = DRKGScorer(str(emb), use_ann=True, calibrate=True, ensemble="rank")
+    assert all(_artifacts(on_b).values())
+
+    # Roll back: nothing built for B may be served with A's embeddings.
+    set_current_release(str(emb), a)
+    on_a = DRKGScorer(str(emb), use_ann=True, calibrate=True, ensemble="rank")
+    assert on_a.embedding_version == a
+    assert not any(_artifacts(on_a).values())
+
+
+def test_release_served_over_changed_raw_files_says_so(data_dir):
+    emb = data_dir / "embeddings"
+    a = build_bundle(str(emb), release=True).name
+    assert DRKGScorer(str(emb)).info()["release"] == {"version": a, "raw_sources_current": True}
+
+    ent = np.load(emb / "rotate_entity_embeddings.npy")
+    np.save(emb / "rotate_entity_embeddings.npy", ent * 1.1)
+    scorer = DRKGScorer(str(emb), ensemble="rank")
+    assert scorer.embedding_version == a
+    assert scorer.info()["release"] == {"version": a, "raw_sources_current": False}
+    # The raw TransE files may be from another run: no partner is read from them.
+    assert scorer.partner is None and scorer.ensemble is None
+
+    assert DRKGScorer(str(emb), use_bundle=False).info()["release"] is None
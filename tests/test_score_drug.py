@@ -0,0 +1,32 @@
+import numpy as np
+
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_DISEASES
+
+
+def test_score_drug_ranks_diseases_like_forward_queries(data_dir):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    result = scorer.score_drug("DB00042", top_k=N_DISEASES)
+    assert result.error is None
+    assert result.drug_query == "DB00042" and result.total_diseases_scored == N_DISEASES
+    got = result.predictions
+    assert sorted(p.disease_entity for p in got) == DISEASES
+    assert [p.rank for p in got] == list(range(1, N_DISEASES + 1))
+    assert all(p.drug_entity == "Compound::DB00042" for p in got)
+    assert [p.score for p in got] == sorted((p.score for p in got), reverse=True)
+    assert got[0].percentile == 100.0
+
+    for p in got[::7]:
+        forward = scorer.score_specific_drugs(["DB00042"], p.disease_entity).predictions[0]
+        assert (p.score, p.relation_used) == (forward.score, forward.relation_used)
+
+    top = scorer.score_drug("DB00042", top_k=5).predictions
+    assert [p.to_dict() for p in top] == [p.to_dict() for p in got[:5]]
+    assert np.isclose(np.mean([p.z_score for p in got]), 0.0, atol=0.01)
+
+
+def test_score_drug_unknown(data_dir):
+    result = DRKGScorer(str(data_dir / "embeddings")).score_drug("not a drug")
+    assert result.predictions == [] and "not a drug" in result.error
+    assert result.to_dict()["drug_query"] == "not a drug"
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.score_matrix import build_score_matrix
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+QUERIES = DISEASES[:12] + ["MESH:D00000"]
+
+
+@pytest.mark.parametrize("use_bundle", [True, False])
+def test_score_matrix_reproduces_live_ranking(data_dir, use_bundle):
+    emb = str(data_dir / "embeddings")
+    if use_bundle:
+        build_bundle(emb)
+    live = DRKGScorer(emb, use_bundle=use_bundle, use_score_matrix=False)
+    build_score_matrix(live, diseases=QUERIES, memory_budget_mb=0.1)
+
+    served = DRKGScorer(emb, use_bundle=use_bundle)
+    m = served.score_matrix
+    assert m is not None and m.scores.dtype == live.compound_embs.dtype
+    for query in QUERIES:
+        assert m.covers(served.resolve_disease(query))
+        want = live.score_disease(query, top_k=100)
+        got = served.score_disease(query, top_k=100)
+        assert [p.to_dict() for p in got.predictions] == [p.to_dict() for p in want.predictions]
+
+
+def test_float16_matrix_is_opt_in(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+    live = DRKGScorer(emb, use_score_matrix=False)
+    build_score_matrix(live, diseases=DISEASES[:3], dtype="float16")
+
+    m = DRKGScorer(emb).score_matrix
+    assert m.scores.dtype == np.float16
+    want, _ = live.disease_scores(DISEASES[0])
+    row = np.asarray(m.scores[m.disease_row[DISEASES[0]]], dtype=np.float64)
+    np.testing.assert_allclose(row, want.best_scores, rtol=1e-3)
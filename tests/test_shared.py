@@ -0,0 +1,53 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from drug_rescue.engines import registry
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.shared import attach_scorer, publish_scorer
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+
+def _ranking(scorer, query=DISEASES[2]):
+    return [p.to_dict() for p in scorer.score_disease(query, top_k=30).predictions]
+
+
+def _worker_ranking(spec):
+    scorer = attach_scorer(spec)
+    return _ranking(scorer), registry.get_scorer(str(scorer.embeddings_dir.parent)) is scorer
+
+
+@pytest.mark.parametrize("use_bundle", [True, False])
+def test_attached_scorer_ranks_like_the_source(data_dir, use_bundle):
+    emb = str(data_dir / "embeddings")
+    if use_bundle:
+        build_bundle(emb)
+    source = DRKGScorer(emb, use_bundle=use_bundle)
+
+    with publish_scorer(source) as shared:
+        attached = attach_scorer(shared.spec)
+        assert registry.get_scorer(str(data_dir)) is attached
+        assert not attached.entity_emb.flags.writeable
+        assert np.shares_memory(attached.compound_embs, attached.entity_emb)
+        assert sorted(attached.compound_names) == sorted(source.compound_names)
+        if use_bundle:
+            assert _ranking(attached) == _ranking(source)
+        else:
+            got, want = _ranking(attached), _ranking(source)
+            assert [p["drug_entity"] for p in got[:10]] == [p["drug_entity"] for p in want[:10]]
+            np.testing.assert_allclose([p["score"] for p in got], [p["score"] for p in want],
+                                       atol=2e-4)
+
+
+def test_worker_process_attaches(data_dir):
+    emb = str(data_dir / "embeddings")
+    build_bundle(emb)
+    source = DRKGScorer(emb)
+    with publish_scorer(source) as shared:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            ranking, registered = pool.apply(_worker_ranking, (shared.spec,))
+    assert registered and ranking == _ranking(source)
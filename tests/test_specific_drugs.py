@@ -0,0 +1,39 @@
+from drug_rescue.engines import scorer as scorer_mod
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES, N_COMPOUNDS
+
+NAMES = ["DB00042", "Compound::DB00007", "not a drug", "db00311"]
+
+
+def test_specific_drugs_match_the_full_ranking(data_dir, monkeypatch):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    full = {p.drug_entity: p for p in scorer.score_disease(DISEASES[3], top_k=N_COMPOUNDS).predictions}
+
+    built = []
+    real = scorer_mod.KGPrediction
+
+    def counting(*args, **kwargs):
+        built.append(kwargs.get("drug_entity"))
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(scorer_mod, "KGPrediction", counting)
+    result = scorer.score_specific_drugs(NAMES, DISEASES[3])
+    assert result.error is None and result.total_compounds_scored == N_COMPOUNDS
+    assert len(built) == 3
+
+    got = result.predictions
+    assert [p.drug_name for p in got] == sorted(
+        NAMES[:2] + NAMES[3:], key=lambda n: -full[scorer.resolver.resolve(n)].score)
+    assert [p.rank for p in got] == [1, 2, 3]
+    for p in got:
+        want = full[p.drug_entity]
+        assert (p.score, p.percentile, p.z_score, p.relation_used) == \
+            (want.score, want.percentile, want.z_score, want.relation_used)
+
+
+def test_specific_drugs_none_resolved(data_dir):
+    scorer = DRKGScorer(str(data_dir / "embeddings"))
+    result = scorer.score_specific_drugs(["not a drug"], DISEASES[0])
+    assert result.predictions == [] and "not a drug" in result.error
+    assert scorer.score_specific_drugs(["DB00001"], "no such disease").error
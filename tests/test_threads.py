@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.scorer import DRKGScorer
+
+from conftest import DISEASES
+
+
+@pytest.mark.parametrize("use_bundle", [True, False])
+def test_chunked_threaded_scan_equals_serial(data_dir, use_bundle):
+    emb = str(data_dir / "embeddings")
+    if use_bundle:
+        build_bundle(emb)
+    serial = DRKGScorer(emb, use_bundle=use_bundle, threads=1, chunk_rows=10**6)
+    threaded = DRKGScorer(emb, use_bundle=use_bundle, threads=4, chunk_rows=64)
+    assert threaded.info()["scoring_threads"] == 4
+
+    rel_idx = serial.find_treatment_relations()[0][1]
+    tail = serial.entity_emb[serial.entity_to_idx[DISEASES[0]]]
+    want = serial._score_direct(rel_idx, tail)
+    got = threaded._score_direct(rel_idx, tail)
+    assert got.dtype == want.dtype and np.array_equal(got, want)
+
+    for query in [DISEASES[0], "MESH:D00002"]:
+        assert [p.to_dict() for p in threaded.score_disease(query, top_k=50).predictions] == \
+            [p.to_dict() for p in serial.score_disease(query, top_k=50).predictions]
+
+
+def test_thread_count_from_env(data_dir, monkeypatch):
+    monkeypatch.setenv("DRKG_SCORING_THREADS", "3")
+    assert DRKGScorer(str(data_dir / "embeddings")).threads == 3
+    assert DRKGScorer(str(data_dir / "embeddings"), threads=2).threads == 2
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from drug_rescue.engines.bundle import build_bundle
+from drug_rescue.engines.scorer import DRKGScorer
+from drug_rescue.engines.vocab import EntityVocab, group_by_type, write_vocab
+
+NAMES = ["Gene::7", "Compound::DB00002", "Side Effect::C001", "Disease::MESH:D1",
+         "Compound::DB00001", "Gene::Ωmega", "Disease::MESH:D0"]
+
+
+def test_group_by_type_is_stable_and_contiguous():
+    ordered, ranges = group_by_type(NAMES)
+    assert ordered == ["Compound::DB00002", "Compound::DB00001", "Disease::MESH:D1",
+                       "Disease::MESH:D0", "Gene::7", "Gene::Ωmega", "Side Effect::C001"]
+    assert ranges == {"Compound": [0, 2], "Disease": [2, 4], "Gene": [4, 6]}
+
+
+def test_vocab_behaves_like_the_dict(tmp_path):
+    ordered, ranges = group_by_type(NAMES)
+    write_vocab(ordered, tmp_path)
+    vocab = EntityVocab.load(tmp_path, ranges)
+    want = {name: i for i, name in enumerate(ordered)}
+
+    assert len(vocab) == len(want) and list(vocab) == ordered
+    assert dict(vocab) == want
+    for name, row in want.items():
+        assert name in vocab and vocab[name] == row and vocab.name(row) == name
+    for missing in ["Compound::DB0000", "Compound::DB000011", "x" * 100, "", 3]:
+        assert missing not in vocab and vocab.get(missing) is None
+    with pytest.raises(KeyError):
+        vocab["Gene::8"]
+    assert vocab.names_of_type("Disease") == ["Disease::MESH:D1", "Disease::MESH:D0"]
+    assert vocab.range("Anatomy") == (0, 0)
+
+
+def test_bundle_vocab_points_at_the_raw_rows(data_dir):
+    emb = str(data_dir / "embeddings")
+    raw = DRKGScorer(emb, use_bundle=False)
+    build_bundle(emb)
+    mapped = DRKGScorer(emb)
+    assert isinstance(mapped.entity_to_idx, EntityVocab)
+    assert dict(mapped.entity_to_idx).keys() == raw.entity_to_idx.keys()
+
+    raw_rows = np.array([raw.entity_to_idx[n] for n in mapped.entity_to_idx])
+    np.testing.assert_allclose(mapped.entity_emb, raw.entity_emb[raw_rows], rtol=1e-6)
+    n = len(mapped.compound_names)
+    assert mapped.compound_names == list(mapped.entity_to_idx)[:n]
+    assert sorted(mapped.compound_names) == sorted(raw.compound_names)